@@ -12,7 +12,17 @@ interface IUniswapV3SwapCallback {
     ) external;
 }
 
-// Minimal interface for a Uniswap V3-style pool (or RamsesV3Pool).
+// Minimal interface for the Algebra swap callback (same arguments, different name).
+interface IAlgebraSwapCallback {
+    function algebraSwapCallback(
+        int256 amount0Delta,
+        int256 amount1Delta,
+        bytes calldata data
+    ) external;
+}
+
+// Minimal interface for a Uniswap V3-style pool (or RamsesV3Pool). Algebra pools share the
+// swap() signature (recipient, zeroToOne, amountRequired, limitSqrtPrice, data).
 interface IUniswapV3Pool {
     function swap(
         address recipient,
@@ -26,6 +36,14 @@ interface IUniswapV3Pool {
     function token1() external view returns (address);
 }
 
+// Minimal interface for a Uniswap V2-style pair (also Solidly volatile and stable pairs).
+interface IUniswapV2Pair {
+    function swap(uint256 amount0Out, uint256 amount1Out, address to, bytes calldata data) external;
+
+    function token0() external view returns (address);
+    function token1() external view returns (address);
+}
+
 // Minimal ERC20 interface.
 interface IERC20 {
     function transfer(address recipient, uint256 amount) external returns (bool);
@@ -34,8 +52,14 @@ interface IERC20 {
 
 /* ========== SwapExecutor Contract ========== */
 
-contract SwapExecutor is IUniswapV3SwapCallback {
+contract SwapExecutor is IUniswapV3SwapCallback, IAlgebraSwapCallback {
     address public owner;
+    // The pool whose swap() is in progress; only it may call back for payment.
+    address private activePool;
+
+    // Price limits that never bind (TickMath.MIN_SQRT_RATIO + 1 / MAX_SQRT_RATIO - 1).
+    uint160 internal constant MIN_SQRT_RATIO_LIMIT = 4295128740;
+    uint160 internal constant MAX_SQRT_RATIO_LIMIT = 1461446703485210103287273052203988822378723970341;
 
     modifier onlyOwner() {
         require(msg.sender == owner, "Not owner");
@@ -56,13 +80,16 @@ contract SwapExecutor is IUniswapV3SwapCallback {
      * @param sqrtPriceLimitX96 The price limit in Q96 format. For a buy (zeroForOne=false),
      *                          set this above the current sqrtPrice; for a sell (zeroForOne=true),
      *                          set it below.
+     * @dev Restricted to the owner: the pool is trusted to call back only because the owner
+     *      chose it, and the callback pays it from the owner's approved tokens.
      */
     function executeSwap(
         address pool, 
         bool zeroForOne, 
         int256 amountSpecified, 
         uint160 sqrtPriceLimitX96
-    ) external {
+    ) external onlyOwner {
+        activePool = pool;
         IUniswapV3Pool(pool).swap(
             msg.sender, //change to msg.sender
             zeroForOne,
@@ -70,6 +97,89 @@ contract SwapExecutor is IUniswapV3SwapCallback {
             sqrtPriceLimitX96,
             ""
         );
+        activePool = address(0);
+    }
+
+    /**
+     * @notice Executes an exact-input swap on a Uniswap V2-style or Solidly pair.
+     * The input is pulled from the owner straight into the pair, then the pair is asked for
+     * amountOut; the pair reverts if that breaks its invariant, so amountOut doubles as the
+     * minimum output. Restricted to the owner because it spends the owner's tokens directly.
+     * @param pair The address of the target pair.
+     * @param zeroForOne If true, swaps token0 for token1; if false, token1 for token0.
+     * @param amountIn The amount of the input token sent to the pair.
+     * @param amountOut The amount of the output token to receive (quoted off-chain).
+     */
+    function executeSwapV2(
+        address pair,
+        bool zeroForOne,
+        uint256 amountIn,
+        uint256 amountOut
+    ) external onlyOwner {
+        address tokenIn = zeroForOne ? IUniswapV2Pair(pair).token0() : IUniswapV2Pair(pair).token1();
+        require(
+            IERC20(tokenIn).transferFrom(owner, pair, amountIn),
+            "Transfer tokenIn failed"
+        );
+        if (zeroForOne) {
+            IUniswapV2Pair(pair).swap(0, amountOut, msg.sender, "");
+        } else {
+            IUniswapV2Pair(pair).swap(amountOut, 0, msg.sender, "");
+        }
+    }
+
+    /**
+     * @notice Executes one exact-input order split across several pools of the same pair, all
+     * legs in this transaction. V3/Algebra legs swap without a price limit and are checked
+     * against their minimum output; V2/Solidly legs are paid up front and ask the pair for
+     * exactly amountsOut[i]. Any leg falling short reverts the whole split.
+     * @param pools The pools, one per leg.
+     * @param isV2 True for V2-style/Solidly pairs, false for V3/Algebra pools.
+     * @param zeroForOne Swap direction per leg.
+     * @param amountsIn Input amount per leg.
+     * @param amountsOut Minimum output per leg (the exact output requested from V2 pairs).
+     */
+    function executeSplit(
+        address[] calldata pools,
+        bool[] calldata isV2,
+        bool[] calldata zeroForOne,
+        uint256[] calldata amountsIn,
+        uint256[] calldata amountsOut
+    ) external onlyOwner {
+        require(
+            pools.length == isV2.length &&
+            pools.length == zeroForOne.length &&
+            pools.length == amountsIn.length &&
+            pools.length == amountsOut.length,
+            "Length mismatch"
+        );
+        for (uint256 i = 0; i < pools.length; i++) {
+            if (isV2[i]) {
+                IUniswapV2Pair pair = IUniswapV2Pair(pools[i]);
+                address tokenIn = zeroForOne[i] ? pair.token0() : pair.token1();
+                require(
+                    IERC20(tokenIn).transferFrom(owner, pools[i], amountsIn[i]),
+                    "Transfer tokenIn failed"
+                );
+                if (zeroForOne[i]) {
+                    pair.swap(0, amountsOut[i], msg.sender, "");
+                } else {
+                    pair.swap(amountsOut[i], 0, msg.sender, "");
+                }
+            } else {
+                activePool = pools[i];
+                (int256 amount0, int256 amount1) = IUniswapV3Pool(pools[i]).swap(
+                    msg.sender,
+                    zeroForOne[i],
+                    int256(amountsIn[i]),
+                    zeroForOne[i] ? MIN_SQRT_RATIO_LIMIT : MAX_SQRT_RATIO_LIMIT,
+                    ""
+                );
+                activePool = address(0);
+                int256 received = zeroForOne[i] ? -amount1 : -amount0;
+                require(received >= 0 && uint256(received) >= amountsOut[i], "Insufficient output");
+            }
+        }
     }
 
     /**
@@ -87,7 +197,29 @@ contract SwapExecutor is IUniswapV3SwapCallback {
     ) external override {
         // Silence unused variable warning
         data;
+        _pay(amount0Delta, amount1Delta);
+    }
+
+    /**
+     * @notice Algebra pools call this instead of uniswapV3SwapCallback; paid the same way.
+     */
+    function algebraSwapCallback(
+        int256 amount0Delta,
+        int256 amount1Delta,
+        bytes calldata data
+    ) external override {
+        data;
+        _pay(amount0Delta, amount1Delta);
+    }
+
+    /**
+     * @dev Pays the calling pool what it is owed from the owner's balance. Only the pool this
+     * contract is currently swapping on may call back, so no other contract can pull the
+     * owner's approved tokens.
+     */
+    function _pay(int256 amount0Delta, int256 amount1Delta) internal {
         address pool = msg.sender; // The pool contract calling back.
+        require(pool == activePool, "Unexpected callback");
         if (amount0Delta > 0) {
             address token0 = IUniswapV3Pool(pool).token0();
             require(
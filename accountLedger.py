@@ -0,0 +1,252 @@
+import sys
+import threading
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+from multicall import aggregate3
+from tradeContext import ALLOWANCE, BALANCE_OF
+from txPipeline import TRANSFER_TOPIC
+
+APPROVAL_TOPIC = Web3.keccak(text="Approval(address,address,uint256)")
+# Wrappers log wrapping and unwrapping with Deposit/Withdrawal. WETH9 logs only those, while
+# OpenZeppelin-based ones (wS on Sonic) also log a mint/burn Transfer from/to the zero address.
+DEPOSIT_TOPIC = Web3.keccak(text="Deposit(address,uint256)")
+WITHDRAWAL_TOPIC = Web3.keccak(text="Withdrawal(address,uint256)")
+
+MAX_UINT256 = 2 ** 256 - 1  # an unlimited allowance, which transferFrom does not lower
+ZERO_ADDRESS = "0x" + "00" * 20
+
+DEFAULT_RECONCILE_BLOCKS = 100
+
+
+def _address(topic):
+    return Web3.to_checksum_address(bytes(topic)[-20:])
+
+
+def _amount(data):
+    data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+    return int.from_bytes(data[:32], "big")
+
+
+class AccountLedger:
+    """
+    Local record of one account's ERC20 balances and allowances, kept current from the
+    receipts of the account's own transactions, so the swap path need not read them from the
+    chain before every swap.
+
+    A value is tracked from its first read (balance()/allowance() with read=..., or seed()).
+    After that every receipt passed through track() updates it from its Transfer, Approval,
+    Deposit and Withdrawal logs: a Transfer from the account by the contract the transaction
+    called (our executors pull tokens with transferFrom) also lowers that contract's allowance.
+    Until a tracked transaction is mined, the changes it is expected to make are counted in,
+    so back-to-back swaps do not spend the same balance twice.
+
+    Tokens sent to the account by others are only picked up by reconcile(), which re-reads
+    every tracked value in one Multicall3 batch every reconcile_every blocks (from on_head) and
+    reports what it had to correct. Chain reads only replace local values while none of our
+    transactions is in flight, so a read can never count a mined transaction twice.
+    """
+
+    def __init__(self, w3, account, reconcile_every=DEFAULT_RECONCILE_BLOCKS):
+        self.w3 = w3
+        self.account = Web3.to_checksum_address(account)
+        self.reconcile_every = reconcile_every
+        self._lock = threading.Lock()
+        self._balances = {}  # token -> balance as of the last applied receipt
+        self._allowances = {}  # (token, spender) -> allowance as of the last applied receipt
+        self._pending = {}  # tx hash -> (balance deltas, allowance deltas) expected from it
+        self.generation = 0  # bumped whenever a transaction is tracked or settled
+        self._last_reconcile = None
+        self._reconciling = False
+        self.reconciles = 0
+        self.corrections = 0
+
+    def balance(self, token, read=None):
+        """
+        The account's balance of token, including transactions in flight. If token is not
+        tracked yet, read() (a chain read) is called and its result tracked; without read None
+        is returned.
+        """
+        token = Web3.to_checksum_address(token)
+        with self._lock:
+            if token in self._balances:
+                return self._balances[token] + sum(b.get(token, 0) for b, _ in self._pending.values())
+        if read is None:
+            return None
+        generation = self.generation
+        value = read()
+        self.seed(balances={token: value}, generation=generation)
+        return value
+
+    def allowance(self, token, spender, read=None):
+        """The account's allowance of token for spender; tracked and read like balance()."""
+        key = (Web3.to_checksum_address(token), Web3.to_checksum_address(spender))
+        with self._lock:
+            if key in self._allowances:
+                confirmed = self._allowances[key]
+                if confirmed == MAX_UINT256:
+                    return confirmed
+                return max(confirmed + sum(a.get(key, 0) for _, a in self._pending.values()), 0)
+        if read is None:
+            return None
+        generation = self.generation
+        value = read()
+        self.seed(allowances={key: value}, generation=generation)
+        return value
+
+    def seed(self, balances=None, allowances=None, generation=None):
+        """
+        Starts tracking values read from the chain (token -> balance, (token, spender) ->
+        allowance). Ignored while transactions are in flight, or if one was tracked or settled
+        since generation (self.generation taken before the read).
+        """
+        with self._lock:
+            if self._pending or (generation is not None and generation != self.generation):
+                return False
+            for token, value in (balances or {}).items():
+                self._balances.setdefault(Web3.to_checksum_address(token), value)
+            for (token, spender), value in (allowances or {}).items():
+                self._allowances.setdefault((Web3.to_checksum_address(token), Web3.to_checksum_address(spender)), value)
+            return True
+
+    def track(self, pending, balances=None, allowances=None):
+        """
+        Follows one of our transactions (a txPipeline.PendingTx) and applies its receipt once
+        mined. balances (token -> delta) and allowances ((token, spender) -> delta) are the
+        changes expected from it, counted in until then.
+        """
+        balances = {Web3.to_checksum_address(t): d for t, d in (balances or {}).items()}
+        allowances = {(Web3.to_checksum_address(t), Web3.to_checksum_address(s)): d
+                      for (t, s), d in (allowances or {}).items()}
+        with self._lock:
+            self._pending[pending.tx_hash] = (balances, allowances)
+            self.generation += 1
+        pending.add_done_callback(self._settle)
+        return pending
+
+    def _settle(self, pending):
+        receipt = pending.result() if pending.exception() is None else None
+        with self._lock:
+            self._pending.pop(pending.tx_hash, None)
+            if receipt is not None:
+                self._apply(receipt)
+            self.generation += 1
+
+    def apply_receipt(self, receipt):
+        """Applies the token movements of one of our receipts to the tracked values."""
+        with self._lock:
+            self._apply(receipt)
+            self.generation += 1
+
+    def _apply(self, receipt):
+        account = self.account
+        caller = Web3.to_checksum_address(receipt["to"]) if receipt.get("to") else None
+        # Tokens that log an Approval when transferFrom lowers an allowance: the Approval
+        # already holds the new value, so the Transfer must not lower it again.
+        approved = set()
+        # Tokens whose wrap (unwrap) the receipt already books as a mint (burn) Transfer, so
+        # their Deposit (Withdrawal) must not be booked again.
+        minted, burned = set(), set()
+        for log in receipt["logs"]:
+            topics = log["topics"]
+            if len(topics) == 3 and bytes(topics[0]) == TRANSFER_TOPIC:
+                sender, recipient = _address(topics[1]), _address(topics[2])
+                if sender == ZERO_ADDRESS and recipient == account:
+                    minted.add(Web3.to_checksum_address(log["address"]))
+                elif sender == account and recipient == ZERO_ADDRESS:
+                    burned.add(Web3.to_checksum_address(log["address"]))
+        for log in receipt["logs"]:
+            topics = log["topics"]
+            if not topics:
+                continue
+            topic = bytes(topics[0])
+            token = Web3.to_checksum_address(log["address"])
+            if topic == APPROVAL_TOPIC and len(topics) == 3 and _address(topics[1]) == account:
+                key = (token, _address(topics[2]))
+                self._allowances[key] = _amount(log["data"])
+                approved.add(key)
+            elif topic == TRANSFER_TOPIC and len(topics) == 3:
+                amount = _amount(log["data"])
+                if _address(topics[1]) == account:
+                    if token in self._balances:
+                        self._balances[token] -= amount
+                    key = (token, caller)
+                    if key in self._allowances and key not in approved and self._allowances[key] != MAX_UINT256:
+                        self._allowances[key] = max(self._allowances[key] - amount, 0)
+                if _address(topics[2]) == account and token in self._balances:
+                    self._balances[token] += amount
+            elif topic in (DEPOSIT_TOPIC, WITHDRAWAL_TOPIC) and len(topics) == 2 and _address(topics[1]) == account:
+                if token in (minted if topic == DEPOSIT_TOPIC else burned):
+                    continue
+                if token in self._balances:
+                    amount = _amount(log["data"])
+                    self._balances[token] += amount if topic == DEPOSIT_TOPIC else -amount
+
+    def on_head(self, number):
+        """Starts a reconcile() on its own thread every reconcile_every blocks."""
+        if self._last_reconcile is not None and number - self._last_reconcile < self.reconcile_every:
+            return
+        with self._lock:
+            if self._reconciling:
+                return
+            self._reconciling = True
+        self._last_reconcile = number
+
+        def run():
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Ledger: reconcile failed ({e!r})", file=sys.stderr)
+            finally:
+                self._reconciling = False
+
+        threading.Thread(target=run, name="ledger-reconcile", daemon=True).start()
+
+    def reconcile(self):
+        """
+        Re-reads every tracked value from the chain in one Multicall3 batch and replaces the
+        local ones, printing each difference. Skipped (returns False) while transactions are
+        in flight or if one settled during the read; the next call tries again.
+        """
+        with self._lock:
+            if self._pending:
+                return False
+            generation = self.generation
+            tokens = list(self._balances)
+            pairs = list(self._allowances)
+        if not tokens and not pairs:
+            return True
+        calls = [(token, BALANCE_OF + encode(["address"], [self.account])) for token in tokens]
+        calls += [(token, ALLOWANCE + encode(["address", "address"], [self.account, spender])) for token, spender in pairs]
+        results = aggregate3(self.w3, calls)
+        with self._lock:
+            if self._pending or generation != self.generation:
+                return False
+            for i, (ok, data) in enumerate(results):
+                if not ok or len(data) < 32:
+                    continue
+                value = decode(["uint256"], data[:32])[0]
+                if i < len(tokens):
+                    values, key, what = self._balances, tokens[i], f"balance of {tokens[i]}"
+                else:
+                    key = pairs[i - len(tokens)]
+                    values, what = self._allowances, f"allowance of {key[0]} for {key[1]}"
+                if values[key] != value:
+                    print(f"Ledger: {what} was {values[key]}, chain has {value}")
+                    values[key] = value
+                    self.corrections += 1
+            self.reconciles += 1
+        return True
+
+    def stats(self):
+        """Returns the number of tracked values and reconciliation counters as a dict."""
+        with self._lock:
+            return {
+                "balances": len(self._balances),
+                "allowances": len(self._allowances),
+                "in_flight": len(self._pending),
+                "reconciles": self.reconciles,
+                "corrections": self.corrections,
+                "last_reconcile": self._last_reconcile,
+            }
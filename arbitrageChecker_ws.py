@@ -1,3 +1,4 @@
+import sys
 import requests
 import os
 from dotenv import load_dotenv
@@ -27,16 +28,16 @@ def fetch_token_pools(chain_id, token_address):
         print("Error fetching token pools:", e)
         return []
 
-def report_arbitrage_from_pools(pools, token_address, min_liquidity=10000):
+def find_arbitrage_from_pools(pools, token_address, min_liquidity=10000):
     """
     For a list of pool objects, compute the USD price for the given token,
     but only consider pools that are /wS pairs. That is, only include pools where one token
     is the queried token and the other token is the wS token.
     
     Pools with liquidity below min_liquidity are filtered out.
-    Then, the pools are sorted by price (high to low) and the highest and lowest prices,
-    along with the percentage difference, are reported. The DEX, constructed pair name,
-    and pair address are displayed.
+    Then, the pools are sorted by price (high to low) and the highest and lowest pools,
+    along with the percentage difference (None if the lowest price is zero), are returned.
+    Returns None if fewer than two pools qualify.
     """
     token_address_lower = token_address.lower()
     valid_prices = []
@@ -83,31 +84,59 @@ def report_arbitrage_from_pools(pools, token_address, min_liquidity=10000):
         except Exception:
             continue
 
-    if len(valid_prices) > 1:
-        # Sort pools by priceUsd in descending order.
-        sorted_prices = sorted(valid_prices, key=lambda x: x["priceUsd"], reverse=True)
-        highest = sorted_prices[0]
-        lowest = sorted_prices[-1]
-
-        if lowest["priceUsd"] > 0:
-            diff_percent = ((highest["priceUsd"] - lowest["priceUsd"]) / lowest["priceUsd"]) * 100
-            token_label = token_name if token_name else "Token"
-            print("\nArbitrage details for {} (Address: {}) – considering /wS pools with liquidity >= ${}:".format(token_label, token_address, min_liquidity))
-            print("-" * 80)
-            for entry in sorted_prices:
-                print(f"DEX: {entry['dexId']} | Pair: {entry['pairName']} | Pair Address: {entry['pairAddress']} | Price: {entry['priceUsd']:.6f} USD | Liquidity: ${entry['liquidityUsd']:.2f}")
-            print("-" * 80)
-            print("Highest Price:")
-            print(f"   {highest['priceUsd']:.6f} USD on DEX: {highest['dexId']} | Pair: {highest['pairName']} | Pair Address: {highest['pairAddress']}")
-            print("Lowest Price:")
-            print(f"   {lowest['priceUsd']:.6f} USD on DEX: {lowest['dexId']} | Pair: {lowest['pairName']} | Pair Address: {lowest['pairAddress']}")
-            print(f"Price Difference: {diff_percent:.2f}%\n")
-        else:
-            print("Lowest price is zero, cannot calculate arbitrage.")
-    else:
+    if len(valid_prices) < 2:
+        return None
+
+    # Sort pools by priceUsd in descending order.
+    sorted_prices = sorted(valid_prices, key=lambda x: x["priceUsd"], reverse=True)
+    highest = sorted_prices[0]
+    lowest = sorted_prices[-1]
+    diff_percent = None
+    if lowest["priceUsd"] > 0:
+        diff_percent = ((highest["priceUsd"] - lowest["priceUsd"]) / lowest["priceUsd"]) * 100
+    return {
+        "tokenName": token_name,
+        "sortedPrices": sorted_prices,
+        "highest": highest,
+        "lowest": lowest,
+        "diffPercent": diff_percent
+    }
+
+def report_arbitrage_from_pools(pools, token_address, min_liquidity=10000):
+    """
+    Prints the arbitrage details computed by find_arbitrage_from_pools: every eligible pool
+    sorted by price, the highest and lowest prices and the percentage difference.
+    """
+    arbitrage = find_arbitrage_from_pools(pools, token_address, min_liquidity)
+    if arbitrage is None:
         print("Not enough pool data to compute arbitrage details.")
+    elif arbitrage["diffPercent"] is None:
+        print("Lowest price is zero, cannot calculate arbitrage.")
+    else:
+        sorted_prices = arbitrage["sortedPrices"]
+        highest = arbitrage["highest"]
+        lowest = arbitrage["lowest"]
+        diff_percent = arbitrage["diffPercent"]
+        token_label = arbitrage["tokenName"] if arbitrage["tokenName"] else "Token"
+        print("\nArbitrage details for {} (Address: {}) – considering /wS pools with liquidity >= ${}:".format(token_label, token_address, min_liquidity))
+        print("-" * 80)
+        for entry in sorted_prices:
+            print(f"DEX: {entry['dexId']} | Pair: {entry['pairName']} | Pair Address: {entry['pairAddress']} | Price: {entry['priceUsd']:.6f} USD | Liquidity: ${entry['liquidityUsd']:.2f}")
+        print("-" * 80)
+        print("Highest Price:")
+        print(f"   {highest['priceUsd']:.6f} USD on DEX: {highest['dexId']} | Pair: {highest['pairName']} | Pair Address: {highest['pairAddress']}")
+        print("Lowest Price:")
+        print(f"   {lowest['priceUsd']:.6f} USD on DEX: {lowest['dexId']} | Pair: {lowest['pairName']} | Pair Address: {lowest['pairAddress']}")
+        print(f"Price Difference: {diff_percent:.2f}%\n")
 
 def main():
+    # With arguments, run the continuous watchlist scanner instead, e.g.
+    #   python arbitrageChecker_ws.py watchlist.txt --interval 30 --threshold 2 --output opportunities.jsonl
+    if len(sys.argv) > 1:
+        from watchScanner import main as scanner_main
+        scanner_main(sys.argv[1:], default_mode="ws")
+        return
+
     chain_id = "sonic"  # For Sonic chain
     token_address = input("Enter the token address to check pools: ").strip()
     
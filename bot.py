@@ -8,6 +8,17 @@ from flask_cors import CORS
 import openai
 import math
 from web3 import Web3
+from poolCache import PoolCache
+from spreadIndex import SpreadIndex
+from accountLedger import AccountLedger
+from callCache import BlockCallCache
+from gasModel import GasModel, DEFAULT_GAS_MODEL_PATH
+from gasOracle import GasOracle
+from nonceManager import NonceManager
+from poolRegistry import PoolRegistry, DEFAULT_REGISTRY_PATH
+from tradeContext import cached_contract, chain_id, prefetch_trade, simulated_ticks_crossed
+from txPipeline import TxPipeline, transferred_to
+from v2Pools import get_amount_out, read_amount_out, read_v2_pairs
 
 load_dotenv()
 
@@ -19,12 +30,20 @@ openai.api_key = "sk-proj-b1hbx9M_-eloHnYwHXvAHiyTH6NNqSv_SkhEUV9M9kEZ_geOgXhgwK
 assistant_id = "asst_IbPuyTELoe3dEZxhFzs05VbM"
 
 RPC_URL = os.environ.get("RPC_URL")
+WS_URL = os.environ.get("WS_URL")  # optional: new blocks for receipt tracking via newHeads
+TX_TIMEOUT = float(os.environ.get("TX_TIMEOUT", 120))  # seconds to wait for a receipt with wait=True
 PRIVATE_KEY = os.environ.get("PRIVATE_KEY")
 YOUR_ADDRESS = os.environ.get("YOUR_ADDRESS")
 """ SWAP_EXECUTOR_ADDRESS =os.environ.get("SWAP_EXECUTOR_ADDRESS") """
 WS_ADDRESS = os.environ.get("WS_ADDRESS")  # Wrapped S token address
 SWAP_EXECUTOR_UNI_ADDRESS = os.environ.get("SWAP_EXECUTOR_UNI_ADDRESS")
 SWAP_EXECUTOR_ALG_ADDRESS = os.environ.get("SWAP_EXECUTOR_ALG_ADDRESS")
+SWAP_EXECUTOR_V2_ADDRESS = os.environ.get("SWAP_EXECUTOR_V2_ADDRESS")  # optional, for V2/Solidly pairs
+V2_SLIPPAGE_BPS = int(os.environ.get("V2_SLIPPAGE_BPS", 50))
+POOL_REGISTRY_PATH = os.environ.get("POOL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH)
+GAS_MODEL_PATH = os.environ.get("GAS_MODEL_PATH", DEFAULT_GAS_MODEL_PATH)
+GAS_LIMIT_MARGIN = float(os.environ.get("GAS_LIMIT_MARGIN", 0.1))  # headroom over the predicted gas
+POOL_CACHE_TTL = float(os.environ.get("POOL_CACHE_TTL", 15))  # seconds a pool listing is served as fresh
 
 
 
@@ -41,6 +60,37 @@ YOUR_ADDRESS = w3.to_checksum_address(YOUR_ADDRESS)
 WS_ADDRESS = w3.to_checksum_address("0x039e2fB66102314Ce7b64Ce5Ce3E5183bc94aD38")
 SWAP_EXECUTOR_UNI_ADDRESS = w3.to_checksum_address(SWAP_EXECUTOR_UNI_ADDRESS)
 SWAP_EXECUTOR_ALG_ADDRESS = w3.to_checksum_address(SWAP_EXECUTOR_ALG_ADDRESS)
+if SWAP_EXECUTOR_V2_ADDRESS:
+    SWAP_EXECUTOR_V2_ADDRESS = w3.to_checksum_address(SWAP_EXECUTOR_V2_ADDRESS)
+
+# Pool type, tokens, decimals and fee, persisted across runs (see poolRegistry.py).
+pool_registry = PoolRegistry(POOL_REGISTRY_PATH)
+
+# Nonces are handed out locally so dependent transactions can be broadcast back-to-back.
+nonce_manager = NonceManager(w3, YOUR_ADDRESS)
+# Repeated eth_call/eth_getBalance reads within one block are answered from memory; the
+# pipeline's block loop moves the cache to each new head (see callCache.py).
+call_cache = BlockCallCache().install(w3)
+# EIP-1559 fees from eth_feeHistory, refreshed once per block off the hot path (see gasOracle.py).
+gas_oracle = GasOracle(w3)
+# Gas limits learned from our receipts, per executor, pool and direction (see gasModel.py).
+gas_model = GasModel(GAS_MODEL_PATH, margin=GAS_LIMIT_MARGIN)
+# Our token balances and allowances, kept from our own receipts (see accountLedger.py).
+ledger = AccountLedger(w3, YOUR_ADDRESS)
+
+def on_new_head(number):
+    """Moves the per-block caches to a new head; called from the tx pipeline's block loop."""
+    call_cache.new_head(number)
+    gas_oracle.on_head(number)
+    ledger.on_head(number)
+
+def get_fees():
+    """ Fee fields for the next block (maxFeePerGas, maxPriorityFeePerGas) from the gas oracle. """
+    return gas_oracle.fees()
+
+# Broadcast transactions are confirmed from one block-following thread (see txPipeline.py).
+tx_pipeline = TxPipeline(w3, nonce_manager, PRIVATE_KEY, ws_url=WS_URL, on_head=on_new_head)
+tx_pipeline.start()
 
 # Load the SwapExecutor contract ABI from file
 with open('SwapExecutorUniABI.json', 'r') as abi_file:
@@ -105,30 +155,50 @@ ws_abi = [
 
 
 # Placeholder fonksiyonlar (OpenAI Thread API benzeri işlevler)
-def get_gas_price():
-    """ Fetches the current gas price and adds a 10% buffer. """
-    base_gas_price = w3.eth.gas_price
-    return int(base_gas_price * 1.1)
+def direction_key(zero_for_one):
+    return "zeroForOne" if zero_for_one else "oneForZero"
 
-def check_and_approve(token_address, spender, required_amount):
-    """Checks token allowance and sends an approval transaction if needed."""
+def submit_call(call, tx_params, key, label, default_gas, pool_address=None, tick_before=None,
+                ticks_crossed=None, balances=None, allowances=None):
+    """
+    Submits a contract call with a gas limit from the receipt-trained gas model (see
+    gasModel.py) and has the model learn from the receipt. Unseen keys fall back to a cached
+    eth_estimateGas, and to default_gas if that fails (e.g. an approval still in flight).
+    For a swap, ticks_crossed is the simulated price move the limit is fitted for (see
+    tradeContext.simulated_ticks_crossed). The ledger applies the receipt too; balances and
+    allowances are the changes expected from the call until then (see accountLedger.py).
+    """
+    gas_limit = gas_model.limit(key, ticks_crossed, estimate=lambda: call.estimate_gas(tx_params), default=default_gas)
+    pending = tx_pipeline.submit(call.build_transaction(dict(tx_params, gas=gas_limit)), label)
+    gas_model.watch(pending, key, gas_limit, pool_address, tick_before, ticks_crossed)
+    return ledger.track(pending, balances, allowances)
+
+def check_and_approve(token_address, spender, required_amount, wait=True, current_allowance=None, fees=None):
+    """
+    Checks token allowance and sends an approval transaction if needed.
+    With wait=False the approval is only broadcast; a transaction sent after it gets the
+    next nonce, so it is mined after the approval. current_allowance and fees, when
+    already known (see tradeContext.py), save their RPC calls; otherwise the allowance is
+    read once and then tracked by the ledger.
+    """
     token_address = w3.to_checksum_address(token_address)
     token_contract = w3.eth.contract(address=token_address, abi=erc20_abi)
-    current_allowance = token_contract.functions.allowance(YOUR_ADDRESS, spender).call()
+    if current_allowance is None:
+        current_allowance = ledger.allowance(token_address, spender,
+                                             read=token_contract.functions.allowance(YOUR_ADDRESS, spender).call)
     print(f"Current allowance for token {token_address}: {current_allowance}")
     if current_allowance < required_amount:
         print(f"Allowance ({current_allowance}) is less than required ({required_amount}). Sending approval tx...")
-        tx = token_contract.functions.approve(spender, required_amount).build_transaction({
+        call = token_contract.functions.approve(spender, required_amount)
+        pending = submit_call(call, {
             'from': YOUR_ADDRESS,
-            'nonce': w3.eth.get_transaction_count(YOUR_ADDRESS),
-            'gas': 100000,
-            'gasPrice': get_gas_price()
-        })
-        signed_tx = w3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        print("Approval tx sent. Tx hash:", w3.to_hex(tx_hash))
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        print("Approval receipt:", receipt)
+            'chainId': chain_id(w3),
+            **(fees or get_fees())
+        }, (token_address, "approve"), "Approval", 100000,
+                              allowances={(token_address, spender): required_amount - current_allowance})
+        print("Approval tx sent. Tx hash:", pending.tx_hash)
+        if wait:
+            pending.result(timeout=TX_TIMEOUT)
     else:
         print("Sufficient allowance already exists.")
         return {"status": "approved"}
@@ -185,42 +255,51 @@ def calculate_sqrt_price_limit_sell(current_sqrt_price):
     print(f"Calculated sqrtPriceLimitX96 for sell swap (5% higher): {new_limit}")
     return new_limit
 
-def wrap_native(amount):
+def wrap_native(amount, wait=True, fees=None):
     """
     Wraps native S into wS by calling the wS contract's deposit() function.
-    'amount' is in wei.
+    'amount' is in wei. With wait=False the tx is only broadcast (see check_and_approve).
     """
     ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=ws_abi)
-    tx = ws_contract.functions.deposit().build_transaction({
+    call = ws_contract.functions.deposit()
+    pending = submit_call(call, {
         'from': YOUR_ADDRESS,
-        'nonce': w3.eth.get_transaction_count(YOUR_ADDRESS),
-        'gas': 100000,
-        'gasPrice': get_gas_price(),
+        'chainId': chain_id(w3),
+        **(fees or get_fees()),
         'value': amount
-    })
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    print("Wrap tx sent. Tx hash:", w3.to_hex(tx_hash))
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    print("Wrap receipt:", receipt)
+    }, (WS_ADDRESS, "deposit"), "Wrap", 100000, balances={WS_ADDRESS: amount})
+    print("Wrap tx sent. Tx hash:", pending.tx_hash)
+    if wait:
+        pending.result(timeout=TX_TIMEOUT)
+    return pending
 
-def unwrap_native(amount):
+def unwrap_native(amount, wait=True):
     """
     Unwraps wS into native S by calling the wS contract's withdraw() function.
-    'amount' is in raw units.
+    'amount' is in raw units. With wait=False the tx is only broadcast.
     """
     ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=ws_abi)
-    tx = ws_contract.functions.withdraw(amount).build_transaction({
+    call = ws_contract.functions.withdraw(amount)
+    pending = submit_call(call, {
         'from': YOUR_ADDRESS,
-        'nonce': w3.eth.get_transaction_count(YOUR_ADDRESS),
-        'gas': 100000,
-        'gasPrice': get_gas_price()
-    })
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    print("Unwrap tx sent. Tx hash:", w3.to_hex(tx_hash))
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    print("Unwrap receipt:", receipt)
+        'chainId': chain_id(w3),
+        **get_fees()
+    }, (WS_ADDRESS, "withdraw"), "Unwrap", 100000, balances={WS_ADDRESS: -amount})
+    print("Unwrap tx sent. Tx hash:", pending.tx_hash)
+    if wait:
+        pending.result(timeout=TX_TIMEOUT)
+    return pending
+
+def unwrap_swap_output(receipt, label):
+    """
+    Unwraps the wS a mined swap paid out to YOUR_ADDRESS. Only that amount (from the receipt's
+    Transfer logs) is unwrapped, so wS set aside for other swaps still in flight stays wrapped.
+    """
+    ws_amount = transferred_to(receipt, WS_ADDRESS, YOUR_ADDRESS)
+    if receipt["status"] == 1 and ws_amount > 0:
+        print(f"Post-sell ({label}): unwrapping {ws_amount} wei of wS to native S...")
+        return unwrap_native(ws_amount, wait=False)
+    return receipt
 
 
 def get_pool_sqrt_price_uni(pool_address):
@@ -285,178 +364,247 @@ def get_pool_sqrt_price_alg(pool_address):
 
 def autodetect_pool_type(pool_address):
     """
-    Attempts to autodetect the pool type by first trying a Uniswap-style call,
-    then an Algebra-style call.
-    Returns "uni" if Uniswap-style, "alg" if Algebra-style, or None if neither.
+    Detects the pool type by probing the Uniswap-style slot0(), the Algebra-style globalState()
+    and the V2-style getReserves() in a single call.
+    Returns "uni" if Uniswap-style, "alg" if Algebra-style, "v2" for a V2-style or Solidly pair
+    (getReserves()), or None if none of these.
+    Registered pools and previously classified addresses (including non-pools) are answered
+    from memory.
     """
-    try:
-        get_pool_sqrt_price_uni(pool_address)
-        return "uni"
-    except Exception:
-        try:
-            get_pool_sqrt_price_alg(pool_address)
-            return "alg"
-        except Exception:
-            return None
+    return pool_registry.classify(w3, [pool_address])[Web3.to_checksum_address(pool_address)]
 
 
 
-def execute_swap_uni(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96):
+def execute_swap_uni(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96, wait=True):
     """
     Executes a swap via the UniswapV3-style executor contract.
     Checks wS balance for buy swaps and wraps native S if needed.
+    With wait=False it returns once the swap is broadcast; the unwrap follows when it is mined.
     """
-    pool_address = w3.to_checksum_address(pool_address)
-    # Query the pool for token addresses.
-    pool_contract = w3.eth.contract(address=pool_address, abi=[
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "token0",
-            "outputs": [{"name": "", "type": "address"}],
-            "type": "function"
-        },
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "token1",
-            "outputs": [{"name": "", "type": "address"}],
-            "type": "function"
-        }
-    ])
-    if zeroForOne:
-        spend_token = pool_contract.functions.token0().call()
-    else:
-        spend_token = pool_contract.functions.token1().call()
+    # Allowance, balances, price and fees in one round trip (see tradeContext.py).
+    ctx = prefetch_trade(w3, pool_registry, pool_address, zeroForOne, SWAP_EXECUTOR_UNI_ADDRESS, YOUR_ADDRESS,
+                         fees=get_fees, ledger=ledger)
+    if ctx is None:
+        raise Exception(f"Not a Uniswap or Algebra pool: {pool_address}")
+    print(f"Pre-trade state read at block {ctx.block_number} in {ctx.timings['total']:.0f} ms")
+    spend_token, output_token = ctx.token_in, ctx.token_out
     print(f"Uniswap branch – spending token: {spend_token}")
-    check_and_approve(spend_token, SWAP_EXECUTOR_UNI_ADDRESS, amountSpecified)
-    if zeroForOne:
-        ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=erc20_abi)
-        current_ws_balance = ws_contract.functions.balanceOf(YOUR_ADDRESS).call()
+    check_and_approve(spend_token, SWAP_EXECUTOR_UNI_ADDRESS, amountSpecified, wait=False,
+                      current_allowance=ctx.allowance, fees=ctx.fees)
+    # Auto-wrap only if spending token is wS.
+    if spend_token == WS_ADDRESS:
+        current_ws_balance = ctx.balance_in
         print(f"Current wS balance: {current_ws_balance}")
         if current_ws_balance < amountSpecified:
             deficit = amountSpecified - current_ws_balance
             print(f"Insufficient wS balance. Wrapping {deficit} wei native S into wS...")
-            wrap_native(deficit)
+            wrap_native(deficit, wait=False, fees=ctx.fees)
     if sqrtPriceLimitX96 == 0:
-        current_sqrt_price = get_pool_sqrt_price_uni(pool_address)
         if zeroForOne:
-            sqrtPriceLimitX96 = calculate_sqrt_price_limit_buy(current_sqrt_price)
+            sqrtPriceLimitX96 = calculate_sqrt_price_limit_buy(ctx.sqrt_price_x96)
         else:
-            sqrtPriceLimitX96 = calculate_sqrt_price_limit_sell(current_sqrt_price)
-    with open('SwapExecutorUniABI.json', 'r') as abi_file:
-        uni_abi = json.load(abi_file)
-    uni_executor = w3.eth.contract(address=SWAP_EXECUTOR_UNI_ADDRESS, abi=uni_abi)
-    tx = uni_executor.functions.executeSwap(
-        pool_address,
+            sqrtPriceLimitX96 = calculate_sqrt_price_limit_sell(ctx.sqrt_price_x96)
+    uni_executor = cached_contract(w3, SWAP_EXECUTOR_UNI_ADDRESS, 'SwapExecutorUniABI.json')
+    call = uni_executor.functions.executeSwap(
+        ctx.pool,
         zeroForOne,
         amountSpecified,
         sqrtPriceLimitX96
-    ).build_transaction({
+    )
+    pending = submit_call(call, {
         'from': YOUR_ADDRESS,
-        'nonce': w3.eth.get_transaction_count(YOUR_ADDRESS),
-        'gas': 2000000,
-        'gasPrice': get_gas_price()
-    })
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    print("Uni swap tx sent. Tx hash:", w3.to_hex(tx_hash))
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    print("Uni swap receipt:", receipt)
+        'chainId': ctx.chain_id,
+        **ctx.fees
+    }, (SWAP_EXECUTOR_UNI_ADDRESS, ctx.pool, direction_key(zeroForOne)), "Uni swap", 2000000,
+                          pool_address=ctx.pool, tick_before=ctx.tick,
+                          ticks_crossed=simulated_ticks_crossed(ctx, amountSpecified, sqrtPriceLimitX96),
+                          balances={spend_token: -amountSpecified},
+                          allowances={(spend_token, SWAP_EXECUTOR_UNI_ADDRESS): -amountSpecified})
+    print("Uni swap tx sent. Tx hash:", pending.tx_hash)
+    tx_hash = pending.tx_hash
     if not zeroForOne:
-        ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=erc20_abi)
-        ws_balance = ws_contract.functions.balanceOf(YOUR_ADDRESS).call()
-        if ws_balance > 0:
-            print(f"Post-sell (Uni): unwrapping {ws_balance} wei of wS to native S...")
-            unwrap_native(ws_balance)
-    return {"status": "swapped", "tx_hash": w3.to_hex(tx_hash)}
+        pending = pending.then(lambda receipt: unwrap_swap_output(receipt, "Uni"))
+    if wait:
+        pending.result(timeout=TX_TIMEOUT)
+    return {"status": "swapped" if wait else "sent", "tx_hash": tx_hash}
 
-def execute_swap_alg(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96):
+def execute_swap_alg(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96, wait=True):
     """
     Executes a swap via the Algebra executor contract.
     The user provides the target Algebra pool address, direction, swap amount, and slippage limit.
     Supports both buy (zeroForOne=True) and sell (zeroForOne=False) swaps.
+    With wait=False it returns once the swap is broadcast; the unwrap follows when it is mined.
     """
-    pool_address = w3.to_checksum_address(pool_address)
-    # Query the pool for token addresses.
-    pool_contract = w3.eth.contract(address=pool_address, abi=[
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "token0",
-            "outputs": [{"name": "", "type": "address"}],
-            "type": "function"
-        },
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "token1",
-            "outputs": [{"name": "", "type": "address"}],
-            "type": "function"
-        }
-    ])
-    if zeroForOne:
-        spend_token = pool_contract.functions.token0().call()
-    else:
-        spend_token = pool_contract.functions.token1().call()
+    # Allowance, balances, price and fees in one round trip (see tradeContext.py).
+    ctx = prefetch_trade(w3, pool_registry, pool_address, zeroForOne, SWAP_EXECUTOR_ALG_ADDRESS, YOUR_ADDRESS,
+                         fees=get_fees, ledger=ledger)
+    if ctx is None:
+        raise Exception(f"Not a Uniswap or Algebra pool: {pool_address}")
+    print(f"Pre-trade state read at block {ctx.block_number} in {ctx.timings['total']:.0f} ms")
+    spend_token, output_token = ctx.token_in, ctx.token_out
     print(f"Algebra branch – spending token: {spend_token}")
-    check_and_approve(spend_token, SWAP_EXECUTOR_ALG_ADDRESS, amountSpecified)
-    if zeroForOne:
-        ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=erc20_abi)
-        current_ws_balance = ws_contract.functions.balanceOf(YOUR_ADDRESS).call()
+    check_and_approve(spend_token, SWAP_EXECUTOR_ALG_ADDRESS, amountSpecified, wait=False,
+                      current_allowance=ctx.allowance, fees=ctx.fees)
+    # Auto-wrap only if spending token is wS.
+    if spend_token == WS_ADDRESS:
+        current_ws_balance = ctx.balance_in
         print(f"Current wS balance: {current_ws_balance}")
         if current_ws_balance < amountSpecified:
             deficit = amountSpecified - current_ws_balance
             print(f"Insufficient wS balance. Wrapping {deficit} wei native S into wS...")
-            wrap_native(deficit)
+            wrap_native(deficit, wait=False, fees=ctx.fees)
     if sqrtPriceLimitX96 == 0:
-        current_sqrt_price = get_pool_sqrt_price_alg(pool_address)
         if zeroForOne:
-            sqrtPriceLimitX96 = calculate_sqrt_price_limit_buy(current_sqrt_price)
+            sqrtPriceLimitX96 = calculate_sqrt_price_limit_buy(ctx.sqrt_price_x96)
         else:
-            sqrtPriceLimitX96 = calculate_sqrt_price_limit_sell(current_sqrt_price)
-    with open('SwapExecutorAlgABI.json', 'r') as abi_file:
-        alg_abi = json.load(abi_file)
-    alg_executor = w3.eth.contract(address=SWAP_EXECUTOR_ALG_ADDRESS, abi=alg_abi)
-    tx = alg_executor.functions.executeSwap(
-        pool_address,
+            sqrtPriceLimitX96 = calculate_sqrt_price_limit_sell(ctx.sqrt_price_x96)
+    alg_executor = cached_contract(w3, SWAP_EXECUTOR_ALG_ADDRESS, 'SwapExecutorAlgABI.json')
+    call = alg_executor.functions.executeSwap(
+        ctx.pool,
         zeroForOne,
         amountSpecified,
         sqrtPriceLimitX96
-    ).build_transaction({
+    )
+    pending = submit_call(call, {
         'from': YOUR_ADDRESS,
-        'nonce': w3.eth.get_transaction_count(YOUR_ADDRESS),
-        'gas': 2000000,
-        'gasPrice': get_gas_price()
-    })
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    print("Alg swap tx sent. Tx hash:", w3.to_hex(tx_hash))
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    print("Alg swap receipt:", receipt)
+        'chainId': ctx.chain_id,
+        **ctx.fees
+    }, (SWAP_EXECUTOR_ALG_ADDRESS, ctx.pool, direction_key(zeroForOne)), "Alg swap", 2000000,
+                          pool_address=ctx.pool, tick_before=ctx.tick,
+                          ticks_crossed=simulated_ticks_crossed(ctx, amountSpecified, sqrtPriceLimitX96),
+                          balances={spend_token: -amountSpecified},
+                          allowances={(spend_token, SWAP_EXECUTOR_ALG_ADDRESS): -amountSpecified})
+    print("Alg swap tx sent. Tx hash:", pending.tx_hash)
+    tx_hash = pending.tx_hash
     if not zeroForOne:
-        ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=erc20_abi)
-        ws_balance = ws_contract.functions.balanceOf(YOUR_ADDRESS).call()
-        if ws_balance > 0:
-            print(f"Post-sell (Alg): unwrapping {ws_balance} wei of wS to native S...")
-            unwrap_native(ws_balance)
-
-    return {"status": "swapped", "tx_hash": w3.to_hex(tx_hash)}
+        pending = pending.then(lambda receipt: unwrap_swap_output(receipt, "Alg"))
+    if wait:
+        pending.result(timeout=TX_TIMEOUT)
+    return {"status": "swapped" if wait else "sent", "tx_hash": tx_hash}
 
 
-def execute_swap(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96):
+def execute_swap_v2(pool_address, zeroForOne, amountSpecified, slippage_bps=V2_SLIPPAGE_BPS, wait=True):
     """
-    Automatically detects if the pool is Uniswap or Algebra, then calls the appropriate function.
+    Executes an exact-input swap on a Uniswap V2-style or Solidly pair via executeSwapV2.
+    The output is quoted from the pair's current reserves (Solidly pairs quote themselves with
+    getAmountOut, which knows the factory fee) and lowered by slippage_bps; the pair reverts the
+    swap if its reserves moved so far that even that amount is no longer available.
+    Auto-wrap/unwrap is applied only if the spending (or output) token equals wS.
+    With wait=False it returns once the swap is broadcast; the unwrap follows when it is mined.
+    """
+    if not SWAP_EXECUTOR_V2_ADDRESS:
+        raise Exception("SWAP_EXECUTOR_V2_ADDRESS is not set.")
+    pool_address = w3.to_checksum_address(pool_address)
+    pair = read_v2_pairs(w3, [pool_address]).get(pool_address)
+    if pair is None:
+        raise Exception(f"Not a V2-style pair: {pool_address}")
+    if zeroForOne:
+        spend_token, output_token = pair["token0"], pair["token1"]
+    else:
+        spend_token, output_token = pair["token1"], pair["token0"]
+    print(f"V2 branch – spending token: {spend_token}")
+    check_and_approve(spend_token, SWAP_EXECUTOR_V2_ADDRESS, amountSpecified, wait=False)
+    if w3.to_checksum_address(spend_token) == WS_ADDRESS:
+        ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=erc20_abi)
+        current_ws_balance = ledger.balance(WS_ADDRESS, read=ws_contract.functions.balanceOf(YOUR_ADDRESS).call)
+        print(f"Current wS balance: {current_ws_balance}")
+        if current_ws_balance < amountSpecified:
+            deficit = amountSpecified - current_ws_balance
+            print(f"Insufficient wS balance. Wrapping {deficit} wei native S into wS...")
+            wrap_native(deficit, wait=False)
+    if pair["stable"] is None:
+        quoted = get_amount_out(pair, zeroForOne, amountSpecified)
+    else:
+        quoted = read_amount_out(w3, pool_address, spend_token, amountSpecified)
+    amount_out = quoted * (10000 - slippage_bps) // 10000
+    print(f"Quoted output: {quoted}, requesting {amount_out} ({slippage_bps} bps slippage)")
+    v2_executor = cached_contract(w3, SWAP_EXECUTOR_V2_ADDRESS, 'SwapExecutorV2ABI.json')
+    call = v2_executor.functions.executeSwapV2(
+        pool_address,
+        zeroForOne,
+        amountSpecified,
+        amount_out
+    )
+    pending = submit_call(call, {
+        'from': YOUR_ADDRESS,
+        'chainId': chain_id(w3),
+        **get_fees()
+    }, (SWAP_EXECUTOR_V2_ADDRESS, pool_address, direction_key(zeroForOne)), "V2 swap", 2000000,
+                          balances={spend_token: -amountSpecified},
+                          allowances={(spend_token, SWAP_EXECUTOR_V2_ADDRESS): -amountSpecified})
+    print("V2 swap tx sent. Tx hash:", pending.tx_hash)
+    tx_hash = pending.tx_hash
+    if w3.to_checksum_address(output_token) == WS_ADDRESS:
+        pending = pending.then(lambda receipt: unwrap_swap_output(receipt, "V2"))
+    if wait:
+        pending.result(timeout=TX_TIMEOUT)
+    return {"status": "swapped" if wait else "sent", "tx_hash": tx_hash}
+
+def execute_split(token_in, token_out, split, slippage_bps=V2_SLIPPAGE_BPS, wait=True):
+    """
+    Executes an order split across several pools of the token_in/token_out pair (a result of
+    orderSplitter.split_order) in one transaction via executeSplit. Every leg's quoted output
+    is lowered by slippage_bps and becomes that leg's minimum; one short leg reverts them all.
+    Auto-wrap/unwrap is applied only if the spending (or output) token equals wS.
+    With wait=False it returns once the swap is broadcast; the unwrap follows when it is mined.
+    """
+    if not SWAP_EXECUTOR_V2_ADDRESS:
+        raise Exception("SWAP_EXECUTOR_V2_ADDRESS is not set.")
+    token_in, token_out = w3.to_checksum_address(token_in), w3.to_checksum_address(token_out)
+    legs = split["legs"]
+    total_in = sum(leg["amountIn"] for leg in legs)
+    print(f"Split branch – spending {total_in} of {token_in} over {len(legs)} pools")
+    check_and_approve(token_in, SWAP_EXECUTOR_V2_ADDRESS, total_in, wait=False)
+    if token_in == WS_ADDRESS:
+        ws_contract = w3.eth.contract(address=WS_ADDRESS, abi=erc20_abi)
+        current_ws_balance = ledger.balance(WS_ADDRESS, read=ws_contract.functions.balanceOf(YOUR_ADDRESS).call)
+        print(f"Current wS balance: {current_ws_balance}")
+        if current_ws_balance < total_in:
+            deficit = total_in - current_ws_balance
+            print(f"Insufficient wS balance. Wrapping {deficit} wei native S into wS...")
+            wrap_native(deficit, wait=False)
+    amounts_out = [leg["amountOut"] * (10000 - slippage_bps) // 10000 for leg in legs]
+    for leg, amount_out in zip(legs, amounts_out):
+        print(f"  {leg['pool']}: {leg['amountIn']} in, quoted {leg['amountOut']}, minimum {amount_out}")
+    v2_executor = cached_contract(w3, SWAP_EXECUTOR_V2_ADDRESS, 'SwapExecutorV2ABI.json')
+    call = v2_executor.functions.executeSplit(
+        [w3.to_checksum_address(leg["pool"]) for leg in legs],
+        [leg["v2"] for leg in legs],
+        [leg["zeroForOne"] for leg in legs],
+        [leg["amountIn"] for leg in legs],
+        amounts_out
+    )
+    pending = submit_call(call, {
+        'from': YOUR_ADDRESS,
+        'chainId': chain_id(w3),
+        **get_fees()
+    }, (SWAP_EXECUTOR_V2_ADDRESS, "+".join(leg["pool"] for leg in legs), "split"), "Split swap", 2000000,
+                          balances={token_in: -total_in}, allowances={(token_in, SWAP_EXECUTOR_V2_ADDRESS): -total_in})
+    print("Split swap tx sent. Tx hash:", pending.tx_hash)
+    tx_hash = pending.tx_hash
+    if token_out == WS_ADDRESS:
+        pending = pending.then(lambda receipt: unwrap_swap_output(receipt, "split"))
+    if wait:
+        pending.result(timeout=TX_TIMEOUT)
+    return {"status": "swapped" if wait else "sent", "tx_hash": tx_hash}
+
+def execute_swap(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96, wait=True):
+    """
+    Automatically detects if the pool is Uniswap, Algebra or a V2-style pair, then calls the
+    appropriate function (with wait=False, returning as soon as the swap is broadcast).
     """
     pool_type = autodetect_pool_type(pool_address)
     if pool_type == "uni":
         print("Detected Uniswap pool. Routing to execute_swap_uni...")
-        return execute_swap_uni(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96)
+        return execute_swap_uni(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96, wait=wait)
     elif pool_type == "alg":
         print("Detected Algebra pool. Routing to execute_swap_alg...")
-        return execute_swap_alg(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96)
+        return execute_swap_alg(pool_address, zeroForOne, amountSpecified, sqrtPriceLimitX96, wait=wait)
+    elif pool_type == "v2":
+        print("Detected V2-style pair. Routing to execute_swap_v2 (sqrtPriceLimitX96 not used)...")
+        return execute_swap_v2(pool_address, zeroForOne, amountSpecified, wait=wait)
     else:
-        raise Exception("Could not detect pool type. Not a Uniswap or Algebra pool.")
+        raise Exception("Could not detect pool type. Not a Uniswap, Algebra or V2-style pool.")
     
 
 def create_thread():
@@ -655,7 +803,12 @@ def fetch_token_pools(chain_id, token_address):
     except Exception as e:
         print("Error fetching token pools:", e)
         return []
-    
+
+# Shared pool listing cache used by /pairinfo and the assistant's get_pair_info tool.
+pool_cache = PoolCache(fetch_token_pools, ttl=POOL_CACHE_TTL)
+# Best spread of every token looked up so far; report_arbitrage_from_pools does not filter by DEX.
+spread_index = SpreadIndex(min_liquidity=10000, allowed_dexes=None)
+
 """ def compute_effective_price(pool, token_address_lower):
     
     Given a pool and the token address (lowercase), determine the effective USD price for that token.
@@ -778,8 +931,9 @@ def get_pair_info(chain_id, token_address):
     havuz verilerini çekip arbitrage raporu oluşturur.
     """
     print(f"Fetching token pools for chain {chain_id} and token {token_address}...")
-    pools = fetch_token_pools(chain_id, token_address)
+    pools = pool_cache.get(chain_id, token_address)
     if pools:
+        spread_index.load_pools(token_address, pools)
         arbitrage_report = report_arbitrage_from_pools(pools, token_address, min_liquidity=10000)
         return arbitrage_report
     else:
@@ -807,11 +961,41 @@ def swap_endpoint():
 def pairinfo():
     chainId = request.args.get('chainId')
     tokenAddress = request.args.get('tokenAddress')
+    top = request.args.get('top')
+    if top and not tokenAddress:
+        # /pairinfo?top=5 - largest current spreads among all tokens looked up so far.
+        try:
+            top = int(top)
+        except ValueError:
+            top = -1
+        if top < 0:
+            return jsonify({"error": "top negatif olmayan bir tam sayı olmalıdır."}), 400
+        return jsonify({"result": spread_index.top_spreads(top)})
     if not chainId or not tokenAddress:
         return jsonify({"error": "chainId ve tokenAddress sorgu parametreleri gereklidir."}), 400
     result = get_pair_info(chainId, tokenAddress)
     return jsonify({"result": result})
 
+@app.route('/cachestats', methods=['GET'])
+def cachestats():
+    return jsonify(pool_cache.stats())
+
+@app.route('/callcachestats', methods=['GET'])
+def callcachestats():
+    return jsonify(call_cache.stats())
+
+@app.route('/gasfees', methods=['GET'])
+def gasfees():
+    return jsonify(gas_oracle.stats())
+
+@app.route('/gasmodelstats', methods=['GET'])
+def gasmodelstats():
+    return jsonify(gas_model.stats())
+
+@app.route('/ledgerstats', methods=['GET'])
+def ledgerstats():
+    return jsonify(ledger.stats())
+
 @app.route('/thread', methods=['GET'])
 def thread_endpoint():
     thread = create_thread()
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import rlp
+from eth_account import Account
+from web3.middleware import Web3Middleware
+
+# How many new blocks addresses touched by one of our transactions stay uncached: long
+# enough for the transaction to be mined and for the next head to be seen after it.
+DIRTY_BLOCKS = 3
+# Seconds "latest" stays mapped to the last head; about one block time. Past that the head
+# may have moved without us hearing of it (a stalled block loop), so "latest" reads bypass.
+DEFAULT_MAX_HEAD_AGE = 1.0
+
+
+def _to_int(value):
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _hex(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    return value[2:].lower() if value.startswith("0x") else value.lower()
+
+
+def _touched_addresses(raw_transaction):
+    """
+    Addresses a signed transaction can change reads for: its sender, its target and every
+    address passed as an ABI argument (the pool of a swap, the spender of an approve, ...).
+    """
+    raw = bytes.fromhex(_hex(raw_transaction))
+    if raw[0] <= 0x7f:  # typed (EIP-2718) transaction: type byte, then the RLP payload
+        fields = rlp.decode(raw[1:])
+        to, data = (fields[4], fields[6]) if raw[0] == 1 else (fields[5], fields[7])
+    else:
+        fields = rlp.decode(raw)
+        to, data = fields[3], fields[5]
+    touched = {Account.recover_transaction(raw).lower()[2:]}
+    if to:
+        touched.add(to.hex())
+    # ABI words that look like addresses: 12 zero bytes, then 20 bytes not starting with zeros
+    # (which would rather be a small number).
+    arguments = data[4:].hex()
+    for start in range(0, len(arguments) - 63, 64):
+        word = arguments[start:start + 64]
+        if word.startswith("0" * 24) and not word.startswith("0" * 32):
+            touched.add(word[24:])
+    return touched
+
+
+class BlockCallCache:
+    """
+    Block-scoped cache for eth_call and eth_getBalance, installed as web3 middleware.
+
+    Results are keyed by (block number, to, calldata) for eth_call and (block number, address)
+    for eth_getBalance; a "latest" read is keyed by the current head. The head is fed through
+    new_head() (e.g. by the TxPipeline block loop); every new head drops all entries, so nothing
+    is ever served across blocks. Until the first head is known, or once it is older than
+max_head_age seconds, "latest" reads pass through; reads at an explicit block number are
+still served.
+
+    Our own transactions (eth_sendRawTransaction through the same w3) mark their sender,
+    target and address arguments dirty for DIRTY_BLOCKS blocks: reads to or mentioning those
+    addresses (balanceOf(us), allowance(us, spender), slot0() of the swapped pool) bypass the
+    cache until the transaction has been mined and seen.
+    """
+
+    def __init__(self, max_head_age=DEFAULT_MAX_HEAD_AGE):
+        self.head = None
+        self.max_head_age = max_head_age
+        self._head_at = 0.0
+        self._entries = {}  # (block, to, calldata) or (block, address) -> RPC response
+        self._dirty = {}  # address hex (no 0x, lower case) -> last head it stays dirty for
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.invalidations = 0
+
+    def install(self, w3):
+        """Adds the cache as the innermost middleware of w3 (closest to the provider)."""
+        w3.middleware_onion.inject(lambda w3: _CallCacheMiddleware(w3, self), name="block_call_cache", layer=0)
+        return self
+
+    def new_head(self, number):
+        """
+        Moves to a new block: every cached result is dropped, expired dirty marks too. Seeing
+        the same head again only confirms it is still current.
+        """
+        with self._lock:
+            if self.head is not None and number < self.head:
+                return  # a lagging node behind a load balancer
+            self._head_at = time.monotonic()
+            if number == self.head:
+                return
+            self.head = number
+            if self._entries:
+                self.invalidations += 1
+            self._entries = {}
+            self._dirty = {a: until for a, until in self._dirty.items() if until >= number}
+
+    def mark_dirty(self, addresses):
+        with self._lock:
+            until = (self.head or 0) + DIRTY_BLOCKS
+            for address in addresses:
+                self._dirty[address] = until
+            self._entries = {k: v for k, v in self._entries.items() if not self._touches(k, addresses)}
+
+    @staticmethod
+    def _touches(key, addresses):
+        return key[1] in addresses or (len(key) == 3 and any(a in key[2] for a in addresses))
+
+    def _key(self, method, params):
+        """Cache key for a request, or None if it must go to the node."""
+        if method == "eth_call":
+            if len(params) > 2 or "to" not in params[0]:
+                return None  # state overrides, or a deployless call
+            call = params[0]
+            block = params[1] if len(params) > 1 else "latest"
+            key = (_hex(call["to"]), _hex(call.get("data") or call.get("input") or ""))
+        elif method == "eth_getBalance":
+            block = params[1] if len(params) > 1 else "latest"
+            key = (_hex(params[0]),)
+        else:
+            return None
+        if block == "latest":
+            block = self.head if time.monotonic() - self._head_at <= self.max_head_age else None
+        elif isinstance(block, int) or (isinstance(block, str) and block.startswith("0x")):
+            block = _to_int(block)
+        else:
+            block = None  # "pending", "safe", block hashes
+        if block is None:
+            return None
+        dirty = self._dirty
+        if dirty and (key[0] in dirty or (len(key) == 2 and any(a in key[1] for a in dirty))):
+            return None
+        return (block,) + key
+
+    def request(self, make_request, method, params):
+        if method == "eth_sendRawTransaction":
+            try:
+                touched = _touched_addresses(params[0])
+            except Exception:
+                touched = None
+            response = make_request(method, params)
+            if touched is None:
+                with self._lock:
+                    self._entries = {}  # undecodable: assume anything changed
+            else:
+                self.mark_dirty(touched)
+            return response
+        with self._lock:
+            key = self._key(method, params)
+            if key is None:
+                if method in ("eth_call", "eth_getBalance"):
+                    self.bypassed += 1
+                cached = None
+            else:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+                self.misses += 1
+        response = make_request(method, params)
+        if key is not None and "result" in response and "error" not in response:
+            with self._lock:
+                self._entries[key] = response
+        return response
+
+    def stats(self):
+        """Returns the cache counters and current size as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "head": self.head,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "invalidations": self.invalidations,
+                "dirty": len(self._dirty),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class _CallCacheMiddleware(Web3Middleware):
+    def __init__(self, w3, cache):
+        super().__init__(w3)
+        self.cache = cache
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            return self.cache.request(make_request, method, params)
+
+        return middleware
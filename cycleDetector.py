@@ -0,0 +1,417 @@
+import argparse
+import math
+import os
+import random
+import time
+from collections import deque
+
+from web3 import Web3
+
+from multicall import read_pool_states
+from v2Pools import quote_amounts_out, read_v2_pairs
+
+FEE_DENOMINATOR = 1_000_000
+Q96_LOG = 96 * math.log(2)
+
+# Relaxations smaller than this (in log space) are ignored, so float noise never looks like a cycle.
+EPSILON = 1e-12
+
+
+def spot_rates(sqrt_price_x96, fee):
+    """
+    Marginal exchange rates (token1 per token0, token0 per token1, raw units, after fee) of a
+    Uniswap V3 or Algebra pool at its current price. fee is in hundredths of a basis point.
+    """
+    log_price = 2 * (math.log(sqrt_price_x96) - Q96_LOG)
+    keep = 1 - fee / FEE_DENOMINATOR
+    return math.exp(log_price) * keep, math.exp(-log_price) * keep
+
+
+def reserve_rates(reserve0, reserve1, fee):
+    """Marginal exchange rates of a constant-product pair, as spot_rates."""
+    keep = 1 - fee / FEE_DENOMINATOR
+    return reserve1 / reserve0 * keep, reserve0 / reserve1 * keep
+
+
+def pool_rates(state, pool_info=None):
+    """
+    Marginal (rate0to1, rate1to0) for a pool given its state as returned by read_pool_states,
+    PoolStateTable.get or read_v2_pairs. pool_info (PoolRegistry metadata) supplies the fee
+    tier of Uniswap V3 pools. Returns None if the state does not price the pool.
+
+    The marginal rate of a stable-curve Solidly pair near balance is close to 1, which the
+    reserve ratio is not, so those pairs are priced from a tiny probe quote instead.
+    """
+    if state.get("type") == "v2":
+        if not state["reserve0"] or not state["reserve1"]:
+            return None
+        if state.get("stable"):
+            probe0, probe1 = state["reserve0"] * 1e-6, state["reserve1"] * 1e-6
+            return (float(quote_amounts_out(state, True, [probe0])[0]) / probe0,
+                    float(quote_amounts_out(state, False, [probe1])[0]) / probe1)
+        return reserve_rates(state["reserve0"], state["reserve1"], state["fee"])
+    if not state.get("sqrtPriceX96"):
+        return None
+    fee = state.get("fee")
+    if fee is None and pool_info is not None:
+        fee = pool_info.get("fee")
+    if fee is None:
+        return None
+    return spot_rates(state["sqrtPriceX96"], fee)
+
+
+class CycleDetector:
+    """
+    Finds profitable swap cycles (e.g. wS -> A -> B -> wS) in a token graph whose edges are pools,
+    weighted -log(rate) with fees included, so a cycle is profitable when its weights sum below 0.
+
+    Negative cycles are found with SPFA (queue-based Bellman-Ford) from a virtual source joined to
+    every token. The detector keeps the resulting potentials (a feasible -log price per token) and
+    a parent tree between updates. Since a negative cycle can only appear through an edge that got
+    cheaper, update_pool re-runs SPFA seeded just from that pool's tokens and only walks the part
+    of the graph whose potentials actually change, so one price change costs far less than a full
+    pass when the graph has thousands of pools.
+
+    A cycle is detected when a relaxation would make a token its own ancestor in the parent tree.
+    Its edges are then set aside (blocked) until a later update makes the cycle unprofitable, and
+    the potentials that were lowered through them are reset, so the search can continue with
+    finite potentials and one mispriced pool is not reported again in every other cycle it could
+    be part of.
+
+    Rates are marginal (spot) rates: a cycle found here is profitable for a small enough trade,
+    and its size should be worked out with the pools' actual curves (see tradeSizer.py).
+    """
+
+    def __init__(self, base_tokens=None):
+        # Reported cycles are rotated to start at the first base token they contain.
+        self.base_tokens = [Web3.to_checksum_address(t) for t in (base_tokens or [])]
+        self._potential = {}  # token -> potential (shortest -log distance from the virtual source)
+        self._parent = {}  # token -> (token, pool) edge that last lowered its potential, or None
+        self._out = {}  # token -> {(token, pool): weight}
+        self._in = {}  # token -> {(token, pool)}
+        self._children = {}  # token -> tokens whose parent edge starts at it
+        self._pool_edges = {}  # pool -> [(token_in, token_out)]
+        self._blocked = {}  # (token_in, token_out, pool) -> keys of the cycles that block that edge
+        self._cycles = {}  # cycle key -> cycle dict
+        self._cycles_by_pool = {}  # pool -> set of cycle keys
+        self.relaxations = 0
+
+    def __len__(self):
+        return len(self._pool_edges)
+
+    @property
+    def tokens(self):
+        return list(self._potential)
+
+    def cycles(self, min_profit=0.0, max_hops=None):
+        """Currently profitable cycles, best first; profit is the relative gain per unit traded."""
+        found = [c for c in self._cycles.values()
+                 if c["profit"] > min_profit and (max_hops is None or len(c["pools"]) <= max_hops)]
+        return sorted(found, key=lambda c: c["profit"], reverse=True)
+
+    def update_pool(self, pool, token0, token1, rate0to1, rate1to0):
+        """
+        Sets (or replaces) the two edges of one pool and searches only the affected part of the
+        graph. Returns the list of cycles discovered by this update.
+        """
+        return self.update_pools([(pool, token0, token1, rate0to1, rate1to0)])
+
+    def update_pools(self, updates):
+        """
+        Applies many (pool, token0, token1, rate0to1, rate1to0) updates, e.g. all Swap logs of one
+        block, followed by a single search seeded from every touched token. Addresses must be
+        checksummed, as everywhere in the registry and the multicall readers.
+        """
+        seeds = []
+        for pool, token0, token1, rate0to1, rate1to0 in updates:
+            for token_in, token_out, rate in ((token0, token1, rate0to1), (token1, token0, rate1to0)):
+                if rate is None or rate <= 0:
+                    self._drop_edge(token_in, token_out, pool)
+                    continue
+                self._set_edge(token_in, token_out, pool, -math.log(rate))
+                seeds.append(token_in)
+            self._pool_edges[pool] = [(token0, token1), (token1, token0)]
+            seeds += self._reevaluate(pool)
+        return self._search(seeds)
+
+    def remove_pool(self, pool):
+        for token_in, token_out in self._pool_edges.pop(pool, []):
+            self._drop_edge(token_in, token_out, pool)
+        self._search(self._reevaluate(pool))
+
+    def full_scan(self):
+        """Forgets all potentials and cycles and runs Bellman-Ford over the whole graph."""
+        for token in self._potential:
+            self._potential[token] = 0.0
+            self._parent[token] = None
+            self._children[token] = set()
+        self._blocked.clear()
+        self._cycles.clear()
+        self._cycles_by_pool.clear()
+        return self._search(list(self._potential))
+
+    def _add_token(self, token):
+        if token not in self._potential:
+            self._potential[token] = 0.0
+            self._parent[token] = None
+            self._out[token] = {}
+            self._in[token] = set()
+            self._children[token] = set()
+
+    def _set_parent(self, token, parent):
+        previous = self._parent[token]
+        if previous is not None:
+            self._children[previous[0]].discard(token)
+        if parent is not None:
+            self._children[parent[0]].add(token)
+        self._parent[token] = parent
+
+    def _set_edge(self, token_in, token_out, pool, weight):
+        self._add_token(token_in)
+        self._add_token(token_out)
+        old = self._out[token_in].get((token_out, pool))
+        self._out[token_in][(token_out, pool)] = weight
+        self._in[token_out].add((token_in, pool))
+        # A parent edge that got more expensive no longer bounds its child's potential; detach
+        # the child so every parent chain keeps summing to at most the potential difference.
+        if old is not None and weight > old and self._parent[token_out] == (token_in, pool):
+            self._set_parent(token_out, None)
+
+    def _drop_edge(self, token_in, token_out, pool):
+        if token_in in self._out:
+            self._out[token_in].pop((token_out, pool), None)
+            self._in[token_out].discard((token_in, pool))
+        if self._parent.get(token_out) == (token_in, pool):
+            self._set_parent(token_out, None)
+
+    def _weight(self, token_in, token_out, pool):
+        return self._out.get(token_in, {}).get((token_out, pool))
+
+    def _reevaluate(self, pool):
+        """
+        Recomputes the cycles through a changed pool. Unprofitable or broken ones are dropped and
+        their edges released; returns the tokens from which to search again.
+        """
+        seeds = []
+        for key in list(self._cycles_by_pool.get(pool, ())):
+            cycle = self._cycles[key]
+            weights = [self._weight(*edge) for edge in key]
+            if None not in weights and sum(weights) < -EPSILON:
+                cycle["weight"] = sum(weights)
+                cycle["profit"] = math.expm1(-cycle["weight"])
+                continue
+            del self._cycles[key]
+            for edge in key:
+                self._cycles_by_pool.get(edge[2], set()).discard(key)
+            for edge in key:
+                blocking = self._blocked.get(edge)
+                if blocking is not None:
+                    blocking.discard(key)
+                    if not blocking:
+                        del self._blocked[edge]
+                        seeds.append(edge[0])
+        return seeds
+
+    def _is_ancestor(self, token, descendant):
+        while descendant is not None:
+            if descendant == token:
+                return True
+            parent = self._parent[descendant]
+            descendant = parent[0] if parent else None
+        return False
+
+    def _search(self, seeds):
+        potential, out = self._potential, self._out
+        queue = deque(dict.fromkeys(seeds))
+        queued = set(queue)
+        found = []
+        while queue:
+            token_in = queue.popleft()
+            queued.discard(token_in)
+            base = potential[token_in]
+            for (token_out, pool), weight in out[token_in].items():
+                candidate = base + weight
+                if candidate >= potential[token_out] - EPSILON:
+                    continue
+                if (token_in, token_out, pool) in self._blocked:
+                    continue
+                self.relaxations += 1
+                if self._is_ancestor(token_out, token_in):
+                    key, cycle = self._record_cycle(token_in, token_out, pool)
+                    if cycle is not None:
+                        found.append(cycle)
+                    # token_in was reset too; raising a potential cannot violate its outgoing edges.
+                    for token in self._reset_below(key):
+                        if token not in queued:
+                            queue.append(token)
+                            queued.add(token)
+                    break
+                potential[token_out] = candidate
+                self._set_parent(token_out, (token_in, pool))
+                if token_out not in queued:
+                    queue.append(token_out)
+                    queued.add(token_out)
+        return found
+
+    def _record_cycle(self, token_in, token_out, pool):
+        """Walks the parent tree from token_in back to token_out and blocks the cycle's edges."""
+        edges = [(token_in, token_out, pool)]
+        token = token_in
+        while token != token_out:
+            previous, via = self._parent[token]
+            edges.append((previous, token, via))
+            token = previous
+        edges.reverse()
+        # Rotate to the first base token (else to a canonical start) so each cycle has one key.
+        starts = [i for i, edge in enumerate(edges) if edge[0] in self.base_tokens]
+        if starts:
+            start = min(starts, key=lambda i: self.base_tokens.index(edges[i][0]))
+        else:
+            start = min(range(len(edges)), key=lambda i: edges[i])
+        key = tuple(edges[start:] + edges[:start])
+        for edge in key:
+            self._blocked.setdefault(edge, set()).add(key)
+        if key in self._cycles:
+            return key, None
+        weight = sum(self._weight(*edge) for edge in key)
+        cycle = {
+            "tokens": [edge[0] for edge in key] + [key[0][0]],
+            "pools": [edge[2] for edge in key],
+            "weight": weight,
+            "profit": math.expm1(-weight),
+        }
+        self._cycles[key] = cycle
+        for edge in key:
+            self._cycles_by_pool.setdefault(edge[2], set()).add(key)
+        return key, cycle
+
+    def _reset_below(self, key):
+        """
+        Resets every token whose potential was lowered through one of the cycle's (now blocked)
+        edges, i.e. the parent-tree subtrees hanging off them. Returns the tokens with edges into
+        the reset part, from which the search recomputes it without the blocked edges.
+        """
+        stack = [token_out for token_in, token_out, pool in key if self._parent[token_out] == (token_in, pool)]
+        reset = set()
+        while stack:
+            token = stack.pop()
+            if token in reset:
+                continue
+            reset.add(token)
+            stack.extend(self._children[token])
+        for token in reset:
+            self._potential[token] = 0.0
+            self._set_parent(token, None)
+        return {token_in for token in reset for token_in, _ in self._in[token]}
+
+
+def load_registered_pools(w3, registry, detector):
+    """
+    Reads the current state of every pool in a PoolRegistry (one Multicall3 pass for V3/Algebra
+    pools, one for V2-style pairs) and adds them all to the detector.
+    """
+    pools = registry.pools()
+    v3 = {p["address"]: p for p in pools if p["type"] in ("uni", "alg")}
+    v2 = {p["address"]: p for p in pools if p["type"] == "v2"}
+    states = read_pool_states(w3, list(v3), {a: p["type"] for a, p in v3.items()}) if v3 else {}
+    states.update(read_v2_pairs(w3, list(v2), {a: p["fee"] for a, p in v2.items() if p["fee"] is not None}) if v2 else {})
+    updates = []
+    for address, state in states.items():
+        pool_info = v3.get(address) or v2.get(address)
+        rates = pool_rates(state, pool_info)
+        if rates is not None:
+            updates.append((address, pool_info["token0"], pool_info["token1"], *rates))
+    detector.update_pools(updates)
+    return states
+
+
+##############################
+# Benchmark
+##############################
+
+def _synthetic_graph(rng, n_tokens, n_pools):
+    prices = [math.exp(rng.uniform(-5, 5)) for _ in range(n_tokens)]
+    tokens = [Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(n_tokens)]
+    pools = []
+    for i in range(n_pools):
+        # Most pools quote against the first few tokens, like wS/stablecoin hubs on a real chain.
+        a = rng.randrange(min(n_tokens, 5)) if rng.random() < 0.7 else rng.randrange(n_tokens)
+        b = rng.randrange(n_tokens)
+        if a == b:
+            continue
+        pools.append((Web3.to_checksum_address("0x%040x" % (10 ** 6 + i)), tokens[a], tokens[b], prices[b] / prices[a], rng.choice((500, 3000))))
+    return tokens, pools
+
+
+def _rates(mid, fee, noise):
+    keep = 1 - fee / FEE_DENOMINATOR
+    price = mid * noise
+    return price * keep, keep / price
+
+
+def main():
+    """
+    Benchmark:  python cycleDetector.py [--tokens N] [--pools M] [--updates K]
+    Live:       python cycleDetector.py --live   (all pools in the registry, see poolRegistry.py)
+    """
+    parser = argparse.ArgumentParser(description="Detect profitable multi-hop swap cycles.")
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--pools", type=int, default=5000)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--live", action="store_true", help="Scan the pools registered in POOL_REGISTRY_PATH")
+    args = parser.parse_args()
+
+    if args.live:
+        from dotenv import load_dotenv
+        from poolRegistry import DEFAULT_REGISTRY_PATH, PoolRegistry
+
+        load_dotenv()
+        w3 = Web3(Web3.HTTPProvider(os.environ.get("RPC_URL")))
+        registry = PoolRegistry(os.environ.get("POOL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+        detector = CycleDetector(base_tokens=[os.environ.get("WS_ADDRESS", "0x039e2fB66102314Ce7b64Ce5Ce3E5183bc94aD38")])
+        load_registered_pools(w3, registry, detector)
+        print(f"{len(detector)} pools, {len(detector.tokens)} tokens")
+        for cycle in detector.cycles():
+            print(f"{cycle['profit'] * 100:.4f}%  " + " -> ".join(cycle["tokens"]) + f"  via {', '.join(cycle['pools'])}")
+        return
+
+    rng = random.Random(0)
+    tokens, pools = _synthetic_graph(rng, args.tokens, args.pools)
+    detector = CycleDetector(base_tokens=[tokens[0]])
+    started = time.perf_counter()
+    # Arbitrageurs keep real pools within about a fee of each other.
+    detector.update_pools([(address, token0, token1, *_rates(mid, fee, rng.uniform(0.9997, 1.0003)))
+                           for address, token0, token1, mid, fee in pools])
+    built = time.perf_counter()
+    print(f"{len(detector)} pools, {len(detector.tokens)} tokens: graph built in {(built - started) * 1000:.1f} ms, "
+          f"{len(detector.cycles())} profitable cycles")
+
+    relaxations = detector.relaxations
+    started = time.perf_counter()
+    found, shocked = 0, None
+    for _ in range(args.updates):
+        if shocked is not None:
+            # The previous large move has been arbitraged back.
+            address, token0, token1, mid, fee = shocked
+            noise, shocked = 1.0, None
+        else:
+            address, token0, token1, mid, fee = rng.choice(pools)
+            # Mostly small moves, occasionally a large one that opens an arbitrage.
+            noise = rng.uniform(0.9997, 1.0003)
+            if rng.random() < 0.05:
+                noise, shocked = rng.uniform(0.98, 1.02), (address, token0, token1, mid, fee)
+        found += len(detector.update_pool(address, token0, token1, *_rates(mid, fee, noise)))
+    elapsed = time.perf_counter() - started
+    print(f"{args.updates} single-pool updates: {elapsed / args.updates * 1e6:.0f} us each, "
+          f"{(detector.relaxations - relaxations) / args.updates:.1f} relaxations each, {found} cycles discovered")
+
+    started = time.perf_counter()
+    detector.full_scan()
+    print(f"full Bellman-Ford pass: {(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"{len(detector.cycles())} profitable cycles")
+    for cycle in detector.cycles(max_hops=4)[:5]:
+        print(f"  {cycle['profit'] * 100:.4f}% over {len(cycle['pools'])} hops")
+
+
+if __name__ == "__main__":
+    main()
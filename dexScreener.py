@@ -0,0 +1,176 @@
+import anyio
+import httpx
+
+DEXSCREENER_BASE_URL = "https://api.dexscreener.com"
+
+# Default cap on in-flight DexScreener requests (also the size of the keep-alive pool).
+DEFAULT_MAX_CONCURRENCY = 20
+
+# Maximum number of comma-separated addresses the /tokens/v1 endpoint accepts per request.
+MAX_TOKENS_PER_REQUEST = 30
+
+
+class DexScreenerClient:
+    """
+    Async DexScreener client that keeps one pooled keep-alive connection set open
+    for its whole lifetime, so repeated scans reuse the same TCP/TLS sessions.
+
+    Use it as an async context manager:
+
+        async with DexScreenerClient(max_concurrency=20) as client:
+            results = await client.fetch_many_token_pools("sonic", tokens)
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=10, base_url=DEXSCREENER_BASE_URL,
+                 decoder=None):
+        self.max_concurrency = max_concurrency
+        # decoder(body_bytes) -> list of pools, e.g. poolDecoder.decode_pools for typed PoolRecords.
+        # Defaults to response.json(), i.e. plain pool dicts.
+        self.decoder = decoder
+        self.request_count = 0
+        self._limiter = anyio.CapacityLimiter(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def fetch_token_pools(self, chain_id, token_address):
+        """
+        Fetch all pools for a given token address on a specified chain.
+        Endpoint: /token-pairs/v1/{chainId}//{tokenAddress}
+        Returns the same JSON array of pool objects as the synchronous fetch_token_pools,
+        or an empty list on error.
+        """
+        url = f"/token-pairs/v1/{chain_id}//{token_address}"
+        try:
+            return await self._get_json(url)  # Expected to be a JSON array of pool objects
+        except Exception as e:
+            print(f"Error fetching token pools for {token_address}:", e)
+            return []
+
+    async def fetch_tokens_batch(self, chain_id, token_addresses):
+        """
+        Fetch pools for up to MAX_TOKENS_PER_REQUEST tokens in a single request.
+        Endpoint: /tokens/v1/{chainId}/{addr1,addr2,...}
+        The combined pool list is split back out per token: a pool is assigned to every
+        requested token that appears as its base or quote token.
+        Returns a dict mapping token_address -> list of pool objects (empty on error).
+        """
+        results = {token_address: [] for token_address in token_addresses}
+        by_lower = {token_address.lower(): token_address for token_address in token_addresses}
+        url = f"/tokens/v1/{chain_id}/{','.join(token_addresses)}"
+        try:
+            pools = await self._get_json(url)
+        except Exception as e:
+            print(f"Error fetching batch of {len(token_addresses)} tokens:", e)
+            return results
+
+        for pool in pools or []:
+            for addr in set(_pool_token_addresses(pool)):
+                if addr in by_lower:
+                    results[by_lower[addr]].append(pool)
+        return results
+
+    async def fetch_many_token_pools(self, chain_id, token_addresses, on_result=None, collect=True):
+        """
+        Fetch pools for many tokens concurrently (at most max_concurrency requests in flight).
+        on_result(token_address, pools) is called as soon as each token completes, so callers
+        can start running report_arbitrage_from_pools before the slowest token is back.
+        Returns a dict mapping token_address -> list of pool objects. With collect=False the
+        dict stays empty and pools are only handed to on_result, keeping memory bounded.
+        """
+        results = {}
+
+        async def fetch_one(token_address):
+            pools = await self.fetch_token_pools(chain_id, token_address)
+            if collect:
+                results[token_address] = pools
+            if on_result is not None:
+                on_result(token_address, pools)
+
+        async with anyio.create_task_group() as tg:
+            for token_address in dict.fromkeys(token_addresses):
+                tg.start_soon(fetch_one, token_address)
+        return results
+
+    async def fetch_many_token_pools_batched(self, chain_id, token_addresses,
+                                             batch_size=MAX_TOKENS_PER_REQUEST, on_result=None, collect=True):
+        """
+        Batched variant of fetch_many_token_pools: groups tokens into /tokens/v1 requests of
+        batch_size addresses each and only falls back to the per-token /token-pairs endpoint
+        for tokens whose batch came back empty. Same return shape, on_result and collect contract.
+        """
+        batch_size = max(1, min(batch_size, MAX_TOKENS_PER_REQUEST))
+        unique_tokens = list(dict.fromkeys(token_addresses))
+        results = {}
+
+        async def fetch_one(token_address):
+            pools = await self.fetch_token_pools(chain_id, token_address)
+            if collect:
+                results[token_address] = pools
+            if on_result is not None:
+                on_result(token_address, pools)
+
+        async def fetch_batch(batch, tg):
+            batch_results = await self.fetch_tokens_batch(chain_id, batch)
+            for token_address, pools in batch_results.items():
+                if pools:
+                    if collect:
+                        results[token_address] = pools
+                    if on_result is not None:
+                        on_result(token_address, pools)
+                else:
+                    tg.start_soon(fetch_one, token_address)
+
+        async with anyio.create_task_group() as tg:
+            for i in range(0, len(unique_tokens), batch_size):
+                tg.start_soon(fetch_batch, unique_tokens[i:i + batch_size], tg)
+        return results
+
+    async def _get_json(self, url):
+        async with self._limiter:
+            self.request_count += 1
+            response = await self._client.get(url)
+        response.raise_for_status()
+        if self.decoder is not None:
+            return self.decoder(response.content)
+        return response.json()
+
+
+def _pool_token_addresses(pool):
+    """Returns the lower-cased (base, quote) addresses of a pool dict or a decoded PoolRecord."""
+    if isinstance(pool, dict):
+        return (
+            (pool.get("baseToken") or {}).get("address", "").lower(),
+            (pool.get("quoteToken") or {}).get("address", "").lower(),
+        )
+    return pool.baseAddress, pool.quoteAddress
+
+
+def fetch_many_token_pools(chain_id, token_addresses, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                           on_result=None, batched=False):
+    """
+    Synchronous wrapper around DexScreenerClient.fetch_many_token_pools for scripts.
+    Opens one pooled client, fetches every token concurrently and closes the client.
+    With batched=True the /tokens/v1 multi-address endpoint is used instead.
+    """
+    async def run():
+        async with DexScreenerClient(max_concurrency=max_concurrency) as client:
+            if batched:
+                return await client.fetch_many_token_pools_batched(chain_id, token_addresses, on_result=on_result)
+            return await client.fetch_many_token_pools(chain_id, token_addresses, on_result=on_result)
+
+    return anyio.run(run)
@@ -0,0 +1,212 @@
+import json
+import os
+import sys
+import threading
+from collections import deque
+
+from web3 import Web3
+
+DEFAULT_GAS_MODEL_PATH = "gas_model.json"
+
+SWAP_TOPIC = Web3.to_hex(Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24)"))
+# Algebra Integral 1.2 pools append the override and plugin fees; the tick is still the fifth word.
+SWAP_PLUGIN_FEE_TOPIC = Web3.to_hex(
+    Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24,uint24,uint24)")
+)
+SWAP_TOPICS = (SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC)
+
+# Receipts kept per key; older ones are forgotten so the model follows pool changes.
+MAX_SAMPLES = 200
+# A reverted transaction that used at least this share of its gas limit ran out of gas.
+OUT_OF_GAS_SHARE = 0.98
+
+
+def swap_ticks_crossed(receipt, pool_address, tick_before):
+    """
+    Ticks a swap moved the price of pool_address by: the distance from tick_before to the tick
+    in the pool's last Swap log of the receipt (Uniswap V3 and Algebra log the same event, or
+    Integral 1.2's variant with fees appended).
+    0 if the receipt has no such log.
+    """
+    pool_address = Web3.to_checksum_address(pool_address)
+    tick_after = None
+    for log in receipt["logs"]:
+        topics = log["topics"]
+        if Web3.to_checksum_address(log["address"]) == pool_address and topics and Web3.to_hex(topics[0]) in SWAP_TOPICS:
+            data = log["data"]
+            data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+            tick_after = int.from_bytes(data[128:160], "big", signed=True)
+    return 0 if tick_after is None else abs(tick_after - tick_before)
+
+
+class GasModel:
+    """
+    Gas limits learned from our own receipts instead of a flat 2,000,000.
+
+    Samples of (ticks crossed, gasUsed) are kept per key, e.g. (executor, pool, direction) for
+    a swap or (token, "approve") for an approval. A key's gas use is fitted as a line in the
+    ticks crossed (intercept plus a non-negative cost per tick, see swap_ticks_crossed), and
+    limit() returns the fitted value plus the largest residual seen, plus margin on top.
+    Without ticks_crossed the largest number seen for the key is assumed. The line is not
+    trusted beyond the samples: for more ticks than any sample crossed (or any other number, if
+    all samples crossed the same), limit() returns at least the estimate or default below.
+
+    For a key without receipts yet, limit() runs the estimate callable (eth_estimateGas) once
+    and caches its result (with margin) until the first receipt arrives; if the estimate fails,
+    e.g. because an approval sent just before is not mined yet, default is used.
+
+    observe() records a receipt and how well its limit fitted; stats() reports that accuracy.
+    A transaction that ran out of gas is learned as needing its limit plus margin, so the next
+    limit for the key is higher; other reverts are not learned.
+    With a path, samples are saved to and loaded from a JSON file so later runs start trained.
+    """
+
+    def __init__(self, path=DEFAULT_GAS_MODEL_PATH, margin=0.1):
+        self.path = path
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._samples = {}  # key -> deque of (ticks crossed, gas used)
+        self._estimates = {}  # key -> cached gas limit from eth_estimateGas
+        self.predicted = 0
+        self.extrapolated = 0
+        self.estimated = 0
+        self.defaulted = 0
+        self.observed = 0
+        self.out_of_gas = 0
+        self._errors = []  # (predicted gas - gas used) / gas used, for receipts with a prediction
+        self._usage = []  # gas used / gas limit
+        if path and os.path.exists(path):
+            with open(path, 'r') as model_file:
+                stored = json.load(model_file)
+            for key, samples in stored.items():
+                self._samples[tuple(key.split(":"))] = deque((tuple(s) for s in samples), maxlen=MAX_SAMPLES)
+
+    def _fit(self, samples):
+        """Least-squares line gas = a + b * ticks (b >= 0) and the largest positive residual."""
+        n = len(samples)
+        mean_t = sum(t for t, _ in samples) / n
+        mean_g = sum(g for _, g in samples) / n
+        var_t = sum((t - mean_t) ** 2 for t, _ in samples)
+        slope = max(sum((t - mean_t) * (g - mean_g) for t, g in samples) / var_t, 0.0) if var_t else 0.0
+        intercept = mean_g - slope * mean_t
+        residual = max(g - (intercept + slope * t) for t, g in samples)
+        return intercept, slope, max(residual, 0.0)
+
+    def predict(self, key, ticks_crossed=None):
+        """Expected gasUsed for key (without margin), or None if it has no receipts yet."""
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if not samples:
+            return None
+        if ticks_crossed is None:
+            ticks_crossed = max(t for t, _ in samples)
+        intercept, slope, _ = self._fit(samples)
+        return intercept + slope * ticks_crossed
+
+    def limit(self, key, ticks_crossed=None, estimate=None, default=2000000):
+        """Gas limit for a transaction of key; see the class docstring for the fallbacks."""
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+            cached = self._estimates.get(key)
+        if samples:
+            sampled = {t for t, _ in samples}
+            if ticks_crossed is None:
+                ticks_crossed = max(sampled)
+            intercept, slope, residual = self._fit(samples)
+            self.predicted += 1
+            fitted = int((intercept + slope * ticks_crossed + residual) * (1 + self.margin))
+            if ticks_crossed <= max(sampled) and (len(sampled) > 1 or ticks_crossed in sampled):
+                return fitted
+            self.extrapolated += 1
+            if cached is None:
+                cached = self._estimate(key, estimate)
+            return max(fitted, cached if cached is not None else default)
+        if cached is not None:
+            self.estimated += 1
+            return cached
+        gas = self._estimate(key, estimate)
+        if gas is not None:
+            with self._lock:
+                self._estimates[key] = gas
+            self.estimated += 1
+            return gas
+        self.defaulted += 1
+        return default
+
+    def _estimate(self, key, estimate):
+        """estimate() with margin, or None if there is no estimate or it fails."""
+        if estimate is None:
+            return None
+        try:
+            return int(estimate() * (1 + self.margin))
+        except Exception as e:
+            print(f"Gas estimate for {':'.join(key)} failed ({e})", file=sys.stderr)
+            return None
+
+    def observe(self, key, receipt, gas_limit, ticks_crossed=0):
+        """Records a mined transaction of key sent with gas_limit; see the class docstring for reverts."""
+        gas_used = receipt["gasUsed"]
+        predicted = self.predict(key, ticks_crossed)
+        with self._lock:
+            self.observed += 1
+            self._usage.append(gas_used / gas_limit)
+            if receipt["status"] != 1:
+                if gas_used < gas_limit * OUT_OF_GAS_SHARE:
+                    return
+                self.out_of_gas += 1
+                gas_used = int(gas_limit * (1 + self.margin))
+                print(f"{':'.join(key)} ran out of gas at limit {gas_limit}; learning {gas_used}", file=sys.stderr)
+            elif predicted is not None:
+                self._errors.append((predicted - gas_used) / gas_used)
+            self._samples.setdefault(key, deque(maxlen=MAX_SAMPLES)).append((ticks_crossed, gas_used))
+            self._estimates.pop(key, None)
+        if self.path:
+            self.save()
+
+    def watch(self, pending, key, gas_limit, pool_address=None, tick_before=None, ticks_crossed=None):
+        """
+        Observes a PendingTx once it is mined. For a swap, pool_address and the pool's tick
+        before it (tick_before) give the ticks crossed from the receipt's Swap log;
+        ticks_crossed (the number the limit was computed for) stands in for a reverted swap,
+        which has no Swap log.
+        """
+        def record(future):
+            if future.exception() is not None:
+                return
+            receipt = future.result()
+            if receipt["status"] != 1 and ticks_crossed is not None:
+                ticks = ticks_crossed
+            elif pool_address and tick_before is not None:
+                ticks = swap_ticks_crossed(receipt, pool_address, tick_before)
+            else:
+                ticks = 0
+            self.observe(key, receipt, gas_limit, ticks)
+
+        pending.add_done_callback(record)
+        return pending
+
+    def save(self):
+        """Writes the samples to path (atomically, via a temporary file)."""
+        with self._lock:
+            stored = {":".join(key): list(samples) for key, samples in self._samples.items()}
+        with open(self.path + ".tmp", 'w') as model_file:
+            json.dump(stored, model_file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def stats(self):
+        """Prediction accuracy and limit usage over the observed receipts, as a dict."""
+        with self._lock:
+            errors, usage = list(self._errors), list(self._usage)
+            return {
+                "keys": len(self._samples),
+                "predicted": self.predicted,
+                "extrapolated": self.extrapolated,
+                "estimated": self.estimated,
+                "defaulted": self.defaulted,
+                "observed": self.observed,
+                "out_of_gas": self.out_of_gas,
+                "mean_abs_error": sum(abs(e) for e in errors) / len(errors) if errors else None,
+                "max_under_prediction": -min(min(errors), 0.0) if errors else None,
+                "mean_limit_used": sum(usage) / len(usage) if usage else None,
+                "margin": self.margin,
+            }
@@ -0,0 +1,120 @@
+import statistics
+import sys
+import threading
+import time
+
+# Priority fee percentiles read from eth_feeHistory, by how fast a transaction should land.
+PERCENTILES = {"slow": 10, "normal": 50, "fast": 90}
+DEFAULT_HISTORY_BLOCKS = 20
+# Seconds the fees are served without a new head before fees() refreshes them itself.
+DEFAULT_MAX_AGE = 10.0
+
+
+class GasOracle:
+    """
+    EIP-1559 fee parameters for the next block, refreshed once per block and served from memory.
+
+    on_head(number) (e.g. from the TxPipeline block loop) wakes a background thread that reads
+    eth_feeHistory over the last history_blocks blocks: the next block's base fee, and the
+    10th/50th/90th percentile priority fees paid in each of them. The priority fee for a speed
+    is the median of that percentile over the blocks that had transactions, at least
+    min_priority_fee, so quiet blocks do not push it up. maxFeePerGas leaves room for the base
+    fee to rise (base_fee_multiplier x base fee + priority fee); only base fee + priority fee is
+    actually paid.
+
+    fees() returns the fields to put into a transaction without an RPC call. It refreshes
+    inline only before the first head or if no head came for max_age seconds. On a chain
+    without a base fee it falls back to a legacy gasPrice with a 10% buffer.
+    """
+
+    def __init__(self, w3, history_blocks=DEFAULT_HISTORY_BLOCKS, base_fee_multiplier=2, min_priority_fee=1,
+                 max_age=DEFAULT_MAX_AGE):
+        self.w3 = w3
+        self.history_blocks = history_blocks
+        self.base_fee_multiplier = base_fee_multiplier
+        self.min_priority_fee = min_priority_fee
+        self.max_age = max_age
+        self.block = None
+        self.base_fee = None
+        self.priority_fees = {}
+        self.gas_price = None  # set instead of base_fee/priority_fees on a legacy chain
+        self.refreshes = 0
+        self._updated_at = 0.0
+        self._lock = threading.Lock()
+        self._head = None  # last head a refresh was scheduled for
+        self._wake = threading.Event()
+        self._thread = None
+
+    def on_head(self, number):
+        """Schedules a refresh for a new block on the oracle's own thread and returns at once."""
+        if self._head is not None and number <= self._head:
+            return
+        self._head = number
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gas-oracle", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Gas oracle: refresh failed ({e!r}), keeping the last fees", file=sys.stderr)
+
+    def refresh(self):
+        """Reads eth_feeHistory (or eth_gasPrice on a legacy chain) and updates the fees."""
+        history = self.w3.eth.fee_history(self.history_blocks, "latest", list(PERCENTILES.values()))
+        base_fees = history.get("baseFeePerGas") or []
+        block = history["oldestBlock"] + len(history["gasUsedRatio"]) - 1
+        if not base_fees or base_fees[-1] == 0:
+            gas_price = self.w3.eth.gas_price
+            with self._lock:
+                self.block, self.gas_price = block, gas_price
+                self._updated_at = time.monotonic()
+                self.refreshes += 1
+            return
+
+        # Empty blocks report zero rewards; they say nothing about what it takes to get in.
+        rewards = [reward for reward, used in zip(history.get("reward") or [], history["gasUsedRatio"]) if used > 0]
+        priority_fees = {}
+        for i, speed in enumerate(PERCENTILES):
+            paid = [reward[i] for reward in rewards if len(reward) > i]
+            priority_fees[speed] = max(int(statistics.median(paid)) if paid else 0, self.min_priority_fee)
+        with self._lock:
+            self.block = block
+            self.base_fee = base_fees[-1]  # the base fee of the block after the newest one
+            self.priority_fees = priority_fees
+            self.gas_price = None
+            self._updated_at = time.monotonic()
+            self.refreshes += 1
+
+    def fees(self, speed="normal"):
+        """
+        Fee fields for a transaction: maxFeePerGas and maxPriorityFeePerGas (a type-2
+        transaction), or gasPrice on a legacy chain. speed is "slow", "normal" or "fast".
+        """
+        if self.block is None or time.monotonic() - self._updated_at > self.max_age:
+            self.refresh()
+        with self._lock:
+            if self.gas_price is not None:
+                return {"gasPrice": int(self.gas_price * 1.1)}
+            priority_fee = self.priority_fees[speed]
+            return {
+                "maxFeePerGas": self.base_fee * self.base_fee_multiplier + priority_fee,
+                "maxPriorityFeePerGas": priority_fee,
+            }
+
+    def stats(self):
+        """Returns the current base fee, priority fees and refresh counters as a dict."""
+        with self._lock:
+            return {
+                "block": self.block,
+                "base_fee": self.base_fee,
+                "priority_fees": dict(self.priority_fees),
+                "gas_price": self.gas_price,
+                "refreshes": self.refreshes,
+                "age": time.monotonic() - self._updated_at if self.block is not None else None,
+            }
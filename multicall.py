@@ -0,0 +1,137 @@
+import os
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+# Multicall3 is deployed at the same address on Sonic and most EVM chains.
+# Override with MULTICALL3_ADDRESS in .env, e.g. for a local test chain.
+DEFAULT_MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# Keep each aggregate3 eth_call comfortably below common RPC request size limits.
+DEFAULT_MAX_CALLDATA_BYTES = 64 * 1024
+
+AGGREGATE3_SELECTOR = bytes(Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4])
+
+
+def selector(signature):
+    """Returns the 4-byte function selector for a signature such as 'slot0()'."""
+    return bytes(Web3.keccak(text=signature)[:4])
+
+
+SLOT0 = selector("slot0()")
+GLOBAL_STATE = selector("globalState()")
+TOKEN0 = selector("token0()")
+TOKEN1 = selector("token1()")
+LIQUIDITY = selector("liquidity()")
+
+
+def multicall3_address(multicall_address=None):
+    """The Multicall3 address to use: the one given, MULTICALL3_ADDRESS from .env, or the default."""
+    return Web3.to_checksum_address(
+        multicall_address or os.environ.get("MULTICALL3_ADDRESS") or DEFAULT_MULTICALL3_ADDRESS
+    )
+
+
+def _encoded_call_size(call_data):
+    """Approximate ABI-encoded size of one Call3 tuple inside aggregate3's calldata."""
+    return 5 * 32 + (len(call_data) + 31) // 32 * 32
+
+
+def aggregate3(w3, calls, multicall_address=None, block_identifier="latest",
+               max_calldata_bytes=DEFAULT_MAX_CALLDATA_BYTES):
+    """
+    Executes many read-only calls through Multicall3.aggregate3 with allowFailure=true.
+
+    calls is a list of (target_address, call_data_bytes). The calls are split into chunks of at
+    most max_calldata_bytes of encoded calldata, and each chunk costs one eth_call.
+    Returns a list of (success, return_data) in the same order as calls; a reverted call
+    yields (False, revert_data) instead of failing the whole batch.
+    """
+    multicall_address = multicall3_address(multicall_address)
+    chunks, current, current_size = [], [], 0
+    for target, call_data in calls:
+        size = _encoded_call_size(call_data)
+        if current and current_size + size > max_calldata_bytes:
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append((Web3.to_checksum_address(target), True, bytes(call_data)))
+        current_size += size
+    if current:
+        chunks.append(current)
+
+    results = []
+    for chunk in chunks:
+        payload = AGGREGATE3_SELECTOR + encode(["(address,bool,bytes)[]"], [chunk])
+        raw = w3.eth.call({"to": multicall_address, "data": payload}, block_identifier)
+        (chunk_results,) = decode(["(bool,bytes)[]"], bytes(raw))
+        results.extend((success, bytes(data)) for success, data in chunk_results)
+    return results
+
+
+def _decode_address(data):
+    if len(data) < 32:
+        return None
+    return Web3.to_checksum_address(decode(["address"], data[:32])[0])
+
+
+def _decode_price_and_tick(data):
+    """
+    Decodes the leading (uint160 price, int24 tick) words shared by Uniswap V3 slot0() and
+    Algebra globalState(). Trailing fields differ between forks, so only the head is decoded.
+    """
+    if len(data) < 64:
+        return None
+    sqrt_price, tick = decode(["uint160", "int24"], data[:64])
+    if sqrt_price == 0:
+        return None
+    return sqrt_price, tick
+
+
+def read_pool_states(w3, pool_addresses, pool_types=None, block_identifier="latest", **kwargs):
+    """
+    Reads the state of many pools in one (or a few, when chunked) Multicall3 round trips.
+
+    For each pool this batches token0(), token1(), liquidity() and the price getter: slot0()
+    for Uniswap V3-style pools and globalState() for Algebra pools. When a pool's type is not
+    given in pool_types (a dict of address -> "uni"/"alg"), both getters are probed in the same
+    batch and whichever succeeds determines the type.
+
+    Returns a dict mapping checksum pool address -> {
+        "type": "uni" | "alg" | None, "sqrtPriceX96", "tick", "fee" (Algebra only, else None),
+        "token0", "token1", "liquidity"
+    }, with None for any field whose call reverted.
+    """
+    pool_types = {Web3.to_checksum_address(a): t for a, t in (pool_types or {}).items()}
+    pools = [Web3.to_checksum_address(a) for a in dict.fromkeys(pool_addresses)]
+
+    calls, layout = [], []
+    for pool in pools:
+        pool_type = pool_types.get(pool)
+        getters = {"uni": [SLOT0], "alg": [GLOBAL_STATE]}.get(pool_type, [SLOT0, GLOBAL_STATE])
+        start = len(calls)
+        for call_data in getters + [TOKEN0, TOKEN1, LIQUIDITY]:
+            calls.append((pool, call_data))
+        layout.append((pool, start, getters))
+
+    results = aggregate3(w3, calls, block_identifier=block_identifier, **kwargs)
+
+    states = {}
+    for pool, start, getters in layout:
+        state = {"type": None, "sqrtPriceX96": None, "tick": None, "fee": None}
+        for offset, getter in enumerate(getters):
+            success, data = results[start + offset]
+            decoded = _decode_price_and_tick(data) if success else None
+            if decoded is None:
+                continue
+            state["type"] = "uni" if getter == SLOT0 else "alg"
+            state["sqrtPriceX96"], state["tick"] = decoded
+            if getter == GLOBAL_STATE and len(data) >= 96:
+                state["fee"] = decode(["uint16"], data[64:96])[0]
+            break
+        tail = start + len(getters)
+        (ok0, data0), (ok1, data1), (ok_liq, data_liq) = results[tail:tail + 3]
+        state["token0"] = _decode_address(data0) if ok0 else None
+        state["token1"] = _decode_address(data1) if ok1 else None
+        state["liquidity"] = decode(["uint128"], data_liq[:32])[0] if ok_liq and len(data_liq) >= 32 else None
+        states[pool] = state
+    return states
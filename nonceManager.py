@@ -0,0 +1,116 @@
+import heapq
+import threading
+
+from web3.exceptions import TransactionNotFound
+
+# Node error messages meaning the nonce was already used (by another sender or process).
+NONCE_TOO_LOW = ("nonce too low", "already been used", "replacement transaction underpriced")
+# The exact transaction is already in the node's pool: a retried broadcast, not a failure.
+ALREADY_KNOWN = ("already known", "known transaction")
+
+
+class NonceManager:
+    """
+    Hands out transaction nonces for one account from a local counter, so several
+    transactions (an approve, a wrap and a swap, or concurrent senders on other threads) can
+    be signed and broadcast back-to-back without a get_transaction_count round trip or a
+    receipt wait in between; the node orders them by nonce and they can land in one block.
+
+    The counter starts at the node's pending transaction count. A nonce whose broadcast
+    failed is released and reused by the next sender, so no gap blocks the transactions
+    behind it. reconcile() catches up with the chain: it forgets mined transactions, reuses
+    the nonces of transactions the node dropped, and jumps ahead if the account sent
+    transactions from elsewhere.
+    """
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = w3.to_checksum_address(address)
+        self._lock = threading.Lock()
+        self._next = None
+        self._gaps = []  # released nonces below _next, handed out first (min-heap)
+        self._in_flight = {}  # nonce -> tx hash, broadcast but not yet seen mined
+
+    def sync(self):
+        """Resets the counter to the node's pending transaction count."""
+        count = self.w3.eth.get_transaction_count(self.address, "pending")
+        with self._lock:
+            self._next = count
+            self._gaps = []
+            self._in_flight = {n: h for n, h in self._in_flight.items() if n < count}
+        return count
+
+    def next_nonce(self):
+        """Reserves the lowest free nonce; release() it if the transaction is not sent."""
+        if self._next is None:
+            self.sync()
+        with self._lock:
+            if self._gaps:
+                return heapq.heappop(self._gaps)
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce):
+        """Returns an unused nonce, so the next transaction fills its place."""
+        with self._lock:
+            self._in_flight.pop(nonce, None)
+            if nonce == self._next - 1:
+                self._next -= 1
+            elif nonce < self._next and nonce not in self._gaps:
+                heapq.heappush(self._gaps, nonce)
+
+    def reconcile(self):
+        """
+        Catches up with the chain: mined nonces are forgotten, nonces of broadcast transactions
+        the node no longer knows (dropped from its pool) are released for reuse, and the counter
+        moves up to the node's pending count if transactions were sent from outside this manager.
+        Returns the list of dropped nonces.
+        """
+        mined = self.w3.eth.get_transaction_count(self.address, "latest")
+        pending = self.w3.eth.get_transaction_count(self.address, "pending")
+        with self._lock:
+            waiting = {n: h for n, h in self._in_flight.items() if n >= mined}
+        dropped = []
+        for nonce, tx_hash in sorted(waiting.items()):
+            try:
+                self.w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                dropped.append(nonce)
+        with self._lock:
+            self._in_flight = {n: h for n, h in self._in_flight.items() if n >= mined}
+            self._gaps = [n for n in self._gaps if n >= mined]
+            if self._next is None or pending > self._next:
+                self._next = pending
+                self._gaps = []
+            heapq.heapify(self._gaps)
+        for nonce in dropped:
+            print(f"Transaction with nonce {nonce} was dropped; its nonce will be reused.")
+            self.release(nonce)
+        return dropped
+
+    def send(self, tx, private_key):
+        """
+        Fills in the nonce, signs and broadcasts tx; returns the tx hash without waiting for a
+        receipt. If the nonce turns out to be taken already, reconciles with the chain and
+        retries once with a fresh one; any other failure releases the nonce and is raised.
+        """
+        for attempt in range(2):
+            nonce = self.next_nonce()
+            signed = self.w3.eth.account.sign_transaction(dict(tx, nonce=nonce), private_key=private_key)
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                message = str(e).lower()
+                if any(m in message for m in ALREADY_KNOWN):
+                    tx_hash = signed.hash
+                elif attempt == 0 and any(m in message for m in NONCE_TOO_LOW):
+                    print(f"Nonce {nonce} already used; reconciling with the chain.")
+                    self.reconcile()
+                    continue
+                else:
+                    self.release(nonce)
+                    raise
+            with self._lock:
+                self._in_flight[nonce] = tx_hash
+            return tx_hash
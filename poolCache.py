@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class PoolCache:
+    """
+    Thread-safe in-process cache for DexScreener pool listings keyed by (chain_id, token_address).
+
+    - Entries younger than `ttl` seconds are served directly (hit).
+    - Entries older than `ttl` but younger than `ttl + stale_ttl` are served immediately while
+      a single background refresh is started (stale-while-revalidate).
+    - Anything older, or missing, is fetched synchronously (miss). Concurrent misses for the
+      same key share one upstream fetch (single-flight).
+    - At most `max_size` entries are kept; the least recently used entry is evicted first.
+
+    `fetch_fn(chain_id, token_address)` must return a list of pool objects, an empty list
+    meaning the fetch failed (empty results are returned but never cached).
+    """
+
+    def __init__(self, fetch_fn, ttl=15, stale_ttl=120, max_size=1024):
+        self.fetch_fn = fetch_fn
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (fetched_at, pools)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, chain_id, token_address):
+        """Returns the pool list for the token, fetching or refreshing it as needed."""
+        key = (chain_id.lower(), token_address.lower())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                fetched_at, pools = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return pools
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._in_flight:
+                        self._in_flight[key] = Future()
+                        self.refreshes += 1
+                        threading.Thread(
+                            target=self._fetch, args=(key, chain_id, token_address), daemon=True
+                        ).start()
+                    return pools
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+                leader = True
+
+        if leader:
+            self._fetch(key, chain_id, token_address)
+        return future.result()
+
+    def invalidate(self, chain_id, token_address):
+        """Drops the cached entry for one token so the next get() refetches it."""
+        with self._lock:
+            self._entries.pop((chain_id.lower(), token_address.lower()), None)
+
+    def stats(self):
+        """Returns the cache counters and current size as a dict."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "hit_rate": (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+    def _fetch(self, key, chain_id, token_address):
+        """Runs one upstream fetch for key and resolves the in-flight future with the result."""
+        try:
+            pools = self.fetch_fn(chain_id, token_address)
+        except Exception as e:
+            print(f"Error refreshing pool cache for {token_address}:", e)
+            pools = []
+
+        with self._lock:
+            future = self._in_flight.pop(key)
+            if pools:
+                self._entries[key] = (time.monotonic(), pools)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.errors += 1
+                # Keep serving the previous listing if a background refresh failed.
+                entry = self._entries.get(key)
+                if entry is not None:
+                    pools = entry[1]
+        future.set_result(pools)
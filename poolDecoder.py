@@ -0,0 +1,204 @@
+import json
+import random
+import re
+import time
+import tracemalloc
+from typing import Annotated, Optional
+
+from pydantic import AliasPath, Field, StringConstraints, TypeAdapter, ValidationError, WrapValidator
+from pydantic.dataclasses import dataclass
+
+LowerStr = Annotated[str, StringConstraints(to_lower=True)]
+
+
+@dataclass(frozen=True, slots=True)
+class PoolRecord:
+    """
+    Compact typed view of one DexScreener pool holding only the fields the arbitrage checks use.
+    Defaults mirror the .get(...) fallbacks in report_arbitrage_from_pools; base/quote addresses
+    are stored lower-cased.
+    """
+    dexId: str = "unknown"
+    pairAddress: str = "unknown"
+    priceUsd: float = 0.0
+    liquidityUsd: float = Field(0.0, validation_alias=AliasPath("liquidity", "usd"))
+    baseAddress: LowerStr = Field("", validation_alias=AliasPath("baseToken", "address"))
+    baseSymbol: str = Field("N/A", validation_alias=AliasPath("baseToken", "symbol"))
+    baseName: str = Field("Unknown Token", validation_alias=AliasPath("baseToken", "name"))
+    quoteAddress: LowerStr = Field("", validation_alias=AliasPath("quoteToken", "address"))
+    quoteSymbol: str = Field("N/A", validation_alias=AliasPath("quoteToken", "symbol"))
+
+
+def _drop_invalid(value, handler):
+    """Validates one pool, turning a malformed pool into None instead of failing the whole list."""
+    try:
+        return handler(value)
+    except ValidationError:
+        return None
+
+
+_pool_list_adapter = TypeAdapter(list[Annotated[Optional[PoolRecord], WrapValidator(_drop_invalid)]])
+_pool_adapter = TypeAdapter(Annotated[Optional[PoolRecord], WrapValidator(_drop_invalid)])
+
+
+def decode_pools(body):
+    """
+    Decodes a DexScreener JSON array (bytes or str) straight into a list of PoolRecord.
+    The body is parsed (by pydantic-core's built-in jiter parser) and validated in one pass:
+    fields outside PoolRecord never become Python objects, and malformed pools are dropped.
+    Raises ValueError if the body is not a JSON array.
+    """
+    try:
+        records = _pool_list_adapter.validate_json(body)
+    except ValidationError as e:
+        raise ValueError(f"DexScreener response is not a pool list: {e}") from None
+    return [record for record in records if record is not None]
+
+
+def decode_pools_partial(body):
+    """
+    Decodes a possibly truncated DexScreener JSON array, e.g. a body cut off by a timeout.
+    Every complete pool is returned; the trailing incomplete pool is ignored.
+    """
+    return StreamingPoolDecoder().feed(body if isinstance(body, bytes) else body.encode())
+
+
+class StreamingPoolDecoder:
+    """
+    Incremental decoder for a DexScreener JSON array arriving in chunks (e.g. httpx aiter_bytes).
+    feed(chunk) returns the PoolRecords completed by that chunk, so pools can be evaluated
+    before the body has finished downloading. Only the unfinished tail is kept in memory.
+    Element boundaries are found with a Python-level scan, so this trades throughput for
+    latency; use decode_pools when the whole body is already available.
+    """
+
+    # A whole JSON string (possibly cut off by the end of the buffer) or a single bracket.
+    _token = re.compile(rb'"(?:[^"\\]|\\.)*(")?|[{}\[\]]')
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._element_start = None
+        self.rejected = 0
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        buffer = self._buffer
+        records = []
+        consumed = 0
+        while True:
+            match = self._token.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                break
+            i = match.start()
+            char = buffer[i]
+            if char == 0x22:  # string
+                if match.group(1) is None:
+                    break  # unterminated string: rescan it once more data has arrived
+                self._pos = match.end()
+                continue
+            self._pos = i + 1
+            if char == 0x7B or char == 0x5B:  # { [
+                self._depth += 1
+                if self._depth == 2 and char == 0x7B:
+                    self._element_start = i
+            else:  # } ]
+                self._depth -= 1
+                if self._depth == 1 and char == 0x7D and self._element_start is not None:
+                    record = _pool_adapter.validate_json(bytes(buffer[self._element_start:i + 1]))
+                    if record is None:
+                        self.rejected += 1
+                    else:
+                        records.append(record)
+                    self._element_start = None
+                    consumed = i + 1
+
+        if consumed:
+            del buffer[:consumed]
+            self._pos -= consumed
+            if self._element_start is not None:
+                self._element_start -= consumed
+        return records
+
+
+##############################
+# Benchmark
+##############################
+
+def _synthetic_pool(rng):
+    """Builds a pool object with the full field set DexScreener returns for a real pair."""
+    def address():
+        return "0x" + "".join(rng.choice("0123456789abcdefABCDEF") for _ in range(40))
+
+    base_address, quote_address, pair_address = address(), address(), address()
+    return {
+        "chainId": "sonic",
+        "dexId": rng.choice(["shadow-exchange", "swapx", "wagmi", "silverswap", "spookyswap", "sushiswap"]),
+        "url": f"https://dexscreener.com/sonic/{pair_address.lower()}",
+        "pairAddress": pair_address,
+        "labels": ["v3"],
+        "baseToken": {"address": base_address, "name": "Synthetic Token", "symbol": "SYN"},
+        "quoteToken": {"address": quote_address, "name": "Wrapped Sonic", "symbol": "wS"},
+        "priceNative": f"{rng.uniform(0.001, 10):.8f}",
+        "priceUsd": f"{rng.uniform(0.001, 10):.8f}",
+        "txns": {period: {"buys": rng.randint(0, 5000), "sells": rng.randint(0, 5000)}
+                 for period in ("m5", "h1", "h6", "h24")},
+        "volume": {period: rng.uniform(0, 1e6) for period in ("h24", "h6", "h1", "m5")},
+        "priceChange": {period: rng.uniform(-50, 50) for period in ("m5", "h1", "h6", "h24")},
+        "liquidity": {"usd": rng.uniform(0, 1e6), "base": rng.uniform(0, 1e9), "quote": rng.uniform(0, 1e6)},
+        "fdv": rng.uniform(0, 1e9),
+        "marketCap": rng.uniform(0, 1e9),
+        "pairCreatedAt": rng.randint(1_700_000_000_000, 1_740_000_000_000),
+        "info": {
+            "imageUrl": f"https://dd.dexscreener.com/ds-data/tokens/sonic/{base_address.lower()}.png",
+            "header": f"https://dd.dexscreener.com/ds-data/tokens/sonic/{base_address.lower()}/header.png",
+            "openGraph": f"https://cdn.dexscreener.com/token-images/og/sonic/{base_address.lower()}",
+            "websites": [{"label": "Website", "url": "https://example.org"}],
+            "socials": [{"type": "twitter", "url": "https://x.com/example"},
+                        {"type": "telegram", "url": "https://t.me/example"}],
+        },
+    }
+
+
+def _measure(decode, body):
+    """Returns (record count, best-of-3 wall time, peak traced memory) for one decode path."""
+    elapsed = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        result = decode(body)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    del result
+    # Timed separately: tracemalloc itself slows allocation-heavy code down considerably.
+    tracemalloc.start()
+    count = len(decode(body))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'pools':>7} | {'body':>9} | {'json.loads':>22} | {'decode_pools':>22} | {'streaming (64 KiB)':>22}")
+    print("-" * 96)
+    for n_pools in (100, 1000, 10000):
+        body = json.dumps([_synthetic_pool(rng) for _ in range(n_pools)]).encode()
+
+        def stream(data):
+            decoder = StreamingPoolDecoder()
+            records = []
+            for offset in range(0, len(data), 65536):
+                records.extend(decoder.feed(data[offset:offset + 65536]))
+            return records
+
+        columns = []
+        for decode in (json.loads, decode_pools, stream):
+            count, elapsed, peak = _measure(decode, body)
+            assert count == n_pools
+            columns.append(f"{elapsed * 1000:8.1f} ms {peak / 1024 / 1024:7.2f} MiB")
+        print(f"{n_pools:>7} | {len(body) / 1024 / 1024:6.2f} MiB | " + " | ".join(f"{c:>22}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+from web3 import Web3
+
+from multicall import GLOBAL_STATE, SLOT0, selector
+
+# EVM opcodes used by the probe program (PUSHn is PUSH1 + n - 1).
+GT, ISZERO, AND = 0x11, 0x15, 0x16
+RETURNDATASIZE, EXTCODEHASH = 0x3D, 0x3F
+POP, MSTORE = 0x50, 0x52
+PUSH1, DUP1, DUP5 = 0x60, 0x80, 0x84
+RETURN, STATICCALL = 0xF3, 0xFA
+
+# keccak256 of empty bytecode: the EXTCODEHASH of an account that exists but has no code.
+EMPTY_CODE_HASH = "0x" + bytes(Web3.keccak(b"")).hex()
+NO_ACCOUNT_HASH = "0x" + "00" * 32
+
+GET_RESERVES = selector("getReserves()")
+
+# Gas forwarded to each probed getter; slot0()/globalState()/getReserves() cost a few thousand.
+PROBE_GAS = 30_000
+
+# Output layout: one 128-byte record per address, written after the three selector words.
+SELECTORS_OFFSET = 0x40
+OUTPUT_OFFSET = 0xA0
+RECORD_SIZE = 128
+
+# EIP-3860 caps init code at 49152 bytes; each address adds 118 bytes of program.
+DEFAULT_MAX_ADDRESSES = 256
+
+
+def _push(value, width):
+    return bytes([PUSH1 + width - 1]) + value.to_bytes(width, "big")
+
+
+def _probe_getter(selector_offset, result_offset):
+    """
+    Emits: result = staticcall(PROBE_GAS, addr, selector_offset, 4, 0, 64) succeeded
+                    && returndatasize >= 64
+    with the probed address on top of the stack (left untouched). The returned values are
+    not looked at: an uninitialized pool (price 0) or an empty pair (reserves 0) is still a pool.
+    """
+    return b"".join([
+        _push(0x40, 1), _push(0x00, 1), _push(0x04, 1), _push(selector_offset, 1),
+        bytes([DUP5]), _push(PROBE_GAS, 3), bytes([STATICCALL]),
+        bytes([RETURNDATASIZE]), _push(0x40, 1), bytes([GT, ISZERO, AND]),
+        _push(result_offset, 2), bytes([MSTORE]),
+    ])
+
+
+def build_probe_code(addresses):
+    """
+    Builds init code that, executed by a plain eth_call without a "to" address, returns for
+    each address (in order) four words: EXTCODEHASH, slot0() answered, globalState() answered,
+    getReserves() answered. Nothing is deployed; the "constructor" just returns the results as its output.
+    """
+    code = [
+        _push(int.from_bytes(SLOT0.ljust(32, b"\0"), "big"), 32), _push(SELECTORS_OFFSET, 1), bytes([MSTORE]),
+        _push(int.from_bytes(GLOBAL_STATE.ljust(32, b"\0"), "big"), 32), _push(SELECTORS_OFFSET + 0x20, 1), bytes([MSTORE]),
+        _push(int.from_bytes(GET_RESERVES.ljust(32, b"\0"), "big"), 32), _push(SELECTORS_OFFSET + 0x40, 1), bytes([MSTORE]),
+    ]
+    for i, address in enumerate(addresses):
+        record = OUTPUT_OFFSET + i * RECORD_SIZE
+        code += [
+            _push(int(address, 16), 20),
+            bytes([DUP1, EXTCODEHASH]), _push(record, 2), bytes([MSTORE]),
+            _probe_getter(SELECTORS_OFFSET, record + 0x20),
+            _probe_getter(SELECTORS_OFFSET + 0x20, record + 0x40),
+            _probe_getter(SELECTORS_OFFSET + 0x40, record + 0x60),
+            bytes([POP]),
+        ]
+    code += [_push(len(addresses) * RECORD_SIZE, 2), _push(OUTPUT_OFFSET, 1), bytes([RETURN])]
+    return b"".join(code)
+
+
+def probe_pool_types(w3, addresses, block_identifier="latest", max_addresses=DEFAULT_MAX_ADDRESSES):
+    """
+    Classifies many addresses with one eth_call per max_addresses (usually a single round trip).
+
+    All three state getters are probed for every address in the same call, so Algebra pools,
+    V2-style pairs and non-pools no longer cost extra failed calls, and each address's code hash
+    is read alongside. Returns a dict of checksum address -> (code_hash, pool_type) where
+    code_hash is a 0x hex string and pool_type is "uni", "alg", "v2" (Uniswap V2 or Solidly
+    pair, see v2Pools.py) or None (not a pool).
+    """
+    addresses = [Web3.to_checksum_address(a) for a in dict.fromkeys(addresses)]
+    results = {}
+    for start in range(0, len(addresses), max_addresses):
+        chunk = addresses[start:start + max_addresses]
+        raw = bytes(w3.eth.call({"data": build_probe_code(chunk)}, block_identifier))
+        for i, address in enumerate(chunk):
+            record = raw[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]
+            code_hash = "0x" + record[:32].hex()
+            if int.from_bytes(record[32:64], "big"):
+                pool_type = "uni"
+            elif int.from_bytes(record[64:96], "big"):
+                pool_type = "alg"
+            elif int.from_bytes(record[96:128], "big"):
+                pool_type = "v2"
+            else:
+                pool_type = None
+            results[address] = (code_hash, pool_type)
+    return results
@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import sys
+import threading
+
+from eth_abi import decode
+from web3 import Web3
+
+from multicall import aggregate3, read_pool_states, selector
+from poolProbe import EMPTY_CODE_HASH, NO_ACCOUNT_HASH, probe_pool_types
+from v2Pools import read_v2_pairs
+
+DEFAULT_REGISTRY_PATH = "pools.db"
+
+# Bumped whenever classification changes (a new pool type, or v2: pools with a zero price or
+# zero reserves are no longer taken for "not a pool"), so cached "not a pool" results are redone.
+SCHEMA_VERSION = 2
+
+COLUMNS = ("address", "type", "token0", "token1", "decimals0", "decimals1", "fee")
+
+DECIMALS = selector("decimals()")
+FEE = selector("fee()")
+
+
+class PoolRegistry:
+    """
+    Persistent registry of immutable pool metadata: pool type ("uni"/"alg"/"v2"), token0, token1,
+    token decimals and fee tier (None for Algebra pools, whose fee is dynamic; the assumed
+    default for V2-style pairs, see v2Pools.py).
+
+    Everything is loaded into memory at startup, so lookups for known pools cost no RPC calls.
+    Unknown pools are resolved lazily with two batched Multicall3 round trips and written to
+    SQLite so later runs start warm.
+
+    Pool type classification (classify) is cached separately by address together with the
+    address's code hash, including negative "not a pool" results.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pools (
+                address TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                token0 TEXT NOT NULL,
+                token1 TEXT NOT NULL,
+                decimals0 INTEGER,
+                decimals1 INTEGER,
+                fee INTEGER
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS classifications (
+                address TEXT PRIMARY KEY,
+                code_hash TEXT NOT NULL,
+                type TEXT
+            )"""
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._conn.execute("DELETE FROM classifications WHERE type IS NULL")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+        self._pools = {}
+        for row in self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM pools"):
+            self._pools[row[0]] = dict(zip(COLUMNS, row))
+        self._classes = {}  # address -> (code_hash, "uni" | "alg" | "v2" | None)
+        for address, code_hash, pool_type in self._conn.execute("SELECT address, code_hash, type FROM classifications"):
+            self._classes[address] = (code_hash, pool_type)
+
+    def __len__(self):
+        return len(self._pools)
+
+    def __contains__(self, pool_address):
+        return Web3.to_checksum_address(pool_address) in self._pools
+
+    def get(self, pool_address):
+        """Returns the cached metadata dict for a pool, or None if it is not registered yet."""
+        return self._pools.get(Web3.to_checksum_address(pool_address))
+
+    def pools(self):
+        """Returns the metadata dicts of all registered pools."""
+        return list(self._pools.values())
+
+    def classify(self, w3, addresses):
+        """
+        Returns a dict of checksum address -> "uni" | "alg" | "v2" | None for many addresses.
+
+        Registered pools and previously classified addresses are answered from memory; all the
+        others are classified together by probe_pool_types, normally one eth_call. Results are
+        cached with the address's code hash. An address is "not a pool" only if none of the price
+        getters answered; a pool with a zero price or zero reserves keeps its type. "Not a pool"
+        results for deployed contracts are persisted, while those for addresses without code are
+        only remembered for this process, since a pool can still be deployed at a precomputed address.
+        """
+        addresses = [Web3.to_checksum_address(a) for a in dict.fromkeys(addresses)]
+        unknown = [a for a in addresses if a not in self._pools and a not in self._classes]
+        if unknown:
+            probed = probe_pool_types(w3, unknown)
+            rows = []
+            with self._lock:
+                for address, (code_hash, pool_type) in probed.items():
+                    self._classes[address] = (code_hash, pool_type)
+                    if code_hash not in (EMPTY_CODE_HASH, NO_ACCOUNT_HASH):
+                        rows.append((address, code_hash, pool_type))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO classifications (address, code_hash, type) VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+
+        types = {}
+        for address in addresses:
+            if address in self._pools:
+                types[address] = self._pools[address]["type"]
+            else:
+                types[address] = self._classes[address][1]
+        return types
+
+    def code_hash(self, address):
+        """Returns the code hash recorded when address was classified, or None."""
+        cached = self._classes.get(Web3.to_checksum_address(address))
+        return cached[0] if cached else None
+
+    def resolve(self, w3, pool_address):
+        """
+        Returns the metadata for a pool, fetching and persisting it on first use.
+        Returns None if the address is not a Uniswap V3, Algebra or V2-style pool.
+        """
+        pool_info = self.get(pool_address)
+        if pool_info is None:
+            pool_info = self.warm_up(w3, [pool_address]).get(Web3.to_checksum_address(pool_address))
+        return pool_info
+
+    def warm_up(self, w3, pool_addresses):
+        """
+        Registers many pools at once: one Multicall3 batch for pool type and tokens, then one for
+        every token's decimals() and each Uniswap-style pool's fee(). V2-style pairs (classified
+        as such, or unclassified and without a V3 price getter) are read with
+        v2Pools.read_v2_pairs in one more batch. Already known pools and addresses classified as
+        not a pool are skipped. Returns a dict of address -> metadata for every requested pool that is a pool.
+        """
+        addresses = [Web3.to_checksum_address(a) for a in dict.fromkeys(pool_addresses)]
+        unknown = [a for a in addresses if a not in self._pools and not self._not_a_pool(a)]
+        if unknown:
+            pool_types = {a: self._classes[a][1] for a in unknown if a in self._classes}
+            v2_pairs = [a for a in unknown if pool_types.get(a) == "v2"]
+            others = [a for a in unknown if pool_types.get(a) != "v2"]
+            states = read_pool_states(w3, others, pool_types) if others else {}
+            # The classifier's type stands even when the price getter reads zero (not initialized yet).
+            pools = {a: dict(s, type=s["type"] or pool_types.get(a)) for a, s in states.items()}
+            pools = {a: s for a, s in pools.items() if s["type"] and s["token0"] and s["token1"]}
+            # Known V2 pairs plus any unclassified address that had neither slot0 nor globalState.
+            v2_pairs += [a for a in others if a not in pools and a not in pool_types]
+            pools.update(read_v2_pairs(w3, v2_pairs) if v2_pairs else {})
+
+            tokens = sorted({s["token0"] for s in pools.values()} | {s["token1"] for s in pools.values()})
+            uni_pools = [a for a, s in pools.items() if s["type"] == "uni"]
+            calls = [(token, DECIMALS) for token in tokens] + [(pool, FEE) for pool in uni_pools]
+            results = aggregate3(w3, calls) if calls else []
+
+            decimals = {}
+            for token, (success, data) in zip(tokens, results):
+                decimals[token] = decode(["uint8"], data[:32])[0] if success and len(data) >= 32 else None
+            fees = {}
+            for pool, (success, data) in zip(uni_pools, results[len(tokens):]):
+                fees[pool] = decode(["uint24"], data[:32])[0] if success and len(data) >= 32 else None
+            fees.update({a: s["fee"] for a, s in pools.items() if s["type"] == "v2"})
+
+            rows = []
+            for address, state in pools.items():
+                rows.append((
+                    address, state["type"], state["token0"], state["token1"],
+                    decimals.get(state["token0"]), decimals.get(state["token1"]), fees.get(address),
+                ))
+            self._store(rows)
+
+        return {a: self._pools[a] for a in addresses if a in self._pools}
+
+    def _not_a_pool(self, address):
+        cached = self._classes.get(address)
+        return cached is not None and cached[1] is None
+
+    def _store(self, rows):
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO pools ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+            self._conn.commit()
+            for row in rows:
+                self._pools[row[0]] = dict(zip(COLUMNS, row))
+
+
+def main():
+    """
+    Bulk warm-up: python poolRegistry.py pools.txt
+    Registers every pool address listed in the file (one per line, '#' comments allowed).
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: python poolRegistry.py <pool list file>")
+        return
+    with open(sys.argv[1], 'r') as pool_file:
+        pool_addresses = [line.split("#", 1)[0].strip() for line in pool_file]
+    pool_addresses = [a for a in pool_addresses if a]
+
+    w3 = Web3(Web3.HTTPProvider(os.environ.get("RPC_URL")))
+    if not w3.is_connected():
+        print("Connection to RPC failed.")
+        return
+    registry = PoolRegistry(os.environ.get("POOL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+    known_before = len(registry)
+    registered = registry.warm_up(w3, pool_addresses)
+    print(f"Registered {len(registry) - known_before} new pools ({len(registered)}/{len(pool_addresses)} listed addresses are pools, {len(registry)} total).")
+    for address in pool_addresses:
+        if Web3.to_checksum_address(address) not in registered:
+            print(f"Not a Uniswap V3, Algebra or V2-style pool: {address}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import numpy as np
+
+from arbitrageChecker import ALLOWED_DEXES
+
+
+class Interner:
+    """Maps strings (lower-cased addresses, DEX ids) to small stable integer ids."""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def lookup(self, value):
+        """Returns the id of value, or -1 if it was never interned."""
+        return self.ids.get(value, -1)
+
+
+class _SnapshotBuilder:
+    """
+    Collects the rows of one PoolSnapshot. Each snapshot gets its own address and DEX
+    interners, so ids only mean something within the snapshot and nothing outlives it.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.addresses = Interner()
+        self.dexes = Interner()
+        self.token_idx, self.price, self.liquidity, self.dex_code, self.base_id, self.quote_id = [], [], [], [], [], []
+        self.pair_addresses, self.pair_names, self.dex_ids = [], [], []
+        self.token_names = [None] * len(tokens)
+
+    def add(self, i, price, liquidity, dex_id, base_address, quote_address, pair_address, pair_name, base_name):
+        """Adds one pool listed under tokens[i]; addresses are lower-cased."""
+        self.token_idx.append(i)
+        self.price.append(price)
+        self.liquidity.append(liquidity)
+        self.dex_code.append(self.dexes.intern(dex_id.lower()))
+        self.base_id.append(self.addresses.intern(base_address))
+        self.quote_id.append(self.addresses.intern(quote_address))
+        self.pair_addresses.append(pair_address)
+        self.pair_names.append(pair_name)
+        self.dex_ids.append(dex_id)
+        if self.token_names[i] is None and base_address == self.tokens[i].lower():
+            self.token_names[i] = base_name
+
+    def build(self, cls):
+        return cls(
+            self.tokens,
+            np.array(self.token_idx, dtype=np.int32),
+            np.array(self.price, dtype=np.float64),
+            np.array(self.liquidity, dtype=np.float64),
+            np.array(self.dex_code, dtype=np.int32),
+            np.array(self.base_id, dtype=np.int32),
+            np.array(self.quote_id, dtype=np.int32),
+            self.pair_addresses,
+            self.pair_names,
+            self.dex_ids,
+            self.token_names,
+            self.addresses,
+            self.dexes,
+        )
+
+
+class PoolSnapshot:
+    """
+    Columnar view of the DexScreener pools for many tokens, built once per fetch.
+
+    Row i describes one pool listed under token tokens[token_idx[i]]. Numeric columns are NumPy
+    arrays so eligibility masks and spread extremes can be computed for every token at once;
+    the string columns (pair address, pair name, token name) are only read for reported rows.
+    Addresses and DEX ids are interned per snapshot (addresses, dexes).
+    """
+
+    def __init__(self, tokens, token_idx, price, liquidity, dex_code, base_id, quote_id,
+                 pair_addresses, pair_names, dex_ids, token_names, addresses, dexes):
+        self.tokens = tokens
+        self.addresses = addresses
+        self.dexes = dexes
+        self.token_ids = np.array([addresses.intern(t.lower()) for t in tokens], dtype=np.int32)
+        self.token_idx = token_idx
+        self.price = price
+        self.liquidity = liquidity
+        self.dex_code = dex_code
+        self.base_id = base_id
+        self.quote_id = quote_id
+        self.pair_addresses = pair_addresses
+        self.pair_names = pair_names
+        self.dex_ids = dex_ids
+        self.token_names = token_names
+
+    def __len__(self):
+        return len(self.price)
+
+    @classmethod
+    def from_pools(cls, pools_by_token):
+        """
+        Builds a snapshot from a dict mapping token_address -> list of DexScreener pool objects
+        (the shape returned by DexScreenerClient.fetch_many_token_pools). Malformed pools are skipped.
+        """
+        builder = _SnapshotBuilder(list(pools_by_token))
+        for i, token_address in enumerate(builder.tokens):
+            for pool in pools_by_token[token_address] or []:
+                try:
+                    base = pool.get("baseToken") or {}
+                    quote = pool.get("quoteToken") or {}
+                    row_price = float(pool.get("priceUsd", "0"))
+                    row_liquidity = float((pool.get("liquidity") or {}).get("usd", 0))
+                    base_addr = base.get("address", "").lower()
+                    quote_addr = quote.get("address", "").lower()
+                    dex_id = pool.get("dexId", "unknown")
+                except Exception:
+                    continue
+                builder.add(
+                    i, row_price, row_liquidity, dex_id, base_addr, quote_addr,
+                    pool.get("pairAddress", "unknown"),
+                    f"{base.get('symbol', 'N/A')}/{quote.get('symbol', 'N/A')}",
+                    base.get("name", "Unknown Token"),
+                )
+        return builder.build(cls)
+
+    @classmethod
+    def from_records(cls, records_by_token):
+        """
+        Builds a snapshot from a dict mapping token_address -> list of poolDecoder.PoolRecord,
+        i.e. pools fetched with DexScreenerClient(decoder=decode_pools). The records are already
+        typed and validated, so no per-pool conversions or error handling are needed here.
+        """
+        builder = _SnapshotBuilder(list(records_by_token))
+        for i, token_address in enumerate(builder.tokens):
+            for record in records_by_token[token_address] or []:
+                builder.add(
+                    i, record.priceUsd, record.liquidityUsd, record.dexId, record.baseAddress, record.quoteAddress,
+                    record.pairAddress, f"{record.baseSymbol}/{record.quoteSymbol}", record.baseName,
+                )
+        return builder.build(cls)
+
+    def eligible_mask(self, min_liquidity=10000, allowed_dexes=ALLOWED_DEXES, pair_token=None):
+        """
+        Vectorized version of the per-pool filters in the arbitrage checkers.
+
+        By default a row is eligible when its liquidity is at least min_liquidity, its DEX is in
+        allowed_dexes and the row's token is the base token (arbitrageChecker.py). With pair_token
+        set (e.g. the wS address), a row is eligible when it pairs the row's token with pair_token
+        in either order (arbitrageChecker_ws.py). allowed_dexes=None disables the DEX filter.
+        """
+        row_token = self.token_ids[self.token_idx]
+        mask = (self.liquidity >= min_liquidity) & np.isfinite(self.price)
+        if pair_token is None:
+            mask &= self.base_id == row_token
+        else:
+            pair_id = self.addresses.lookup(pair_token.lower())
+            mask &= ((self.base_id == row_token) & (self.quote_id == pair_id)) | \
+                    ((self.base_id == pair_id) & (self.quote_id == row_token))
+        if allowed_dexes is not None:
+            codes = [self.dexes.lookup(dex) for dex in allowed_dexes]
+            mask &= np.isin(self.dex_code, codes)
+        return mask
+
+    def compute_spreads(self, mask):
+        """
+        Computes, for every token at once, the highest and lowest eligible price rows.
+
+        Returns a dict of per-token arrays (indexed like self.tokens):
+          count      - number of eligible pools
+          high_row   - row index of the highest price (-1 if count < 2)
+          low_row    - row index of the lowest price (-1 if count < 2)
+          diff_percent - (high - low) / low * 100, NaN if count < 2 or the lowest price is zero
+        """
+        n_tokens = len(self.tokens)
+        rows = np.flatnonzero(mask)
+        owners = self.token_idx[rows]
+        prices = self.price[rows]
+        count = np.bincount(owners, minlength=n_tokens)
+
+        high_row = np.full(n_tokens, -1, dtype=np.int64)
+        low_row = np.full(n_tokens, -1, dtype=np.int64)
+        if len(rows):
+            # Stable sort of eligible rows by (token, price descending), mirroring the checkers'
+            # sorted(..., reverse=True): the first row of each token's segment is its highest
+            # price and the last row its lowest.
+            order = np.lexsort((-prices, owners))
+            owners_sorted = owners[order]
+            starts = np.flatnonzero(np.r_[True, owners_sorted[1:] != owners_sorted[:-1]])
+            ends = np.r_[starts[1:], len(order)] - 1
+            segment_tokens = owners_sorted[starts]
+            high_row[segment_tokens] = rows[order[starts]]
+            low_row[segment_tokens] = rows[order[ends]]
+
+        enough = count >= 2
+        high_row[~enough] = -1
+        low_row[~enough] = -1
+        high_price = np.full(n_tokens, np.nan)
+        low_price = np.full(n_tokens, np.nan)
+        high_price[enough] = self.price[high_row[enough]]
+        low_price[enough] = self.price[low_row[enough]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            diff_percent = np.where(low_price > 0, (high_price - low_price) / low_price * 100, np.nan)
+
+        return {
+            "count": count,
+            "high_row": high_row,
+            "low_row": low_row,
+            "diff_percent": diff_percent,
+        }
+
+    def row_entry(self, row):
+        """Returns one row in the dict shape used by find_arbitrage_from_pools' price entries."""
+        return {
+            "dexId": self.dex_ids[row],
+            "priceUsd": float(self.price[row]),
+            "pairAddress": self.pair_addresses[row],
+            "liquidityUsd": float(self.liquidity[row]),
+            "pairName": self.pair_names[row]
+        }
+
+    def arbitrage_for(self, spreads, mask, i):
+        """
+        Converts token i's result from compute_spreads into the dict returned by
+        find_arbitrage_from_pools, so existing reporting code can consume it unchanged.
+        Returns None if the token has fewer than two eligible pools.
+        """
+        if spreads["count"][i] < 2:
+            return None
+        rows = np.flatnonzero(mask & (self.token_idx == i))
+        rows = rows[np.argsort(-self.price[rows], kind="stable")]
+        diff_percent = spreads["diff_percent"][i]
+        return {
+            "tokenName": self.token_names[i],
+            "sortedPrices": [self.row_entry(row) for row in rows],
+            "highest": self.row_entry(spreads["high_row"][i]),
+            "lowest": self.row_entry(spreads["low_row"][i]),
+            "diffPercent": None if np.isnan(diff_percent) else float(diff_percent)
+        }
@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import sys
+
+import anyio
+from eth_abi import decode
+from web3 import Web3
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+
+from multicall import read_pool_states
+
+# Uniswap V3 and Algebra pools emit the same Swap event; sqrtPriceX96/liquidity/tick are post-swap.
+SWAP_TOPIC = Web3.to_hex(Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24)"))
+# Algebra Integral 1.2 pools append the override and plugin fees; the first five words are unchanged.
+SWAP_PLUGIN_FEE_TOPIC = Web3.to_hex(
+    Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24,uint24,uint24)")
+)
+# Algebra pools announce dynamic fee changes separately.
+FEE_TOPIC = Web3.to_hex(Web3.keccak(text="Fee(uint16)"))
+
+# Position assigned to a polled snapshot: after every log of the block it was read at.
+END_OF_BLOCK = 2 ** 63
+
+
+def _to_int(value):
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def decode_pool_log(log):
+    """
+    Decodes a Swap or Fee log (as delivered by eth_subscribe "logs") into an update dict:
+    {"pool", "event", "blockNumber", "logIndex", "removed", ...} plus amount0, amount1,
+    sqrtPriceX96, liquidity and tick for Swap, or fee for Fee. Returns None for other events.
+    """
+    topic = log["topics"][0].lower() if log.get("topics") else None
+    data = bytes.fromhex(log["data"][2:])
+    update = {
+        "pool": Web3.to_checksum_address(log["address"]),
+        "blockNumber": _to_int(log["blockNumber"]),
+        "logIndex": _to_int(log["logIndex"]),
+        "removed": bool(log.get("removed", False)),
+    }
+    if topic in (SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC):
+        amount0, amount1, sqrt_price, liquidity, tick = decode(
+            ["int256", "int256", "uint160", "uint128", "int24"], data[:160]
+        )
+        update.update(event="Swap", amount0=amount0, amount1=amount1,
+                      sqrtPriceX96=sqrt_price, liquidity=liquidity, tick=tick)
+    elif topic == FEE_TOPIC:
+        update.update(event="Fee", fee=decode(["uint16"], data[:32])[0])
+    else:
+        return None
+    return update
+
+
+class PoolStateTable:
+    """
+    In-memory price state for watched pools, fed by Swap/Fee logs and polled snapshots.
+
+    Every pool remembers the (blockNumber, logIndex) position of its last update, so duplicate
+    or out-of-order logs (e.g. replayed after a reconnect) never move its state backwards.
+    Pools hit by a removed (reorged) log are marked stale until they are polled again.
+    """
+
+    def __init__(self):
+        self.head = None  # latest block number seen via newHeads
+        self.stale = set()
+        self._states = {}  # pool address -> state dict
+        self._positions = {}  # pool address -> (blockNumber, logIndex)
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, pool_address):
+        """Returns a copy of a pool's current state, or None if it has never been seen."""
+        state = self._states.get(Web3.to_checksum_address(pool_address))
+        return dict(state) if state is not None else None
+
+    def apply_log(self, update):
+        """Applies one decoded log update. Returns True if the pool's state changed."""
+        pool = update["pool"]
+        if update["removed"]:
+            self.stale.add(pool)
+            return False
+        position = (update["blockNumber"], update["logIndex"])
+        if position <= self._positions.get(pool, (-1, -1)):
+            return False
+        state = self._states.setdefault(pool, dict.fromkeys(("type", "fee", "sqrtPriceX96", "liquidity", "tick")))
+        if update["event"] == "Swap":
+            for field in ("sqrtPriceX96", "liquidity", "tick"):
+                state[field] = update[field]
+        else:
+            state["type"] = "alg"
+            state["fee"] = update["fee"]
+        state["blockNumber"] = update["blockNumber"]
+        self._positions[pool] = position
+        return True
+
+    def apply_snapshot(self, states, block_number):
+        """
+        Replaces pools' state with a polled snapshot (read_pool_states output) read at
+        block_number. Logs from that block or earlier are ignored afterwards.
+        """
+        for pool, polled in states.items():
+            if polled["sqrtPriceX96"] is None:
+                continue
+            position = (block_number, END_OF_BLOCK)
+            if position < self._positions.get(pool, (-1, -1)):
+                continue  # a newer log already arrived while polling
+            self._states[pool] = {
+                "type": polled["type"],
+                "fee": polled["fee"],
+                "sqrtPriceX96": polled["sqrtPriceX96"],
+                "liquidity": polled["liquidity"],
+                "tick": polled["tick"],
+                "blockNumber": block_number,
+            }
+            self._positions[pool] = position
+            self.stale.discard(pool)
+
+
+class PoolStream:
+    """
+    Keeps a PoolStateTable current from a websocket JSON-RPC node.
+
+    Subscribes with eth_subscribe to newHeads and to Swap/Fee logs of the watched pools, and
+    decodes price, tick and liquidity straight from the events, so no per-pool polling is needed.
+    Pools are polled (resync) only on connect and after each reconnect, to cover events missed
+    while disconnected, and individually after a reorg removed one of their logs.
+
+    resync(pools) must return (states, block_number) in read_pool_states' format. By default it
+    polls over HTTP with read_pool_states using the w3 instance given.
+    """
+
+    def __init__(self, ws_url, pool_addresses, w3=None, resync=None, table=None, on_update=None,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0, record=None):
+        self.ws_url = ws_url
+        self.pools = [Web3.to_checksum_address(a) for a in dict.fromkeys(pool_addresses)]
+        self.table = table if table is not None else PoolStateTable()
+        self.on_update = on_update
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.record = record  # optional file object: notifications are appended as JSON lines
+        self.connections = 0
+        self.resyncs = 0
+        self._w3 = w3
+        self._resync_fn = resync or self._poll_states
+        self._subscriptions = {}  # subscription id -> "newHeads" | "logs"
+        self._early = []  # notifications that arrived before their subscription id was known
+        self._closed = False
+
+    def _poll_states(self, pools):
+        block_number = self._w3.eth.block_number
+        return read_pool_states(self._w3, pools, block_identifier=block_number), block_number
+
+    async def resync(self, pools=None):
+        states, block_number = await anyio.to_thread.run_sync(self._resync_fn, list(pools or self.pools))
+        self.table.apply_snapshot(states, block_number)
+        self.resyncs += 1
+
+    def close(self):
+        self._closed = True
+
+    async def run(self):
+        """
+        Runs until close() is called, reconnecting with exponential backoff after any error:
+        a dropped connection, a rejected eth_subscribe or a failed resync poll.
+        """
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                async with connect(self.ws_url) as ws:
+                    self.connections += 1
+                    await self._subscribe(ws)
+                    # Polled after subscribing, so no event can fall between snapshot and stream.
+                    await self.resync()
+                    delay = self.reconnect_delay
+                    async for message in ws:
+                        await self._handle(json.loads(message))
+                        if self._closed:
+                            return
+            except Exception as e:
+                print(f"Pool stream failed ({e!r}), reconnecting in {delay:.1f}s", file=sys.stderr)
+            if self._closed:
+                return
+            await anyio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _subscribe(self, ws):
+        self._subscriptions = {}
+        self._early = []
+        requests = {
+            1: ["newHeads"],
+            2: ["logs", {"address": self.pools, "topics": [[SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC, FEE_TOPIC]]}],
+        }
+        for request_id, params in requests.items():
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "eth_subscribe", "params": params}))
+        pending = dict(requests)
+        while pending:
+            message = json.loads(await ws.recv())
+            request_id = message.get("id")
+            if request_id in pending:
+                if "error" in message:
+                    raise ValueError(f"eth_subscribe {pending[request_id][0]} failed: {message['error']}")
+                self._subscriptions[message["result"]] = pending.pop(request_id)[0]
+            else:
+                self._early.append(message)
+        early, self._early = self._early, []
+        for message in early:
+            await self._handle(message)
+
+    async def _handle(self, message):
+        if message.get("method") != "eth_subscription":
+            return
+        params = message["params"]
+        kind = self._subscriptions.get(params["subscription"])
+        if kind is None:
+            return
+        if self.record is not None:
+            self.record.write(json.dumps({"kind": kind, "result": params["result"]}) + "\n")
+            self.record.flush()
+        if kind == "newHeads":
+            self.table.head = _to_int(params["result"]["number"])
+            if self.table.stale:
+                await self.resync(sorted(self.table.stale))
+            return
+        update = decode_pool_log(params["result"])
+        if update is not None and self.table.apply_log(update) and self.on_update is not None:
+            self.on_update(update["pool"], self.table.get(update["pool"]))
+
+
+##############################
+# Replay stand-in
+##############################
+
+def load_recording(path):
+    """Reads notifications recorded with --record: one {"kind", "result"} object per line."""
+    with open(path, 'r') as recording:
+        return [json.loads(line) for line in recording if line.strip()]
+
+
+async def serve_replay(recorded, host="127.0.0.1", port=8546, drop_after=None, task_status=anyio.TASK_STATUS_IGNORED):
+    """
+    Local websocket JSON-RPC stand-in for a node. Answers eth_subscribe for newHeads and logs,
+    then replays the recorded notifications to each connection in order. With drop_after set,
+    every connection is closed after that many notifications so reconnect handling can be
+    exercised; the next connection resumes from the following notification.
+    """
+    position = {"next": 0}
+
+    async def handler(ws):
+        subscriptions = {}
+        for _ in range(2):
+            request = json.loads(await ws.recv())
+            kind = request["params"][0]
+            subscriptions[kind] = hex(len(subscriptions) + 1)
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": subscriptions[kind]}))
+        sent = 0
+        while position["next"] < len(recorded):
+            if drop_after is not None and sent >= drop_after:
+                return
+            item = recorded[position["next"]]
+            position["next"] += 1
+            sent += 1
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0",
+                "method": "eth_subscription",
+                "params": {"subscription": subscriptions[item["kind"]], "result": item["result"]},
+            }))
+        await ws.wait_closed()
+
+    async with serve(handler, host, port) as server:
+        task_status.started(server)
+        await server.serve_forever()
+
+
+def main():
+    """
+    Stream:  python poolStream.py <pool address> [...] [--record file]
+             (uses WS_URL, falling back to RPC_URL for resync polling)
+    Replay:  python poolStream.py --replay file [--port 8546] [--drop-after N]
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Track pool prices from websocket Swap logs.")
+    parser.add_argument("pools", nargs="*", help="Pool addresses to watch")
+    parser.add_argument("--ws-url", default=os.environ.get("WS_URL"), help="Websocket RPC URL (default: WS_URL)")
+    parser.add_argument("--record", help="Append received notifications to this JSON lines file")
+    parser.add_argument("--replay", help="Serve a recorded notification file as a local websocket node")
+    parser.add_argument("--port", type=int, default=8546, help="Replay server port")
+    parser.add_argument("--drop-after", type=int, default=None, help="Replay: drop each connection after N notifications")
+    args = parser.parse_args()
+
+    if args.replay:
+        recorded = load_recording(args.replay)
+        print(f"Replaying {len(recorded)} notifications on ws://127.0.0.1:{args.port}")
+        anyio.run(lambda: serve_replay(recorded, port=args.port, drop_after=args.drop_after))
+        return
+
+    if not args.pools or not args.ws_url:
+        parser.error("pool addresses and --ws-url (or WS_URL) are required")
+    w3 = Web3(Web3.HTTPProvider(os.environ.get("RPC_URL")))
+    record = open(args.record, 'a') if args.record else None
+
+    def on_update(pool, state):
+        print(f"{pool} block {state['blockNumber']}: sqrtPriceX96={state['sqrtPriceX96']} tick={state['tick']} "
+              f"liquidity={state['liquidity']} fee={state['fee']}")
+
+    stream = PoolStream(args.ws_url, args.pools, w3=w3, on_update=on_update, record=record)
+    try:
+        anyio.run(stream.run)
+    except KeyboardInterrupt:
+        print("Pool stream stopped.")
+    finally:
+        if record is not None:
+            record.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import math
+import os
+import random
+import time
+
+from web3 import Web3
+
+from swapSimulator import PoolState, Q96, simulate_swap
+from v2Pools import get_amount_out, read_v2_pairs
+
+# Default latency budget for one route search; stages not reached by then are skipped.
+DEFAULT_BUDGET_MS = 5.0
+DEFAULT_MAX_HOPS = 3
+
+
+def quote_pool(state, zero_for_one, amount_in):
+    """
+    Exact output of swapping amount_in through one pool, from cached state: a swapSimulator
+    PoolState (Uniswap V3/Algebra) or a v2Pools pair dict. Returns 0 if the pool cannot take the
+    whole input (it runs out of liquidity before the input is used up).
+    """
+    if isinstance(state, PoolState):
+        result = simulate_swap(state, zero_for_one, amount_in)
+        used, out = (result["amount0"], result["amount1"]) if zero_for_one else (result["amount1"], result["amount0"])
+        return -out if used == amount_in else 0
+    return get_amount_out(state, zero_for_one, amount_in)
+
+
+class RouteFinder:
+    """
+    Best single-path route for one swap over every cached pool: direct pools between the two
+    tokens, and two- or three-hop paths whose intermediate tokens are hub tokens (wS and the
+    major quote tokens).
+
+    Every quote is exact (swapSimulator / v2Pools integer math on cached state), so no RPC call
+    is made while searching. Since a pool's output only grows with its input, the best path of
+    each length is found hop by hop: the largest amount reachable at every hub after one hop
+    (best pool per pair), then after two, and only those amounts are carried forward. That keeps
+    a search to a few dozen quotes instead of one per path. Stages run in order of length and
+    the search stops at the latency budget, returning the best route found so far.
+    """
+
+    def __init__(self, hub_tokens=(), max_hops=DEFAULT_MAX_HOPS, budget_ms=DEFAULT_BUDGET_MS):
+        self.hub_tokens = [Web3.to_checksum_address(t) for t in dict.fromkeys(hub_tokens)]
+        self.max_hops = max_hops
+        self.budget_ms = budget_ms
+        self._pools = {}  # pool address -> (token0, token1, state)
+        self._by_pair = {}  # (token, token) sorted -> [pool address]
+
+    def __len__(self):
+        return len(self._pools)
+
+    def set_pool(self, pool_address, token0, token1, state):
+        """Adds a pool, or replaces its state (PoolState or V2 pair dict)."""
+        pool_address, token0, token1 = (Web3.to_checksum_address(a) for a in (pool_address, token0, token1))
+        if pool_address not in self._pools:
+            self._by_pair.setdefault(tuple(sorted((token0, token1))), []).append(pool_address)
+        self._pools[pool_address] = (token0, token1, state)
+
+    def remove_pool(self, pool_address):
+        pool_address = Web3.to_checksum_address(pool_address)
+        entry = self._pools.pop(pool_address, None)
+        if entry is not None:
+            self._by_pair[tuple(sorted(entry[:2]))].remove(pool_address)
+
+    def pools_between(self, token_in, token_out):
+        """(pool address, state, zero_for_one) for every cached pool swapping token_in for token_out."""
+        token_in, token_out = Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out)
+        pools = []
+        for pool in self._by_pair.get(tuple(sorted((token_in, token_out))), ()):
+            token0, token1, state = self._pools[pool]
+            pools.append((pool, state, token_in == token0))
+        return pools
+
+    def _best_hop(self, token_in, token_out, amount_in, quotes):
+        """(amount_out, pool, zero_for_one) of the best pool between two tokens, or None."""
+        best = None
+        for pool in self._by_pair.get(tuple(sorted((token_in, token_out))), ()):
+            token0, token1, state = self._pools[pool]
+            zero_for_one = token_in == token0
+            key = (pool, zero_for_one, amount_in)
+            if key not in quotes:
+                quotes[key] = quote_pool(state, zero_for_one, amount_in)
+            out = quotes[key]
+            if out > 0 and (best is None or out > best[0]):
+                best = (out, pool, zero_for_one)
+        return best
+
+    def find_route(self, token_in, token_out, amount_in, max_hops=None, budget_ms=None):
+        """
+        Returns the best route for swapping amount_in of token_in into token_out, or None if no
+        cached pool path connects them:
+        {"amountIn", "amountOut", "path" (tokens), "hops" (one dict per swap: pool, tokenIn,
+        tokenOut, zeroForOne, amountIn, amountOut), "quotes", "complete" (False if the latency
+        budget cut the search short), "elapsedMs"}.
+        """
+        started = time.perf_counter()
+        deadline = started + (self.budget_ms if budget_ms is None else budget_ms) / 1000
+        max_hops = self.max_hops if max_hops is None else max_hops
+        token_in, token_out = Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out)
+        hubs = [h for h in self.hub_tokens if h not in (token_in, token_out)]
+        quotes = {}
+        best = None
+        complete = True
+
+        def consider(amount_out, hops):
+            nonlocal best
+            if best is None or amount_out > best[0]:
+                best = (amount_out, hops)
+
+        direct = self._best_hop(token_in, token_out, amount_in, quotes)
+        if direct is not None:
+            consider(direct[0], [(token_in, token_out, amount_in, direct)])
+
+        # reach[hub] = (amount at hub, hops so far), the best over paths of the current length.
+        reach = {}
+        if max_hops >= 2:
+            for hub in hubs:
+                hop = self._best_hop(token_in, hub, amount_in, quotes)
+                if hop is not None:
+                    reach[hub] = (hop[0], [(token_in, hub, amount_in, hop)])
+        for length in range(2, max_hops + 1):
+            for hub, (amount, hops) in reach.items():
+                if time.perf_counter() > deadline:
+                    complete = False
+                    break
+                hop = self._best_hop(hub, token_out, amount, quotes)
+                if hop is not None:
+                    consider(hop[0], hops + [(hub, token_out, amount, hop)])
+            if length == max_hops or not complete:
+                break
+            extended = {}
+            for hub, (amount, hops) in reach.items():
+                visited = {token_in} | {h[1] for h in hops}
+                for next_hub in hubs:
+                    if next_hub in visited:
+                        continue
+                    hop = self._best_hop(hub, next_hub, amount, quotes)
+                    if hop is not None and (next_hub not in extended or hop[0] > extended[next_hub][0]):
+                        extended[next_hub] = (hop[0], hops + [(hub, next_hub, amount, hop)])
+            reach = extended
+            if time.perf_counter() > deadline:
+                complete = False
+                break
+
+        if best is None:
+            return None
+        amount_out, hops = best
+        return {
+            "amountIn": amount_in,
+            "amountOut": amount_out,
+            "path": [hops[0][0]] + [h[1] for h in hops],
+            "hops": [
+                {"pool": hop[1], "tokenIn": a, "tokenOut": b, "zeroForOne": hop[2], "amountIn": amount, "amountOut": hop[0]}
+                for a, b, amount, hop in hops
+            ],
+            "quotes": len(quotes),
+            "complete": complete,
+            "elapsedMs": (time.perf_counter() - started) * 1000,
+        }
+
+
+def load_registered_routes(w3, registry, tick_cache, finder):
+    """
+    Fills a RouteFinder with every pool in a PoolRegistry: V3/Algebra pools from the TickCache
+    (disk snapshots plus catch-up, cold load only for new pools) and V2-style pairs with one
+    read_v2_pairs batch.
+    """
+    pools = registry.pools()
+    v3 = {p["address"]: p for p in pools if p["type"] in ("uni", "alg")}
+    v2 = {p["address"]: p for p in pools if p["type"] == "v2"}
+    for address, state in tick_cache.load_pools(list(v3), {a: p["type"] for a, p in v3.items()}).items():
+        finder.set_pool(address, v3[address]["token0"], v3[address]["token1"], state)
+    fees = {a: p["fee"] for a, p in v2.items() if p["fee"] is not None}
+    for address, pair in (read_v2_pairs(w3, list(v2), fees) if v2 else {}).items():
+        finder.set_pool(address, pair["token0"], pair["token1"], pair)
+
+
+##############################
+# Benchmark
+##############################
+
+def _synthetic_v3(rng, price, fee, depth):
+    tick_spacing = 60
+    center = int(math.log(price) / math.log(1.0001))
+    ticks, liquidity = {}, 0
+    for _ in range(30):
+        lower = (center // tick_spacing + rng.randint(-200, 199)) * tick_spacing
+        upper = lower + rng.randint(1, 200) * tick_spacing
+        amount = int(depth * rng.uniform(0.1, 1))
+        ticks[lower] = ticks.get(lower, 0) + amount
+        ticks[upper] = ticks.get(upper, 0) - amount
+        if lower <= center < upper:
+            liquidity += amount
+    ticks = {t: net for t, net in ticks.items() if net}
+    return PoolState(int(math.sqrt(price) * Q96), center, liquidity, fee, tick_spacing, ticks, rng.choice(("uni", "alg")))
+
+
+def _synthetic_market(rng, n_tokens):
+    """Tokens priced in a common unit; hubs are the first four and are well connected."""
+    tokens = [Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(n_tokens)]
+    prices = {t: math.exp(rng.uniform(-3, 3)) for t in tokens}
+    finder = RouteFinder(hub_tokens=tokens[:4])
+    count = 0
+
+    def add_pool(a, b, depth):
+        nonlocal count
+        count += 1
+        token0, token1 = sorted((a, b), key=lambda t: t.lower())
+        price = prices[token0] / prices[token1] * rng.uniform(0.997, 1.003)
+        address = "0x%040x" % (10 ** 9 + count)
+        if rng.random() < 0.3:
+            reserve0 = int(depth * 1e3 / math.sqrt(price))
+            pair = {"stable": None, "reserve0": reserve0, "reserve1": int(reserve0 * price), "fee": 3000}
+            finder.set_pool(address, token0, token1, pair)
+        else:
+            finder.set_pool(address, token0, token1, _synthetic_v3(rng, price, rng.choice((500, 3000, 10000)), depth))
+
+    for i, a in enumerate(tokens[:4]):
+        for b in tokens[i + 1:4]:
+            for _ in range(3):
+                add_pool(a, b, 10 ** 22)
+    for token in tokens[4:]:
+        for hub in rng.sample(tokens[:4], 2):
+            add_pool(token, hub, 10 ** rng.randint(18, 21))
+        if rng.random() < 0.3:
+            add_pool(token, rng.choice(tokens[4:]) if token != tokens[4] else tokens[5], 10 ** 19)
+    return tokens, prices, finder
+
+
+def _brute_force(finder, token_in, token_out, amount_in, max_hops):
+    """Best output over every simple path of up to max_hops with hub intermediates (for checking)."""
+    hubs = [h for h in finder.hub_tokens if h not in (token_in, token_out)]
+    best = 0
+
+    def walk(token, amount, visited, hops):
+        nonlocal best
+        hop = finder._best_hop(token, token_out, amount, {})
+        if hop is not None:
+            best = max(best, hop[0])
+        if hops == max_hops:
+            return
+        for hub in hubs:
+            if hub not in visited:
+                hop = finder._best_hop(token, hub, amount, {})
+                if hop is not None:
+                    walk(hub, hop[0], visited | {hub}, hops + 1)
+
+    walk(token_in, amount_in, {token_in}, 1)
+    return best
+
+
+def main():
+    """
+    Benchmark:  python routeFinder.py
+    Live:       python routeFinder.py <token in> <token out> <amount in raw units>
+                (registered pools, tick snapshots from TICK_CACHE_DIR, hubs from HUB_TOKENS)
+    """
+    parser = argparse.ArgumentParser(description="Find the best swap route over cached pools.")
+    parser.add_argument("token_in", nargs="?")
+    parser.add_argument("token_out", nargs="?")
+    parser.add_argument("amount", nargs="?", type=int)
+    parser.add_argument("--max-hops", type=int, default=DEFAULT_MAX_HOPS)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    if args.token_in:
+        from dotenv import load_dotenv
+        from poolRegistry import DEFAULT_REGISTRY_PATH, PoolRegistry
+        from tickCache import DEFAULT_TICK_CACHE_DIR, TickCache
+
+        load_dotenv()
+        w3 = Web3(Web3.HTTPProvider(os.environ.get("RPC_URL")))
+        hubs = [os.environ.get("WS_ADDRESS", "0x039e2fB66102314Ce7b64Ce5Ce3E5183bc94aD38")]
+        hubs += [t.strip() for t in os.environ.get("HUB_TOKENS", "").split(",") if t.strip()]
+        finder = RouteFinder(hubs, max_hops=args.max_hops, budget_ms=args.budget_ms)
+        registry = PoolRegistry(os.environ.get("POOL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+        tick_cache = TickCache(w3, os.environ.get("TICK_CACHE_DIR", DEFAULT_TICK_CACHE_DIR))
+        load_registered_routes(w3, registry, tick_cache, finder)
+        route = finder.find_route(args.token_in, args.token_out, args.amount)
+        if route is None:
+            print(f"No route between {args.token_in} and {args.token_out} over {len(finder)} pools.")
+            return
+        print(f"{route['amountIn']} -> {route['amountOut']} in {route['elapsedMs']:.2f} ms ({route['quotes']} quotes)")
+        for hop in route["hops"]:
+            print(f"  {hop['tokenIn']} -> {hop['tokenOut']} via {hop['pool']}: {hop['amountIn']} -> {hop['amountOut']}")
+        return
+
+    rng = random.Random(0)
+    tokens, prices, finder = _synthetic_market(rng, 200)
+    timings, hops, mismatches = [], [0] * (DEFAULT_MAX_HOPS + 1), 0
+    for i in range(300):
+        token_in, token_out = rng.sample(tokens, 2)
+        amount = int(10 ** rng.uniform(15, 21) / prices[token_in])
+        route = finder.find_route(token_in, token_out, amount, budget_ms=1000)
+        if route is None:
+            continue
+        timings.append(route["elapsedMs"])
+        hops[len(route["hops"])] += 1
+        if i < 50 and _brute_force(finder, token_in, token_out, amount, DEFAULT_MAX_HOPS) != route["amountOut"]:
+            mismatches += 1
+    timings.sort()
+    print(f"{len(finder)} pools, {len(timings)} routes: median {timings[len(timings) // 2]:.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.2f} ms; hops {dict(enumerate(hops))}; "
+          f"{mismatches} differences from exhaustive search")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import heapq
+import itertools
+import threading
+
+from arbitrageChecker import ALLOWED_DEXES
+
+
+class TokenSpreads:
+    """
+    Ordered set of one token's eligible pool prices.
+
+    Pool prices live in a max-heap and a min-heap with lazy deletion: every insert, update or
+    removal of a single pool is O(log n) amortized, and the current highest/lowest pools and
+    their spread are cached so best() is O(1).
+    """
+
+    def __init__(self, token_address):
+        self.token_address = token_address
+        self.token_name = None
+        self._pools = {}  # pair_address -> (seq, entry)
+        self._max_heap = []  # (-price, seq, pair_address)
+        self._min_heap = []  # (price, seq, pair_address)
+        self._best = None
+
+    def __len__(self):
+        return len(self._pools)
+
+    def set_pool(self, entry, seq):
+        """Inserts or updates one pool. entry is a price dict as built by find_arbitrage_from_pools."""
+        pair_address = entry["pairAddress"]
+        self._pools[pair_address] = (seq, entry)
+        heapq.heappush(self._max_heap, (-entry["priceUsd"], seq, pair_address))
+        heapq.heappush(self._min_heap, (entry["priceUsd"], seq, pair_address))
+        self._refresh()
+
+    def remove_pool(self, pair_address):
+        """Removes one pool; returns True if it was present."""
+        if self._pools.pop(pair_address, None) is None:
+            return False
+        self._refresh()
+        return True
+
+    def entries(self):
+        """Returns a dict of pair_address -> price entry for every indexed pool."""
+        return {pair_address: entry for pair_address, (_, entry) in self._pools.items()}
+
+    def best(self):
+        """
+        Returns the cached {"highest", "lowest", "diffPercent"} for this token, or None if fewer
+        than two pools are eligible. diffPercent is None when the lowest price is zero.
+        """
+        return self._best
+
+    def _refresh(self):
+        """Drops stale heap tops and recomputes the cached best spread."""
+        for heap in (self._max_heap, self._min_heap):
+            while heap:
+                seq, pair_address = heap[0][1], heap[0][2]
+                current = self._pools.get(pair_address)
+                if current is not None and current[0] == seq:
+                    break
+                heapq.heappop(heap)
+            # Rebuild when lazy deletions dominate so memory stays proportional to live pools.
+            if len(heap) > 2 * len(self._pools) + 16:
+                live = [item for item in heap if self._pools.get(item[2], (None,))[0] == item[1]]
+                heapq.heapify(live)
+                heap[:] = live
+
+        if len(self._pools) < 2:
+            self._best = None
+            return
+        highest = self._pools[self._max_heap[0][2]][1]
+        lowest = self._pools[self._min_heap[0][2]][1]
+        diff_percent = None
+        if lowest["priceUsd"] > 0:
+            diff_percent = ((highest["priceUsd"] - lowest["priceUsd"]) / lowest["priceUsd"]) * 100
+        self._best = {"highest": highest, "lowest": lowest, "diffPercent": diff_percent}
+
+
+class SpreadIndex:
+    """
+    Incremental best-spread index across many tokens.
+
+    Pools are fed one at a time (update_pool / remove_pool) or as a fresh DexScreener listing
+    (load_pools). Only pools passing the min_liquidity and allowed-DEX filters are indexed.
+    A global lazy max-heap keyed by spread answers top_spreads(k) without touching every token.
+
+    The index is shared between request threads: updates and reads hold one lock (reentrant,
+    since sync_entries goes through update_pool/remove_pool and top_spreads through best_spread).
+    """
+
+    def __init__(self, min_liquidity=10000, allowed_dexes=ALLOWED_DEXES):
+        self.min_liquidity = min_liquidity
+        self.allowed_dexes = allowed_dexes
+        self._tokens = {}  # lower-cased token address -> TokenSpreads
+        self._seq = itertools.count()
+        self._token_versions = {}  # lower-cased token address -> seq of its live global heap entry
+        self._global_heap = []  # (-diffPercent, seq, token key)
+        self._lock = threading.RLock()
+
+    def is_eligible(self, price_usd, liquidity_usd, dex_id):
+        if liquidity_usd < self.min_liquidity:
+            return False
+        if self.allowed_dexes is not None and dex_id.lower() not in self.allowed_dexes:
+            return False
+        return True
+
+    def update_pool(self, token_address, pair_address, price_usd, liquidity_usd, dex_id,
+                    pair_name="N/A", token_name=None):
+        """
+        Inserts or updates a single pool price for a token in O(log n). A pool that no longer
+        passes the liquidity/DEX filters is removed instead.
+        """
+        key = token_address.lower()
+        with self._lock:
+            if not self.is_eligible(price_usd, liquidity_usd, dex_id):
+                self.remove_pool(token_address, pair_address)
+                return
+            spreads = self._tokens.get(key)
+            if spreads is None:
+                spreads = self._tokens[key] = TokenSpreads(token_address)
+            if token_name is not None and spreads.token_name is None:
+                spreads.token_name = token_name
+            spreads.set_pool({
+                "dexId": dex_id,
+                "priceUsd": price_usd,
+                "pairAddress": pair_address,
+                "liquidityUsd": liquidity_usd,
+                "pairName": pair_name
+            }, next(self._seq))
+            self._publish(key)
+
+    def remove_pool(self, token_address, pair_address):
+        """Removes a single pool from a token's index in O(log n)."""
+        key = token_address.lower()
+        with self._lock:
+            spreads = self._tokens.get(key)
+            if spreads is not None and spreads.remove_pool(pair_address):
+                self._publish(key)
+
+    def load_pools(self, token_address, pools):
+        """
+        Syncs a token with a fresh DexScreener pool listing, applying the same base-token rule as
+        report_arbitrage_from_pools. Pools missing from the listing are removed.
+        """
+        token_address_lower = token_address.lower()
+        entries = []
+        token_name = None
+        for pool in pools:
+            try:
+                base = pool.get("baseToken", {})
+                if base.get("address", "").lower() != token_address_lower:
+                    continue
+                quote = pool.get("quoteToken", {})
+                entries.append({
+                    "dexId": pool.get("dexId", "unknown"),
+                    "priceUsd": float(pool.get("priceUsd", "0")),
+                    "pairAddress": pool.get("pairAddress", "unknown"),
+                    "liquidityUsd": float(pool.get("liquidity", {}).get("usd", 0)),
+                    "pairName": f"{base.get('symbol', 'N/A')}/{quote.get('symbol', 'N/A')}"
+                })
+                if token_name is None:
+                    token_name = base.get("name", "Unknown Token")
+            except Exception:
+                continue
+        self.sync_entries(token_address, entries, token_name)
+
+    def sync_entries(self, token_address, entries, token_name=None):
+        """
+        Syncs a token with a full list of price entries (e.g. find_arbitrage_from_pools'
+        "sortedPrices"). Changed pools are updated individually and pools missing from the list
+        are removed, so unchanged pools cost nothing.
+        """
+        with self._lock:
+            spreads = self._tokens.get(token_address.lower())
+            current = {} if spreads is None else spreads.entries()
+            seen = set()
+            for entry in entries:
+                seen.add(entry["pairAddress"])
+                if current.get(entry["pairAddress"]) != entry:
+                    self.update_pool(
+                        token_address,
+                        entry["pairAddress"],
+                        entry["priceUsd"],
+                        entry["liquidityUsd"],
+                        entry["dexId"],
+                        pair_name=entry["pairName"],
+                        token_name=token_name
+                    )
+            for pair_address in current:
+                if pair_address not in seen:
+                    self.remove_pool(token_address, pair_address)
+
+    def best_spread(self, token_address):
+        """O(1): the current best spread for one token (see TokenSpreads.best), or None."""
+        with self._lock:
+            spreads = self._tokens.get(token_address.lower())
+            if spreads is None or spreads.best() is None:
+                return None
+            return dict(spreads.best(), token=spreads.token_address, tokenName=spreads.token_name)
+
+    def top_spreads(self, k=10):
+        """Returns the k tokens with the largest current spread, largest first, in O(k log n) amortized."""
+        results, live = [], []
+        with self._lock:
+            while self._global_heap and len(results) < k:
+                item = heapq.heappop(self._global_heap)
+                _, seq, key = item
+                if self._token_versions.get(key) != seq:
+                    continue  # superseded by a newer spread for the same token
+                live.append(item)
+                results.append(self.best_spread(key))
+            for item in live:
+                heapq.heappush(self._global_heap, item)
+        return results
+
+    def _publish(self, key):
+        """Pushes a token's new best spread onto the global heap, invalidating its previous entry."""
+        best = self._tokens[key].best()
+        if best is None or best["diffPercent"] is None:
+            self._token_versions.pop(key, None)
+            if not self._tokens[key]:
+                del self._tokens[key]
+        else:
+            seq = next(self._seq)
+            self._token_versions[key] = seq
+            heapq.heappush(self._global_heap, (-best["diffPercent"], seq, key))
+        if len(self._global_heap) > 2 * len(self._token_versions) + 64:
+            self._global_heap = [item for item in self._global_heap if self._token_versions.get(item[2]) == item[1]]
+            heapq.heapify(self._global_heap)
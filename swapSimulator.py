@@ -0,0 +1,457 @@
+import bisect
+import math
+import random
+import time
+
+# Integer-exact Python port of the Uniswap V3 core math (TickMath, SqrtPriceMath, SwapMath) and
+# of the pool swap loop, so quotes match what the pool contract would compute, to the wei.
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+
+Q96 = 1 << 96
+UINT256_MAX = (1 << 256) - 1
+UINT160_MAX = (1 << 160) - 1
+FEE_DENOMINATOR = 1_000_000  # fees are in hundredths of a bip for both Uniswap V3 and Algebra
+
+# Bit constants of TickMath.getSqrtRatioAtTick: sqrt(1.0001)^-(2^i) as Q128.128.
+_TICK_RATIO_FACTORS = (
+    (0x2, 0xfff97272373d413259a46990580e213a),
+    (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0),
+    (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0),
+    (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053),
+    (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54),
+    (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9),
+    (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5),
+    (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6),
+    (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604),
+    (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+_LOG_SQRT_10001 = math.log(1.0001) / 2
+
+
+##############################
+# FullMath / UnsafeMath
+##############################
+
+def mul_div(a, b, denominator):
+    return a * b // denominator
+
+
+def mul_div_rounding_up(a, b, denominator):
+    return -(-a * b // denominator)
+
+
+def div_rounding_up(a, b):
+    return -(-a // b)
+
+
+##############################
+# TickMath
+##############################
+
+def get_sqrt_ratio_at_tick(tick):
+    """sqrt(1.0001^tick) * 2^96 as a Q64.96, rounded up exactly like TickMath.getSqrtRatioAtTick."""
+    abs_tick = -tick if tick < 0 else tick
+    if abs_tick > MAX_TICK:
+        raise ValueError(f"tick {tick} out of range")
+    ratio = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else 0x100000000000000000000000000000000
+    for bit, factor in _TICK_RATIO_FACTORS:
+        if abs_tick & bit:
+            ratio = (ratio * factor) >> 128
+    if tick > 0:
+        ratio = UINT256_MAX // ratio
+    return (ratio >> 32) + (1 if ratio & 0xFFFFFFFF else 0)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """The greatest tick whose sqrt ratio is <= sqrt_price_x96 (TickMath.getTickAtSqrtRatio)."""
+    if not MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO:
+        raise ValueError(f"sqrt price {sqrt_price_x96} out of range")
+    # A float estimate is at most a tick or two off; the exact comparisons settle it.
+    tick = math.floor((math.log(sqrt_price_x96) - math.log(Q96)) / _LOG_SQRT_10001)
+    tick = min(max(tick, MIN_TICK), MAX_TICK)
+    while tick > MIN_TICK and get_sqrt_ratio_at_tick(tick) > sqrt_price_x96:
+        tick -= 1
+    while tick < MAX_TICK and get_sqrt_ratio_at_tick(tick + 1) <= sqrt_price_x96:
+        tick += 1
+    return tick
+
+
+##############################
+# SqrtPriceMath
+##############################
+
+def get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount, add):
+    if amount == 0:
+        return sqrt_price_x96
+    numerator1 = liquidity << 96
+    product = amount * sqrt_price_x96
+    if add:
+        # The contract only takes the precise path when amount * price and the denominator fit
+        # in uint256; otherwise it falls back to a formula that rounds differently.
+        if product <= UINT256_MAX:
+            denominator = numerator1 + product
+            if denominator <= UINT256_MAX:
+                return mul_div_rounding_up(numerator1, sqrt_price_x96, denominator)
+        return div_rounding_up(numerator1, numerator1 // sqrt_price_x96 + amount)
+    if product > UINT256_MAX or numerator1 <= product:
+        raise ValueError("insufficient liquidity for output amount")
+    result = mul_div_rounding_up(numerator1, sqrt_price_x96, numerator1 - product)
+    if result > UINT160_MAX:
+        raise ValueError("sqrt price overflow")
+    return result
+
+
+def get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount, add):
+    if add:
+        result = sqrt_price_x96 + (amount << 96) // liquidity
+        if result > UINT160_MAX:
+            raise ValueError("sqrt price overflow")
+        return result
+    quotient = div_rounding_up(amount << 96, liquidity)
+    if sqrt_price_x96 <= quotient:
+        raise ValueError("insufficient liquidity for output amount")
+    return sqrt_price_x96 - quotient
+
+
+def get_next_sqrt_price_from_input(sqrt_price_x96, liquidity, amount_in, zero_for_one):
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount_in, True)
+    return get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount_in, True)
+
+
+def get_next_sqrt_price_from_output(sqrt_price_x96, liquidity, amount_out, zero_for_one):
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount_out, False)
+    return get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount_out, False)
+
+
+def get_amount0_delta(sqrt_ratio_a, sqrt_ratio_b, liquidity, round_up):
+    if sqrt_ratio_a > sqrt_ratio_b:
+        sqrt_ratio_a, sqrt_ratio_b = sqrt_ratio_b, sqrt_ratio_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_ratio_b - sqrt_ratio_a
+    if round_up:
+        return div_rounding_up(mul_div_rounding_up(numerator1, numerator2, sqrt_ratio_b), sqrt_ratio_a)
+    return mul_div(numerator1, numerator2, sqrt_ratio_b) // sqrt_ratio_a
+
+
+def get_amount1_delta(sqrt_ratio_a, sqrt_ratio_b, liquidity, round_up):
+    if sqrt_ratio_a > sqrt_ratio_b:
+        sqrt_ratio_a, sqrt_ratio_b = sqrt_ratio_b, sqrt_ratio_a
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_ratio_b - sqrt_ratio_a, Q96)
+    return mul_div(liquidity, sqrt_ratio_b - sqrt_ratio_a, Q96)
+
+
+##############################
+# SwapMath
+##############################
+
+def compute_swap_step(sqrt_ratio_current, sqrt_ratio_target, liquidity, amount_remaining, fee_pips):
+    """
+    One swap step within a single liquidity range (SwapMath.computeSwapStep).
+    amount_remaining > 0 means exact input, < 0 exact output.
+    Returns (sqrt_ratio_next, amount_in, amount_out, fee_amount).
+    """
+    zero_for_one = sqrt_ratio_current >= sqrt_ratio_target
+    exact_in = amount_remaining >= 0
+
+    if exact_in:
+        amount_remaining_less_fee = mul_div(amount_remaining, FEE_DENOMINATOR - fee_pips, FEE_DENOMINATOR)
+        if zero_for_one:
+            amount_in = get_amount0_delta(sqrt_ratio_target, sqrt_ratio_current, liquidity, True)
+        else:
+            amount_in = get_amount1_delta(sqrt_ratio_current, sqrt_ratio_target, liquidity, True)
+        if amount_remaining_less_fee >= amount_in:
+            sqrt_ratio_next = sqrt_ratio_target
+        else:
+            sqrt_ratio_next = get_next_sqrt_price_from_input(
+                sqrt_ratio_current, liquidity, amount_remaining_less_fee, zero_for_one
+            )
+    else:
+        if zero_for_one:
+            amount_out = get_amount1_delta(sqrt_ratio_target, sqrt_ratio_current, liquidity, False)
+        else:
+            amount_out = get_amount0_delta(sqrt_ratio_current, sqrt_ratio_target, liquidity, False)
+        if -amount_remaining >= amount_out:
+            sqrt_ratio_next = sqrt_ratio_target
+        else:
+            sqrt_ratio_next = get_next_sqrt_price_from_output(
+                sqrt_ratio_current, liquidity, -amount_remaining, zero_for_one
+            )
+
+    reached_target = sqrt_ratio_target == sqrt_ratio_next
+    if zero_for_one:
+        if not (reached_target and exact_in):
+            amount_in = get_amount0_delta(sqrt_ratio_next, sqrt_ratio_current, liquidity, True)
+        if not (reached_target and not exact_in):
+            amount_out = get_amount1_delta(sqrt_ratio_next, sqrt_ratio_current, liquidity, False)
+    else:
+        if not (reached_target and exact_in):
+            amount_in = get_amount1_delta(sqrt_ratio_current, sqrt_ratio_next, liquidity, True)
+        if not (reached_target and not exact_in):
+            amount_out = get_amount0_delta(sqrt_ratio_current, sqrt_ratio_next, liquidity, False)
+
+    if not exact_in and amount_out > -amount_remaining:
+        amount_out = -amount_remaining
+
+    if exact_in and sqrt_ratio_next != sqrt_ratio_target:
+        fee_amount = amount_remaining - amount_in
+    else:
+        fee_amount = mul_div_rounding_up(amount_in, fee_pips, FEE_DENOMINATOR - fee_pips)
+    return sqrt_ratio_next, amount_in, amount_out, fee_amount
+
+
+##############################
+# Algebra adaptive fee
+##############################
+
+def _exp_xg4(x, g, g4):
+    """e^(x/g) * g^4 as computed by Algebra Integral's AdaptiveFee.expXg4."""
+    closest_value = (
+        100000000000000000000, 271828182845904523536, 738905609893065022723,
+        2008553692318766774092, 5459815003314423907811, 14841315910257660342111,
+    )[min(x // g, 5)]
+    x %= g
+    if x >= g // 2:
+        x -= g // 2
+        closest_value = closest_value * 164872127070012814684 // 10 ** 20
+    x_degree = x
+    g_degree = g4
+    res = g_degree
+    g_degree //= g
+    res += x_degree * g_degree
+    g_degree //= g
+    x_degree *= x
+    res += x_degree * g_degree // 2
+    x_degree *= x
+    res += (x_degree * g * 4 + x_degree * x) // 24
+    return res * closest_value // 10 ** 20
+
+
+def _sigmoid(x, g, alpha, beta):
+    if x > beta:
+        x -= beta
+        if x >= 6 * g:
+            return alpha
+        g4 = g ** 4
+        ex = _exp_xg4(x, g, g4)
+        return alpha * ex // (g4 + ex)
+    x = beta - x
+    if x >= 6 * g:
+        return 0
+    g4 = g ** 4
+    return alpha * g4 // (g4 + _exp_xg4(x, g, g4))
+
+
+def adaptive_fee(volatility, alpha1, alpha2, beta1, beta2, gamma1, gamma2, base_fee):
+    """
+    Algebra Integral's dynamic fee for a given average volatility (AdaptiveFee.getFee): the
+    base fee plus two sigmoids of volatility. The live fee is normally read from the pool's
+    globalState(); this predicts how it moves as volatility changes.
+    """
+    volatility //= 15  # normalised to a 15 second interval, as on chain
+    return base_fee + _sigmoid(volatility, gamma1, alpha1, beta1) + _sigmoid(volatility, gamma2, alpha2, beta2)
+
+
+##############################
+# Pool swap simulation
+##############################
+
+class PoolState:
+    """
+    Everything a swap reads: price, tick, in-range liquidity, fee, tick spacing and the net
+    liquidity of every initialized tick (tick -> liquidityNet).
+
+    pool_type selects how the next tick is found, which changes where swap steps (and their
+    rounding) fall: "uni" walks the tick bitmap one 256-tick word at a time like
+    UniswapV3Pool; "alg" jumps straight between initialized ticks like Algebra Integral pools.
+    """
+
+    def __init__(self, sqrt_price_x96, tick, liquidity, fee, tick_spacing, ticks=None, pool_type="uni"):
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.tick = tick
+        self.liquidity = liquidity
+        self.fee = fee
+        self.tick_spacing = tick_spacing
+        self.pool_type = pool_type
+        self.ticks = dict(ticks or {})
+        self._sorted_ticks = sorted(self.ticks)
+
+    def set_tick(self, tick, liquidity_net, initialized=True):
+        """
+        Updates one tick. A tick stays initialized (and a swap step boundary) while any position
+        references it, even if its liquidity_net nets out to 0; pass initialized=False to drop it.
+        """
+        if initialized:
+            if tick not in self.ticks:
+                bisect.insort(self._sorted_ticks, tick)
+            self.ticks[tick] = liquidity_net
+        elif self.ticks.pop(tick, None) is not None:
+            del self._sorted_ticks[bisect.bisect_left(self._sorted_ticks, tick)]
+
+    def next_tick(self, tick, lte):
+        """Returns (next tick, initialized) the way the pool's swap loop would find it."""
+        ticks = self._sorted_ticks
+        if self.pool_type != "uni":
+            if lte:
+                i = bisect.bisect_right(ticks, tick) - 1
+                return (ticks[i], True) if i >= 0 else (MIN_TICK, False)
+            i = bisect.bisect_right(ticks, tick)
+            return (ticks[i], True) if i < len(ticks) else (MAX_TICK, False)
+
+        spacing = self.tick_spacing
+        compressed = tick // spacing
+        if lte:
+            word_start = (compressed >> 8) << 8
+            i = bisect.bisect_right(ticks, compressed * spacing) - 1
+            if i >= 0 and ticks[i] >= word_start * spacing:
+                return ticks[i], True
+            return word_start * spacing, False
+        compressed += 1
+        word_end = ((compressed >> 8) << 8) + 255
+        i = bisect.bisect_left(ticks, compressed * spacing)
+        if i < len(ticks) and ticks[i] <= word_end * spacing:
+            return ticks[i], True
+        return word_end * spacing, False
+
+
+def simulate_swap(pool, zero_for_one, amount_specified, sqrt_price_limit_x96=None):
+    """
+    Runs the pool's swap loop off-chain without changing pool.
+
+    amount_specified > 0 is an exact input, < 0 an exact output, in the input token
+    (exact input) or output token (exact output), just like the swap() argument.
+    sqrt_price_limit_x96 defaults to the extreme price (no limit).
+
+    Returns a dict with the signed pool balance deltas "amount0"/"amount1" (positive = paid
+    into the pool), the post-swap "sqrtPriceX96", "tick" and "liquidity", the total
+    "feeAmount" and "ticksCrossed".
+    """
+    if amount_specified == 0:
+        raise ValueError("amount_specified must be non-zero")
+    if sqrt_price_limit_x96 is None:
+        sqrt_price_limit_x96 = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+    if zero_for_one:
+        if not MIN_SQRT_RATIO < sqrt_price_limit_x96 < pool.sqrt_price_x96:
+            raise ValueError("price limit must be below the current price")
+    elif not pool.sqrt_price_x96 < sqrt_price_limit_x96 < MAX_SQRT_RATIO:
+        raise ValueError("price limit must be above the current price")
+
+    exact_input = amount_specified > 0
+    remaining = amount_specified
+    calculated = 0
+    sqrt_price = pool.sqrt_price_x96
+    tick = pool.tick
+    liquidity = pool.liquidity
+    fee_total = 0
+    ticks_crossed = 0
+
+    while remaining != 0 and sqrt_price != sqrt_price_limit_x96:
+        step_start = sqrt_price
+        tick_next, initialized = pool.next_tick(tick, zero_for_one)
+        tick_next = min(max(tick_next, MIN_TICK), MAX_TICK)
+        sqrt_price_next = get_sqrt_ratio_at_tick(tick_next)
+        if (sqrt_price_next < sqrt_price_limit_x96) if zero_for_one else (sqrt_price_next > sqrt_price_limit_x96):
+            target = sqrt_price_limit_x96
+        else:
+            target = sqrt_price_next
+
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(
+            sqrt_price, target, liquidity, remaining, pool.fee
+        )
+        fee_total += fee_amount
+        if exact_input:
+            remaining -= amount_in + fee_amount
+            calculated -= amount_out
+        else:
+            remaining += amount_out
+            calculated += amount_in + fee_amount
+
+        if sqrt_price == sqrt_price_next:
+            if initialized:
+                liquidity_net = pool.ticks[tick_next]
+                liquidity += -liquidity_net if zero_for_one else liquidity_net
+                ticks_crossed += 1
+            tick = tick_next - 1 if zero_for_one else tick_next
+        elif sqrt_price != step_start:
+            tick = get_tick_at_sqrt_ratio(sqrt_price)
+
+    if zero_for_one == exact_input:
+        amount0, amount1 = amount_specified - remaining, calculated
+    else:
+        amount0, amount1 = calculated, amount_specified - remaining
+    return {
+        "amount0": amount0,
+        "amount1": amount1,
+        "sqrtPriceX96": sqrt_price,
+        "tick": tick,
+        "liquidity": liquidity,
+        "feeAmount": fee_total,
+        "ticksCrossed": ticks_crossed,
+    }
+
+
+def quote_exact_input(pool, zero_for_one, amount_in, sqrt_price_limit_x96=None):
+    """Output amount for an exact input, as a positive integer."""
+    result = simulate_swap(pool, zero_for_one, amount_in, sqrt_price_limit_x96)
+    return -(result["amount1"] if zero_for_one else result["amount0"])
+
+
+def quote_exact_output(pool, zero_for_one, amount_out, sqrt_price_limit_x96=None):
+    """Input amount (fee included) for an exact output, as a positive integer."""
+    result = simulate_swap(pool, zero_for_one, -amount_out, sqrt_price_limit_x96)
+    return result["amount0"] if zero_for_one else result["amount1"]
+
+
+##############################
+# Benchmark
+##############################
+
+def _synthetic_pool(rng, pool_type, n_positions=200):
+    """A pool at price 1.0 with random positions around the current tick."""
+    tick_spacing = 60
+    ticks = {}
+    liquidity = 0
+    for _ in range(n_positions):
+        lower = rng.randint(-300, 299) * tick_spacing
+        upper = lower + rng.randint(1, 400) * tick_spacing
+        amount = rng.randint(10 ** 15, 10 ** 21)
+        ticks[lower] = ticks.get(lower, 0) + amount
+        ticks[upper] = ticks.get(upper, 0) - amount
+        if lower <= 0 < upper:
+            liquidity += amount
+    ticks = {t: net for t, net in ticks.items() if net}
+    return PoolState(Q96, 0, liquidity, 3000, tick_spacing, ticks, pool_type)
+
+
+def main():
+    rng = random.Random(0)
+    for pool_type in ("uni", "alg"):
+        pool = _synthetic_pool(rng, pool_type)
+        for amount in (10 ** 15, 10 ** 18, 10 ** 21, 10 ** 23):
+            runs = 2000
+            started = time.perf_counter()
+            for _ in range(runs):
+                result = simulate_swap(pool, True, amount)
+            elapsed = (time.perf_counter() - started) / runs
+            print(f"{pool_type}: exact input {amount:.0e} -> out {-result['amount1']}, "
+                  f"{result['ticksCrossed']} ticks crossed, {elapsed * 1e6:.1f} us per quote")
+
+
+if __name__ == "__main__":
+    main()
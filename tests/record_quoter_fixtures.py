@@ -0,0 +1,159 @@
+"""
+Records the swapSimulator fixtures in fixtures/quoter_v3.json.
+
+Deploys the Uniswap V3 factory, pools, NonfungiblePositionManager and QuoterV2 from their
+compiled artifacts (the Hardhat JSON files shipped in web3-ethereum-defi's eth_defi/abi/uniswap_v3,
+plus ERC20MockDecimals.json) on an eth-tester chain, mints a few positions into each pool and
+asks QuoterV2 for exact-input and exact-output quotes. The pool state (slot0, liquidity, every
+initialized tick's liquidityNet) is stored next to each pool's quotes, so test_swap_simulator.py
+can replay them without a chain.
+
+Usage: python tests/record_quoter_fixtures.py <artifacts directory>
+"""
+import json
+import os
+import sys
+
+from eth_tester import EthereumTester, PyEVMBackend
+from web3 import EthereumTesterProvider, Web3
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "quoter_v3.json")
+
+# (name, fee, tick spacing, initial sqrtPriceX96, positions as (tick lower, tick upper, amount))
+POOLS = [
+    ("fee3000_price1", 3000, 60, 2 ** 96, [
+        (-600, 600, 10 ** 24),
+        (-120, 180, 5 * 10 ** 23),
+        (-3000, -60, 2 * 10 ** 23),
+        (60, 4800, 3 * 10 ** 23),
+        (-18000, 18000, 10 ** 22),
+    ]),
+    # Positions spread over several 256-tick bitmap words (tick spacing 10).
+    ("fee500_wide", 500, 10, 125270724187523965593206900784, [
+        (8000, 10500, 4 * 10 ** 22),
+        (9100, 9300, 2 * 10 ** 23),
+        (4000, 9170, 10 ** 22),
+        (9170, 14000, 7 * 10 ** 21),
+        (-20000, 30000, 10 ** 20),
+    ]),
+    ("fee10000_narrow", 10000, 200, 79623317895830914510639640423, [
+        (-200, 200, 10 ** 21),
+        (0, 400, 2 * 10 ** 21),
+        (-1000, -200, 5 * 10 ** 20),
+    ]),
+]
+
+# (zeroForOne, amount, exact input?, sqrtPriceLimitX96 as a fraction of the price: None = no limit)
+QUOTES = [
+    (True, 10 ** 15, True, None),
+    (False, 10 ** 15, True, None),
+    (True, 10 ** 21, True, None),
+    (False, 10 ** 21, True, None),
+    (True, 3 * 10 ** 22, True, None),
+    (False, 3 * 10 ** 22, True, None),
+    (True, 10 ** 24, True, (99, 100)),
+    (False, 10 ** 24, True, (101, 100)),
+    (True, 10 ** 26, True, (70, 100)),
+    (False, 10 ** 26, True, (130, 100)),
+    (True, 10 ** 20, False, None),
+    (False, 10 ** 20, False, None),
+    (True, 5 * 10 ** 21, False, None),
+    (False, 5 * 10 ** 21, False, None),
+]
+
+
+def _artifact(directory, name):
+    with open(os.path.join(directory, name), 'r') as artifact_file:
+        artifact = json.load(artifact_file)
+    bytecode = artifact["bytecode"]
+    return artifact["abi"], bytecode["object"] if isinstance(bytecode, dict) else bytecode
+
+
+def main():
+    directory = sys.argv[1]
+    backend = PyEVMBackend(genesis_parameters=PyEVMBackend.generate_genesis_params(overrides={"gas_limit": 30_000_000}))
+    w3 = Web3(EthereumTesterProvider(EthereumTester(backend)))
+    w3.eth.default_account = w3.eth.accounts[0]
+
+    def deploy(name, *args):
+        abi, bytecode = _artifact(directory, name)
+        tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact({"gas": 29_000_000})
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        return w3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+    def send(fn):
+        w3.eth.wait_for_transaction_receipt(fn.transact({"gas": 29_000_000}))
+
+    factory = deploy("UniswapV3Factory.json")
+    tokens = sorted((deploy("ERC20MockDecimals.json", f"T{i}", f"T{i}", 10 ** 40, 18) for i in range(2)),
+                    key=lambda token: int(token.address, 16))
+    weth = tokens[0].address  # never used, but the periphery contracts need an address
+    manager = deploy("NonfungiblePositionManager.json", factory.address, weth, weth)
+    quoter = deploy("QuoterV2.json", factory.address, weth)
+    pool_abi, _ = _artifact(directory, "UniswapV3Pool.json")
+    for token in tokens:
+        send(token.functions.approve(manager.address, 2 ** 256 - 1))
+
+    fixtures = []
+    for name, fee, spacing, sqrt_price, positions in POOLS:
+        if factory.functions.feeAmountTickSpacing(fee).call() == 0:
+            send(factory.functions.enableFeeAmount(fee, spacing))
+        send(factory.functions.createPool(tokens[0].address, tokens[1].address, fee))
+        pool = w3.eth.contract(address=factory.functions.getPool(tokens[0].address, tokens[1].address, fee).call(),
+                               abi=pool_abi)
+        send(pool.functions.initialize(sqrt_price))
+        for lower, upper, amount in positions:
+            send(manager.functions.mint((tokens[0].address, tokens[1].address, fee, lower, upper, amount, amount,
+                                         0, 0, w3.eth.default_account, 2 ** 64)))
+
+        slot0 = pool.functions.slot0().call()
+        ticks = {}
+        for tick in sorted({t for lower, upper, _ in positions for t in (lower, upper)}):
+            info = pool.functions.ticks(tick).call()
+            if info[-1]:  # initialized
+                ticks[str(tick)] = str(info[1])
+        quotes = []
+        for zero_for_one, amount, exact_input, limit in QUOTES:
+            token_in, token_out = (tokens[0], tokens[1]) if zero_for_one else (tokens[1], tokens[0])
+            sqrt_limit = 0 if limit is None else slot0[0] * limit[0] // limit[1]
+            try:
+                if exact_input:
+                    out, price_after, crossed, _ = quoter.functions.quoteExactInputSingle(
+                        (token_in.address, token_out.address, amount, fee, sqrt_limit)).call()
+                    amount_in, amount_out = None, out
+                else:
+                    amount_in, price_after, crossed, _ = quoter.functions.quoteExactOutputSingle(
+                        (token_in.address, token_out.address, amount, fee, sqrt_limit)).call()
+                    amount_out = amount
+            except Exception as e:
+                print(f"{name}: quote {zero_for_one} {amount} {exact_input} failed ({e}), skipped")
+                continue
+            quotes.append({
+                "zeroForOne": zero_for_one,
+                "amountSpecified": str(amount if exact_input else -amount),
+                "sqrtPriceLimitX96": str(sqrt_limit) if sqrt_limit else None,
+                "amountIn": None if amount_in is None else str(amount_in),
+                "amountOut": str(amount_out),
+                "sqrtPriceX96After": str(price_after),
+                "initializedTicksCrossed": crossed,
+            })
+        fixtures.append({
+            "name": name,
+            "fee": fee,
+            "tickSpacing": spacing,
+            "sqrtPriceX96": str(slot0[0]),
+            "tick": slot0[1],
+            "liquidity": str(pool.functions.liquidity().call()),
+            "ticks": ticks,
+            "quotes": quotes,
+        })
+        print(f"{name}: {len(ticks)} ticks, {len(quotes)} quotes")
+
+    os.makedirs(os.path.dirname(FIXTURE_PATH), exist_ok=True)
+    with open(FIXTURE_PATH, 'w') as fixture_file:
+        json.dump({"source": "Uniswap V3 core/periphery bytecode on eth-tester, QuoterV2", "pools": fixtures},
+                  fixture_file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+AccountLedger bookkeeping from synthetic receipts: wraps and unwraps logged both as a mint/burn
+Transfer and as Deposit/Withdrawal (OpenZeppelin-based wS), WETH9-style wraps logged only as
+Deposit/Withdrawal, transferFrom allowances with and without an Approval log, and expected
+changes counted in while a transaction is in flight.
+"""
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from accountLedger import (
+    APPROVAL_TOPIC, DEPOSIT_TOPIC, MAX_UINT256, WITHDRAWAL_TOPIC, ZERO_ADDRESS, AccountLedger,
+)
+from txPipeline import TRANSFER_TOPIC, PendingTx
+
+ACCOUNT = Web3.to_checksum_address("0x" + "a1" * 20)
+EXECUTOR = Web3.to_checksum_address("0x" + "e1" * 20)
+POOL = Web3.to_checksum_address("0x" + "b1" * 20)
+WS = Web3.to_checksum_address("0x" + "c1" * 20)
+TOKEN = Web3.to_checksum_address("0x" + "d1" * 20)
+
+
+def _topic(address):
+    return HexBytes(encode(["address"], [address]))
+
+
+def _log(token, topic, *addresses, amount):
+    return {
+        "address": token,
+        "topics": [HexBytes(topic)] + [_topic(a) for a in addresses],
+        "data": HexBytes(encode(["uint256"], [amount])),
+    }
+
+
+def transfer(token, sender, recipient, amount):
+    return _log(token, TRANSFER_TOPIC, sender, recipient, amount=amount)
+
+
+def approval(token, owner, spender, amount):
+    return _log(token, APPROVAL_TOPIC, owner, spender, amount=amount)
+
+
+def deposit(token, account, amount):
+    return _log(token, DEPOSIT_TOPIC, account, amount=amount)
+
+
+def withdrawal(token, account, amount):
+    return _log(token, WITHDRAWAL_TOPIC, account, amount=amount)
+
+
+def receipt(to, *logs, status=1):
+    return {"to": to, "status": status, "logs": list(logs)}
+
+
+def ledger(balances=None, allowances=None):
+    account_ledger = AccountLedger(None, ACCOUNT)
+    account_ledger.seed(balances=balances, allowances=allowances)
+    return account_ledger
+
+
+def test_wrap_logged_as_mint_and_deposit_is_counted_once():
+    account_ledger = ledger({WS: 100})
+    account_ledger.apply_receipt(receipt(WS, transfer(WS, ZERO_ADDRESS, ACCOUNT, 40), deposit(WS, ACCOUNT, 40)))
+    assert account_ledger.balance(WS) == 140
+
+
+def test_unwrap_logged_as_burn_and_withdrawal_is_counted_once():
+    account_ledger = ledger({WS: 100})
+    account_ledger.apply_receipt(receipt(WS, withdrawal(WS, ACCOUNT, 30), transfer(WS, ACCOUNT, ZERO_ADDRESS, 30)))
+    assert account_ledger.balance(WS) == 70
+
+
+def test_weth9_style_wrap_and_unwrap_are_counted_from_deposit_and_withdrawal():
+    account_ledger = ledger({WS: 100})
+    account_ledger.apply_receipt(receipt(WS, deposit(WS, ACCOUNT, 40)))
+    assert account_ledger.balance(WS) == 140
+    account_ledger.apply_receipt(receipt(WS, withdrawal(WS, ACCOUNT, 25)))
+    assert account_ledger.balance(WS) == 115
+
+
+def test_mint_of_another_token_does_not_hide_a_deposit():
+    account_ledger = ledger({WS: 100, TOKEN: 0})
+    account_ledger.apply_receipt(receipt(WS, transfer(TOKEN, ZERO_ADDRESS, ACCOUNT, 5), deposit(WS, ACCOUNT, 40)))
+    assert account_ledger.balance(WS) == 140
+    assert account_ledger.balance(TOKEN) == 5
+
+
+def test_transfer_from_lowers_the_callers_allowance():
+    account_ledger = ledger({TOKEN: 1000}, {(TOKEN, EXECUTOR): 500})
+    account_ledger.apply_receipt(receipt(EXECUTOR, transfer(TOKEN, ACCOUNT, POOL, 200), transfer(WS, POOL, ACCOUNT, 7)))
+    assert account_ledger.balance(TOKEN) == 800
+    assert account_ledger.allowance(TOKEN, EXECUTOR) == 300
+    # WS was never read, so it is not tracked from a receipt either.
+    assert account_ledger.balance(WS) is None
+
+
+def test_approval_logged_before_transfer_sets_the_allowance_once():
+    account_ledger = ledger({TOKEN: 1000}, {(TOKEN, EXECUTOR): 500})
+    account_ledger.apply_receipt(receipt(
+        EXECUTOR, approval(TOKEN, ACCOUNT, EXECUTOR, 300), transfer(TOKEN, ACCOUNT, POOL, 200),
+    ))
+    assert account_ledger.allowance(TOKEN, EXECUTOR) == 300
+
+
+def test_unlimited_allowance_is_not_lowered():
+    account_ledger = ledger({TOKEN: 1000}, {(TOKEN, EXECUTOR): MAX_UINT256})
+    account_ledger.apply_receipt(receipt(EXECUTOR, transfer(TOKEN, ACCOUNT, POOL, 200)))
+    assert account_ledger.allowance(TOKEN, EXECUTOR) == MAX_UINT256
+
+
+def test_tracked_transaction_counts_until_its_receipt_is_applied():
+    account_ledger = ledger({WS: 100})
+    pending = PendingTx(b"\x01" * 32)
+    account_ledger.track(pending, balances={WS: 40})
+    assert account_ledger.balance(WS) == 140
+    # Values read from the chain while it is in flight are not taken over.
+    assert not account_ledger.seed(balances={TOKEN: 5})
+    pending.set_result(receipt(WS, transfer(WS, ZERO_ADDRESS, ACCOUNT, 40), deposit(WS, ACCOUNT, 40)))
+    assert account_ledger.balance(WS) == 140
+    assert account_ledger.stats()["in_flight"] == 0
+
+
+def test_reverted_transaction_drops_its_expected_changes():
+    account_ledger = ledger({TOKEN: 1000}, {(TOKEN, EXECUTOR): 500})
+    pending = PendingTx(b"\x02" * 32)
+    account_ledger.track(pending, balances={TOKEN: -200}, allowances={(TOKEN, EXECUTOR): -200})
+    assert account_ledger.balance(TOKEN) == 800
+    assert account_ledger.allowance(TOKEN, EXECUTOR) == 300
+    pending.set_result(receipt(EXECUTOR, status=0))
+    assert account_ledger.balance(TOKEN) == 1000
+    assert account_ledger.allowance(TOKEN, EXECUTOR) == 500
@@ -0,0 +1,131 @@
+"""
+GasModel fitting, gas limits and learning from receipts, and swap_ticks_crossed on Swap logs of
+both Swap event variants (Uniswap V3 / Algebra 1.0 and Algebra Integral 1.2).
+"""
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from gasModel import SWAP_PLUGIN_FEE_TOPIC, SWAP_TOPIC, GasModel, swap_ticks_crossed
+
+KEY = ("0x" + "e1" * 20, "0x" + "b1" * 20, "zeroForOne")
+POOL = Web3.to_checksum_address("0x" + "b1" * 20)
+
+
+def receipt(gas_used, status=1, logs=()):
+    return {"gasUsed": gas_used, "status": status, "logs": list(logs)}
+
+
+def trained(samples, margin=0.1):
+    """A model without a file, trained on (ticks crossed, gas used) receipts of KEY."""
+    model = GasModel(None, margin=margin)
+    for ticks, gas_used in samples:
+        model.observe(KEY, receipt(gas_used), 2_000_000, ticks)
+    return model
+
+
+def failing_estimate():
+    raise ValueError("execution reverted")
+
+
+def test_fit_is_least_squares_with_the_largest_residual():
+    model = GasModel(None)
+    intercept, slope, residual = model._fit([(0, 100_000), (10, 120_000), (20, 140_000), (10, 125_000)])
+    assert slope == pytest.approx(2_000)
+    assert intercept == pytest.approx(101_250)
+    assert residual == pytest.approx(3_750)
+
+
+def test_fit_never_has_a_negative_slope():
+    intercept, slope, residual = GasModel(None)._fit([(0, 150_000), (10, 140_000), (20, 130_000)])
+    assert slope == 0.0
+    assert intercept == pytest.approx(140_000)
+    assert residual == pytest.approx(10_000)
+
+
+def test_limit_within_the_samples_uses_the_fit():
+    model = trained([(0, 100_000), (10, 120_000), (20, 140_000)])
+    assert model.limit(KEY, 10, estimate=failing_estimate) == 132_000
+    assert model.predict(KEY, 10) == pytest.approx(120_000)
+    # Without ticks_crossed, the largest number of ticks seen is assumed.
+    assert model.limit(KEY) == 154_000
+
+
+def test_limit_beyond_the_samples_takes_the_estimate_if_larger():
+    model = trained([(0, 100_000), (10, 120_000)])
+    assert model.limit(KEY, 50, estimate=lambda: 400_000) == 440_000
+    # The fit still wins where it asks for more than the estimate.
+    assert model.limit(KEY, 50, estimate=lambda: 100_000) == int(200_000 * 1.1)
+    assert model.stats()["extrapolated"] == 2
+
+
+def test_limit_with_one_tick_distance_sampled_does_not_trust_a_flat_line():
+    model = trained([(2, 100_000), (2, 104_000)])
+    assert model.limit(KEY, 2, estimate=failing_estimate) == int(104_000 * 1.1)
+    assert model.limit(KEY, 0, estimate=lambda: 300_000) == 330_000
+    assert model.limit(KEY, 40, estimate=failing_estimate, default=2_000_000) == 2_000_000
+
+
+def test_limit_without_receipts_caches_the_estimate_or_uses_the_default():
+    model = GasModel(None)
+    calls = []
+
+    def estimate():
+        calls.append(1)
+        return 50_000
+
+    assert model.limit(KEY, estimate=estimate) == 55_000
+    assert model.limit(KEY, estimate=estimate) == 55_000
+    assert len(calls) == 1
+    assert model.limit(("0x" + "c1" * 20, "approve"), estimate=failing_estimate, default=100_000) == 100_000
+    assert model.stats()["defaulted"] == 1
+
+
+def test_observe_learns_receipts_and_drops_the_cached_estimate():
+    model = GasModel(None)
+    model.limit(KEY, estimate=lambda: 500_000)
+    model.observe(KEY, receipt(100_000), 550_000, 3)
+    assert model.limit(KEY, 3) == 110_000
+    stats = model.stats()
+    assert stats["observed"] == 1
+    assert stats["mean_limit_used"] == pytest.approx(100_000 / 550_000)
+
+
+def test_out_of_gas_revert_is_learned_as_its_limit_plus_margin():
+    model = trained([(5, 100_000)])
+    model.observe(KEY, receipt(110_000, status=0), 110_000, 5)
+    assert model.stats()["out_of_gas"] == 1
+    assert model.predict(KEY, 5) == pytest.approx((100_000 + 121_000) / 2)
+    assert model.limit(KEY, 5) > 121_000
+
+
+def test_other_reverts_are_not_learned():
+    model = trained([(5, 100_000)])
+    model.observe(KEY, receipt(40_000, status=0), 110_000, 5)
+    assert model.stats()["out_of_gas"] == 0
+    assert model.predict(KEY, 5) == 100_000
+
+
+def test_samples_are_saved_and_loaded(tmp_path):
+    path = str(tmp_path / "gas_model.json")
+    model = GasModel(path)
+    model.observe(KEY, receipt(100_000), 200_000, 0)
+    model.observe(KEY, receipt(130_000), 200_000, 15)
+    assert GasModel(path).limit(KEY, 15) == model.limit(KEY, 15)
+
+
+def _swap_log(topic, tick, extra=()):
+    types = ["int256", "int256", "uint160", "uint128", "int24"] + ["uint24"] * len(extra)
+    return {
+        "address": POOL,
+        "topics": [HexBytes(topic), HexBytes(encode(["address"], [POOL])), HexBytes(encode(["address"], [POOL]))],
+        "data": HexBytes(encode(types, [1, -1, 2 ** 96, 10 ** 18, tick, *extra])),
+    }
+
+
+@pytest.mark.parametrize("topic, extra", [(SWAP_TOPIC, ()), (SWAP_PLUGIN_FEE_TOPIC, (0, 100))], ids=["v1.0", "integral-1.2"])
+def test_swap_ticks_crossed(topic, extra):
+    logs = [_swap_log(topic, -40, extra), _swap_log(topic, -75, extra)]
+    assert swap_ticks_crossed(receipt(150_000, logs=logs), POOL, 20) == 95
+    assert swap_ticks_crossed(receipt(150_000, logs=logs), "0x" + "c1" * 20, 20) == 0
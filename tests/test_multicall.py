@@ -0,0 +1,167 @@
+"""
+multicall.py and poolProbe.py against the real Multicall3 runtime code (fixtures/multicall3.json)
+on an eth-tester chain.
+
+Mock pools are tiny contracts placed in the genesis state that answer a fixed set of selectors
+with fixed return data and revert on anything else, so slot0()/globalState() probing sees what
+it would see on Uniswap V3, Algebra and V2 pools.
+"""
+import json
+import os
+
+import pytest
+from eth_abi import encode
+from eth_tester import EthereumTester, PyEVMBackend
+from web3 import EthereumTesterProvider, Web3
+
+from multicall import (
+    DEFAULT_MULTICALL3_ADDRESS, GLOBAL_STATE, LIQUIDITY, SLOT0, TOKEN0, TOKEN1, aggregate3, read_pool_states, selector,
+)
+from poolProbe import EMPTY_CODE_HASH, NO_ACCOUNT_HASH, probe_pool_types
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "multicall3.json"), 'r') as fixture_file:
+    MULTICALL3_CODE = bytes.fromhex(json.load(fixture_file)["runtime"][2:])
+
+GET_RESERVES = selector("getReserves()")
+TOKEN_A = Web3.to_checksum_address("0x" + "aa" * 20)
+TOKEN_B = Web3.to_checksum_address("0x" + "bb" * 20)
+SQRT_PRICE = 2 ** 96 * 3
+TICK = -1234
+
+UNI = Web3.to_checksum_address("0x" + "01" * 20)
+ALG = Web3.to_checksum_address("0x" + "02" * 20)
+UNSEEDED = Web3.to_checksum_address("0x" + "03" * 20)  # created but not initialized: price 0
+V2 = Web3.to_checksum_address("0x" + "04" * 20)
+NOT_A_POOL = Web3.to_checksum_address("0x" + "05" * 20)  # answers token0() only
+NO_CODE = Web3.to_checksum_address("0x" + "06" * 20)
+
+
+def _responder_code(responses):
+    """
+    Runtime code that returns responses[selector] for calls with that selector and reverts
+    otherwise: a selector dispatch table, one CODECOPY/RETURN stub per selector, then the data.
+    """
+    table_size = 6 + 11 * len(responses) + 4
+    stubs_size = 16 * len(responses)
+    dispatch, stubs, blobs = [bytes.fromhex("600035" "60e01c")], [], []
+    data_offset = table_size + stubs_size
+    for i, (sel, data) in enumerate(responses.items()):
+        stub = table_size + 16 * i
+        dispatch.append(b"\x80\x63" + sel + b"\x14\x61" + stub.to_bytes(2, "big") + b"\x57")
+        size, offset = len(data).to_bytes(2, "big"), data_offset.to_bytes(2, "big")
+        stubs.append(b"\x5b\x61" + size + b"\x61" + offset + b"\x60\x00\x39\x61" + size + b"\x60\x00\xf3")
+        blobs.append(data)
+        data_offset += len(data)
+    dispatch.append(bytes.fromhex("600080fd"))
+    return b"".join(dispatch + stubs + blobs)
+
+
+def _pool_code(price_getter, price_words, liquidity=10 ** 18):
+    return _responder_code({
+        price_getter: encode(["uint256"] * len(price_words), price_words),
+        TOKEN0: encode(["address"], [TOKEN_A]),
+        TOKEN1: encode(["address"], [TOKEN_B]),
+        LIQUIDITY: encode(["uint128"], [liquidity]),
+    })
+
+
+CONTRACTS = {
+    DEFAULT_MULTICALL3_ADDRESS: MULTICALL3_CODE,
+    # slot0(): sqrtPriceX96, tick, observationIndex, observationCardinality, ..., unlocked
+    UNI: _pool_code(SLOT0, [SQRT_PRICE, TICK % 2 ** 256, 0, 1, 1, 0, 1]),
+    # globalState(): price, tick, fee, pluginConfig, communityFee, unlocked
+    ALG: _pool_code(GLOBAL_STATE, [SQRT_PRICE, TICK % 2 ** 256, 2500, 0, 0, 1]),
+    UNSEEDED: _pool_code(SLOT0, [0, 0, 0, 0, 0, 0, 0], liquidity=0),
+    V2: _responder_code({
+        GET_RESERVES: encode(["uint112", "uint112", "uint32"], [0, 0, 0]),
+        TOKEN0: encode(["address"], [TOKEN_A]),
+        TOKEN1: encode(["address"], [TOKEN_B]),
+    }),
+    NOT_A_POOL: _responder_code({TOKEN0: encode(["address"], [TOKEN_A])}),
+}
+
+
+@pytest.fixture(scope="module")
+def w3():
+    genesis_state = PyEVMBackend.generate_genesis_state(num_accounts=1)
+    for address, code in CONTRACTS.items():
+        genesis_state[bytes.fromhex(address[2:])] = {"balance": 0, "nonce": 1, "code": code, "storage": {}}
+    return Web3(EthereumTesterProvider(EthereumTester(PyEVMBackend(genesis_state=genesis_state))))
+
+
+@pytest.fixture
+def eth_calls(w3, monkeypatch):
+    """Counts the eth_call requests made through w3."""
+    calls = []
+    call = w3.eth.call
+
+    def counting_call(*args, **kwargs):
+        calls.append(args)
+        return call(*args, **kwargs)
+
+    monkeypatch.setattr(w3.eth, "call", counting_call)
+    return calls
+
+
+def test_aggregate3_returns_results_in_order(w3, eth_calls):
+    calls = [(UNI, TOKEN0), (ALG, TOKEN1), (UNI, LIQUIDITY), (ALG, GLOBAL_STATE)]
+    results = aggregate3(w3, calls)
+    assert len(eth_calls) == 1
+    assert results == [(True, bytes(w3.eth.call({"to": target, "data": data}))) for target, data in calls]
+
+
+def test_aggregate3_allows_failures(w3):
+    results = aggregate3(w3, [(UNI, GLOBAL_STATE), (UNI, TOKEN0), (NOT_A_POOL, SLOT0), (NO_CODE, SLOT0)])
+    assert results[0] == (False, b"")
+    assert results[1] == (True, encode(["address"], [TOKEN_A]))
+    assert results[2] == (False, b"")
+    # Multicall3 calls an address without code like the EVM does: success, no data.
+    assert results[3] == (True, b"")
+
+
+@pytest.mark.parametrize("max_calldata_bytes, expected_chunks", [(64 * 1024, 1), (5 * 32 + 32, 40), (1000, 8)])
+def test_aggregate3_chunks_by_calldata_size(w3, eth_calls, max_calldata_bytes, expected_chunks):
+    calls = [(UNI if i % 2 else ALG, [TOKEN0, TOKEN1, LIQUIDITY, SLOT0][i % 4]) for i in range(40)]
+    results = aggregate3(w3, calls, max_calldata_bytes=max_calldata_bytes)
+    assert len(eth_calls) == expected_chunks
+    assert results == aggregate3(w3, calls)
+
+
+def test_read_pool_states_probes_both_price_getters(w3, eth_calls):
+    states = read_pool_states(w3, [UNI, ALG, NOT_A_POOL])
+    assert len(eth_calls) == 1
+    assert states[UNI] == {
+        "type": "uni", "sqrtPriceX96": SQRT_PRICE, "tick": TICK, "fee": None,
+        "token0": TOKEN_A, "token1": TOKEN_B, "liquidity": 10 ** 18,
+    }
+    assert states[ALG] == {
+        "type": "alg", "sqrtPriceX96": SQRT_PRICE, "tick": TICK, "fee": 2500,
+        "token0": TOKEN_A, "token1": TOKEN_B, "liquidity": 10 ** 18,
+    }
+    assert states[NOT_A_POOL]["type"] is None
+    assert states[NOT_A_POOL]["token0"] == TOKEN_A
+    assert states[NOT_A_POOL]["token1"] is None
+
+
+def test_read_pool_states_with_known_types(w3):
+    states = read_pool_states(w3, [UNI, ALG], pool_types={UNI: "uni", ALG: "uni"})
+    assert states[UNI]["type"] == "uni"
+    # Only slot0() is asked for a pool said to be "uni"; an Algebra pool does not answer it.
+    assert states[ALG]["type"] is None
+    assert states[ALG]["token0"] == TOKEN_A
+
+
+def test_probe_pool_types(w3):
+    probed = probe_pool_types(w3, [UNI, ALG, UNSEEDED, V2, NOT_A_POOL, NO_CODE])
+    assert {address: pool_type for address, (_, pool_type) in probed.items()} == {
+        UNI: "uni", ALG: "alg", UNSEEDED: "uni", V2: "v2", NOT_A_POOL: None, NO_CODE: None,
+    }
+    assert probed[UNI][0] == Web3.to_hex(Web3.keccak(CONTRACTS[UNI]))
+    assert probed[NO_CODE][0] in (EMPTY_CODE_HASH, NO_ACCOUNT_HASH)
+
+
+def test_probe_pool_types_chunks(w3, eth_calls):
+    addresses = [UNI, ALG, UNSEEDED, V2, NOT_A_POOL]
+    probed = probe_pool_types(w3, addresses, max_addresses=2)
+    assert len(eth_calls) == 3
+    assert probed == probe_pool_types(w3, addresses)
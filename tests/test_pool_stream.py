@@ -0,0 +1,84 @@
+"""
+PoolStream against serve_replay: a short recording (fixtures/pool_stream_replay.jsonl, in the
+--record format) of newHeads and Swap/Fee logs from a Uniswap V3 pool and an Algebra Integral
+1.2 pool. The connection is dropped partway, a log is replayed after the reconnect and then
+removed by a reorg, and the resulting PoolStateTable is checked.
+"""
+import os
+
+import anyio
+from web3 import Web3
+
+from poolStream import (
+    END_OF_BLOCK, FEE_TOPIC, SWAP_PLUGIN_FEE_TOPIC, SWAP_TOPIC, PoolStream, decode_pool_log, load_recording,
+    serve_replay,
+)
+
+RECORDING = load_recording(os.path.join(os.path.dirname(__file__), "fixtures", "pool_stream_replay.jsonl"))
+UNI = Web3.to_checksum_address("0x" + "01" * 20)
+ALG = Web3.to_checksum_address("0x" + "02" * 20)
+Q96 = 2 ** 96
+
+
+def _state(pool_type, fee, sqrt_price, liquidity, tick):
+    return {"type": pool_type, "fee": fee, "sqrtPriceX96": sqrt_price, "liquidity": liquidity, "tick": tick}
+
+
+# What each resync poll returns, in order: on connect, after the reconnect (the polling node is
+# one block behind the websocket) and for the stale pool once block 103 arrives.
+RESYNCS = [
+    ({UNI: _state("uni", None, Q96, 4 * 10 ** 18, 0), ALG: _state("alg", 500, Q96, 7 * 10 ** 18, 0)}, 100),
+    ({UNI: _state("uni", None, Q96 * 3, 5 * 10 ** 18, 10986),
+      ALG: _state("alg", 2900, Q96 * 2, 7 * 10 ** 18, 6931)}, 101),
+    ({UNI: _state("uni", None, Q96 * 3, 4 * 10 ** 18, 10986)}, 103),
+]
+
+
+def test_decode_pool_log_reads_both_swap_variants_and_fee():
+    logs = [item["result"] for item in RECORDING if item["kind"] == "logs"]
+    assert {log["topics"][0] for log in logs} == {SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC, FEE_TOPIC}
+    uni_swap, alg_swap, fee = (decode_pool_log(log) for log in logs[:3])
+    assert (uni_swap["pool"], uni_swap["sqrtPriceX96"], uni_swap["tick"]) == (UNI, Q96 * 3, 10986)
+    assert (alg_swap["pool"], alg_swap["sqrtPriceX96"], alg_swap["liquidity"], alg_swap["tick"]) == \
+        (ALG, Q96 * 2, 7 * 10 ** 18, 6931)
+    assert (alg_swap["amount0"], alg_swap["amount1"]) == (10 ** 18, -3 * 10 ** 18)
+    assert (fee["event"], fee["fee"], fee["logIndex"]) == ("Fee", 2900, 2)
+
+
+def test_stream_replay_with_reconnect_and_reorg():
+    resyncs = []
+    updates = []
+
+    def resync(pools):
+        resyncs.append(pools)
+        return RESYNCS[len(resyncs) - 1]
+
+    async def run():
+        with anyio.fail_after(10):
+            async with anyio.create_task_group() as tg:
+                server = await tg.start(serve_replay, RECORDING, "127.0.0.1", 0, 6)
+                port = server.sockets[0].getsockname()[1]
+                stream = PoolStream(f"ws://127.0.0.1:{port}", [UNI, ALG], resync=resync, reconnect_delay=0.01)
+
+                def on_update(pool, state):
+                    updates.append((pool, state["blockNumber"]))
+                    if state["blockNumber"] == 103:
+                        stream.close()
+
+                stream.on_update = on_update
+                await stream.run()
+                tg.cancel_scope.cancel()
+        return stream
+
+    stream = anyio.run(run)
+    table = stream.table
+    assert stream.connections == 2
+    assert resyncs == [[UNI, ALG], [UNI, ALG], [UNI]]
+    # The Swap replayed after the reconnect is not applied twice.
+    assert updates == [(UNI, 101), (ALG, 101), (ALG, 101), (UNI, 102), (ALG, 103)]
+    assert table.head == 103
+    assert table.stale == set()
+    # The reorged-out Swap at block 102 is replaced by the poll at block 103.
+    assert table.get(UNI) == RESYNCS[2][0][UNI] | {"blockNumber": 103}
+    assert table._positions[UNI] == (103, END_OF_BLOCK)
+    assert table.get(ALG) == _state("alg", 2900, Q96 * 5 // 2, 6 * 10 ** 18, 9162) | {"blockNumber": 103}
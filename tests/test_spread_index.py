@@ -0,0 +1,163 @@
+"""
+SpreadIndex and TokenSpreads: single-pool updates and removals, the liquidity/DEX filters,
+sync_entries, top-K after spreads were superseded, and concurrent updates and top-K reads.
+"""
+import heapq
+import random
+import threading
+
+import pytest
+
+from spreadIndex import SpreadIndex, TokenSpreads
+
+TOKEN_A = "0x" + "aa" * 20
+TOKEN_B = "0x" + "bb" * 20
+TOKEN_C = "0x" + "cc" * 20
+
+
+def entry(pair_address, price, liquidity=50_000, dex_id="swapx", pair_name="X/wS"):
+    return {"dexId": dex_id, "priceUsd": price, "pairAddress": pair_address, "liquidityUsd": liquidity,
+            "pairName": pair_name}
+
+
+def index_with(prices_by_token):
+    index = SpreadIndex(min_liquidity=10_000, allowed_dexes=None)
+    for token, prices in prices_by_token.items():
+        for i, price in enumerate(prices):
+            index.update_pool(token, f"{token}-{i}", price, 50_000, "swapx")
+    return index
+
+
+def test_token_spreads_tracks_highest_and_lowest():
+    spreads = TokenSpreads(TOKEN_A)
+    spreads.set_pool(entry("p1", 1.0), 1)
+    assert spreads.best() is None
+    spreads.set_pool(entry("p2", 1.5), 2)
+    spreads.set_pool(entry("p3", 0.5), 3)
+    assert spreads.best()["diffPercent"] == pytest.approx(200.0)
+    spreads.set_pool(entry("p3", 1.2), 4)  # update in place
+    assert spreads.best()["lowest"]["pairAddress"] == "p1"
+    assert spreads.best()["diffPercent"] == pytest.approx(50.0)
+    assert spreads.remove_pool("p2")
+    assert not spreads.remove_pool("p2")
+    assert spreads.best()["highest"]["pairAddress"] == "p3"
+
+
+def test_update_and_remove_pool():
+    index = index_with({TOKEN_A: [1.0, 1.1]})
+    best = index.best_spread(TOKEN_A.upper().replace("0X", "0x"))
+    assert best["diffPercent"] == pytest.approx(10.0)
+    assert best["token"] == TOKEN_A
+    index.update_pool(TOKEN_A, f"{TOKEN_A}-1", 1.3, 50_000, "swapx")
+    assert index.best_spread(TOKEN_A)["diffPercent"] == pytest.approx(30.0)
+    index.remove_pool(TOKEN_A, f"{TOKEN_A}-0")
+    assert index.best_spread(TOKEN_A) is None
+    assert index.top_spreads() == []
+
+
+def test_pools_failing_the_filters_are_removed():
+    index = SpreadIndex(min_liquidity=10_000, allowed_dexes={"swapx"})
+    index.update_pool(TOKEN_A, "p1", 1.0, 50_000, "swapx")
+    index.update_pool(TOKEN_A, "p2", 2.0, 50_000, "SwapX")
+    index.update_pool(TOKEN_A, "p3", 9.0, 50_000, "other")
+    index.update_pool(TOKEN_A, "p4", 0.1, 500, "swapx")
+    assert index.best_spread(TOKEN_A)["diffPercent"] == pytest.approx(100.0)
+    index.update_pool(TOKEN_A, "p2", 2.0, 500, "swapx")  # liquidity dropped below the minimum
+    assert index.best_spread(TOKEN_A) is None
+
+
+def test_sync_entries_updates_changed_and_removes_missing_pools():
+    index = SpreadIndex(min_liquidity=10_000, allowed_dexes=None)
+    index.sync_entries(TOKEN_A, [entry("p1", 1.0), entry("p2", 2.0), entry("p3", 4.0)], token_name="Token A")
+    assert index.best_spread(TOKEN_A)["diffPercent"] == pytest.approx(300.0)
+    assert index.best_spread(TOKEN_A)["tokenName"] == "Token A"
+    index.sync_entries(TOKEN_A, [entry("p1", 1.0), entry("p2", 1.5)])
+    best = index.best_spread(TOKEN_A)
+    assert best["highest"]["pairAddress"] == "p2"
+    assert best["diffPercent"] == pytest.approx(50.0)
+    index.sync_entries(TOKEN_A, [])
+    assert index.best_spread(TOKEN_A) is None
+
+
+def test_load_pools_keeps_only_pools_where_the_token_is_base():
+    index = SpreadIndex(min_liquidity=10_000, allowed_dexes=None)
+    pools = [
+        {"baseToken": {"address": TOKEN_A.upper().replace("0X", "0x"), "name": "A", "symbol": "A"},
+         "quoteToken": {"symbol": "wS"}, "priceUsd": "1.0", "liquidity": {"usd": 20_000},
+         "dexId": "swapx", "pairAddress": "p1"},
+        {"baseToken": {"address": TOKEN_A, "symbol": "A"}, "quoteToken": {"symbol": "USDC"},
+         "priceUsd": "1.2", "liquidity": {"usd": 20_000}, "dexId": "wagmi", "pairAddress": "p2"},
+        {"baseToken": {"address": TOKEN_B}, "quoteToken": {"address": TOKEN_A}, "priceUsd": "9.0",
+         "liquidity": {"usd": 20_000}, "dexId": "swapx", "pairAddress": "p3"},
+        {"baseToken": {"address": TOKEN_A}, "priceUsd": "not a price", "pairAddress": "p4"},
+    ]
+    index.load_pools(TOKEN_A, pools)
+    best = index.best_spread(TOKEN_A)
+    assert best["diffPercent"] == pytest.approx(20.0)
+    assert best["tokenName"] == "A"
+    assert best["highest"]["pairName"] == "A/USDC"
+
+
+def test_top_spreads_after_supersession():
+    index = index_with({TOKEN_A: [1.0, 1.5], TOKEN_B: [1.0, 1.2], TOKEN_C: [1.0, 3.0]})
+    assert [s["token"] for s in index.top_spreads(2)] == [TOKEN_C, TOKEN_A]
+    # Narrow C's spread and widen B's: their old heap entries are superseded, not returned.
+    index.update_pool(TOKEN_C, f"{TOKEN_C}-1", 1.05, 50_000, "swapx")
+    index.update_pool(TOKEN_B, f"{TOKEN_B}-1", 5.0, 50_000, "swapx")
+    top = index.top_spreads(10)
+    assert [s["token"] for s in top] == [TOKEN_B, TOKEN_A, TOKEN_C]
+    assert [s["diffPercent"] for s in top] == pytest.approx([400.0, 50.0, 5.0])
+    # Reading the top does not consume it.
+    assert index.top_spreads(10) == top
+    assert index.top_spreads(0) == []
+
+
+def test_top_spreads_with_many_updates_matches_a_full_scan():
+    rng = random.Random(7)
+    tokens = [f"0x{i:040x}" for i in range(50)]
+    index = SpreadIndex(min_liquidity=0, allowed_dexes=None)
+    for _ in range(3000):
+        token = rng.choice(tokens)
+        if rng.random() < 0.2:
+            index.remove_pool(token, f"p{rng.randrange(5)}")
+        else:
+            index.update_pool(token, f"p{rng.randrange(5)}", rng.uniform(0.5, 2.0), 1, "swapx")
+    expected = sorted((b for b in (index.best_spread(t) for t in tokens) if b is not None),
+                      key=lambda b: -b["diffPercent"])
+    assert [s["diffPercent"] for s in index.top_spreads(10)] == [b["diffPercent"] for b in expected[:10]]
+
+
+def test_concurrent_updates_and_top_spreads():
+    tokens = [f"0x{i:040x}" for i in range(20)]
+    index = SpreadIndex(min_liquidity=0, allowed_dexes=None)
+    for token in tokens:
+        index.update_pool(token, "base", 1.0, 1, "swapx")
+    errors = []
+
+    def writer(seed):
+        rng = random.Random(seed)
+        for _ in range(2000):
+            index.update_pool(rng.choice(tokens), f"p{rng.randrange(3)}", rng.uniform(1.0, 2.0), 1, "swapx")
+
+    def reader():
+        # Every token keeps a spread (its "base" pool at 1.0 never moves), so a full top-K
+        # must list each token exactly once.
+        for _ in range(500):
+            top = index.top_spreads(len(tokens))
+            if sorted(s["token"] for s in top) != tokens:
+                errors.append(top)
+
+    for token in tokens:
+        index.update_pool(token, "p0", 1.5, 1, "swapx")
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(2)] + [threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(index.top_spreads(len(tokens))) == len(tokens)
+    live = [item for item in index._global_heap if index._token_versions.get(item[2]) == item[1]]
+    assert len(live) == len(tokens)
+    heap = list(index._global_heap)
+    heapq.heapify(heap)
+    assert heap == index._global_heap
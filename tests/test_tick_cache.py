@@ -0,0 +1,120 @@
+"""
+TickCache.apply_log on synthetic Mint, Burn, Swap and Fee logs, for the Uniswap V3 / Algebra
+1.0 events and the Algebra Integral 1.2 variants that append fees to Burn and Swap.
+"""
+import json
+
+import pytest
+from eth_abi import encode
+from web3 import Web3
+
+from tickCache import (
+    BURN_PLUGIN_FEE_TOPIC, BURN_TOPIC, FEE_TOPIC, MINT_TOPIC, SWAP_PLUGIN_FEE_TOPIC, SWAP_TOPIC, TICK_TOPICS,
+    TickCache,
+)
+
+POOL = Web3.to_checksum_address("0x" + "01" * 20)
+OWNER = Web3.to_checksum_address("0x" + "02" * 20)
+BLOCK = 100
+LIQUIDITY = 10 ** 18
+
+# (Burn topic, Swap topic, extra Burn fields, extra Swap fields)
+VARIANTS = {
+    "v1.0": (BURN_TOPIC, SWAP_TOPIC, [], []),
+    "integral-1.2": (BURN_PLUGIN_FEE_TOPIC, SWAP_PLUGIN_FEE_TOPIC, [("uint24", 100)], [("uint24", 0), ("uint24", 100)]),
+}
+
+
+def _word(abi_type, value):
+    return Web3.to_hex(encode([abi_type], [value]))
+
+
+def _log(topics, fields, log_index, block=BLOCK + 1):
+    return {
+        "address": POOL,
+        "topics": topics,
+        "data": Web3.to_hex(encode([t for t, _ in fields], [v for _, v in fields])),
+        "blockNumber": hex(block),
+        "logIndex": hex(log_index),
+    }
+
+
+def mint(lower, upper, amount, log_index):
+    topics = [MINT_TOPIC, _word("address", OWNER), _word("int24", lower), _word("int24", upper)]
+    return _log(topics, [("address", OWNER), ("uint128", amount), ("uint256", 1), ("uint256", 1)], log_index)
+
+
+def burn(variant, lower, upper, amount, log_index):
+    topic, _, extra, _ = VARIANTS[variant]
+    topics = [topic, _word("address", OWNER), _word("int24", lower), _word("int24", upper)]
+    return _log(topics, [("uint128", amount), ("uint256", 1), ("uint256", 1)] + extra, log_index)
+
+
+def swap(variant, sqrt_price, liquidity, tick, log_index):
+    _, topic, _, extra = VARIANTS[variant]
+    topics = [topic, _word("address", OWNER), _word("address", OWNER)]
+    fields = [("int256", 1), ("int256", -1), ("uint160", sqrt_price), ("uint128", liquidity), ("int24", tick)]
+    return _log(topics, fields + extra, log_index)
+
+
+def fee(value, log_index):
+    return _log([FEE_TOPIC], [("uint16", value)], log_index)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A TickCache holding one Algebra pool at tick 0 with a single position over [-60, 60)."""
+    snapshot = {
+        "type": "alg", "block": BLOCK, "logIndex": 2 ** 63,
+        "sqrtPriceX96": str(2 ** 96), "tick": 0, "liquidity": str(LIQUIDITY), "fee": 500, "tickSpacing": 60,
+        "ticks": {"-60": [str(LIQUIDITY), str(LIQUIDITY)], "60": [str(LIQUIDITY), str(-LIQUIDITY)]},
+    }
+    with open(tmp_path / f"{POOL}.json", 'w') as snapshot_file:
+        json.dump(snapshot, snapshot_file)
+    tick_cache = TickCache(None, str(tmp_path))
+    assert tick_cache._restore(POOL, BLOCK)  # nothing to catch up on at the snapshot's own block
+    return tick_cache
+
+
+def test_every_applied_topic_is_fetched():
+    assert set(TICK_TOPICS) == {MINT_TOPIC, BURN_TOPIC, BURN_PLUGIN_FEE_TOPIC, SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC, FEE_TOPIC}
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_swap_updates_price_tick_and_liquidity(cache, variant):
+    assert cache.apply_log(swap(variant, 2 ** 96 * 2, LIQUIDITY // 2, 13863, 0))
+    pool = cache.pool_state(POOL)
+    assert (pool.sqrt_price_x96, pool.liquidity, pool.tick) == (2 ** 96 * 2, LIQUIDITY // 2, 13863)
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_mint_and_burn_use_the_current_tick(cache, variant):
+    pool = cache.pool_state(POOL)
+    assert cache.apply_log(mint(-120, 120, 5, 0))
+    assert pool.liquidity == LIQUIDITY + 5
+    assert pool.ticks[-120] == 5 and pool.ticks[120] == -5
+    # After the swap moves the price out of [-60, 60), burning that position leaves the
+    # in-range liquidity alone.
+    assert cache.apply_log(swap(variant, 2 ** 96 * 2, 5, 90, 1))
+    assert cache.apply_log(burn(variant, -60, 60, LIQUIDITY, 2))
+    assert pool.liquidity == 5
+    assert -60 not in pool.ticks and 60 not in pool.ticks
+    assert cache.apply_log(burn(variant, -120, 120, 5, 3))
+    assert pool.liquidity == 0
+    assert pool.ticks == {}
+
+
+def test_fee_updates_the_fee(cache):
+    assert cache.apply_log(fee(2900, 0))
+    assert cache.pool_state(POOL).fee == 2900
+
+
+def test_old_removed_and_unknown_logs_are_ignored(cache):
+    assert not cache.apply_log(swap("v1.0", 2 ** 96 * 2, 1, 13863, 0) | {"blockNumber": hex(BLOCK)})
+    assert not cache.apply_log(swap("v1.0", 2 ** 96 * 2, 1, 13863, 0) | {"removed": True})
+    assert not cache.apply_log(swap("v1.0", 2 ** 96 * 2, 1, 13863, 0) | {"address": OWNER})
+    assert not cache.apply_log(_log([Web3.to_hex(Web3.keccak(text="Flash()"))], [], 0))
+    assert cache.apply_log(fee(2900, 5))
+    assert not cache.apply_log(fee(3000, 5))
+    assert cache.pool_state(POOL).tick == 0
+    assert cache.pool_state(POOL).fee == 2900
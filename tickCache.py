@@ -0,0 +1,305 @@
+import json
+import os
+import sys
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+from multicall import aggregate3, read_pool_states, selector
+from swapSimulator import MAX_TICK, MIN_TICK, PoolState
+
+DEFAULT_TICK_CACHE_DIR = "tick_cache"
+
+# A pool saved longer ago than this is cold-loaded again instead of replaying its logs.
+DEFAULT_MAX_CATCHUP_BLOCKS = 200_000
+# Block range per eth_getLogs request while catching up.
+LOG_BLOCK_RANGE = 5_000
+
+TICK_SPACING = selector("tickSpacing()")
+FEE = selector("fee()")
+TICK_BITMAP = selector("tickBitmap(int16)")  # Uniswap V3: words of ticks compressed by tickSpacing
+TICK_TABLE = selector("tickTable(int16)")  # Algebra Integral: words of uncompressed ticks
+TICKS = selector("ticks(int24)")
+
+MINT_TOPIC = Web3.to_hex(Web3.keccak(text="Mint(address,address,int24,int24,uint128,uint256,uint256)"))
+BURN_TOPIC = Web3.to_hex(Web3.keccak(text="Burn(address,int24,int24,uint128,uint256,uint256)"))
+# Algebra Integral 1.2 pools append the plugin fee to Burn.
+BURN_PLUGIN_FEE_TOPIC = Web3.to_hex(Web3.keccak(text="Burn(address,int24,int24,uint128,uint256,uint256,uint24)"))
+SWAP_TOPIC = Web3.to_hex(Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24)"))
+# Algebra Integral 1.2 pools append the override and plugin fees to Swap.
+SWAP_PLUGIN_FEE_TOPIC = Web3.to_hex(
+    Web3.keccak(text="Swap(address,address,int256,int256,uint160,uint128,int24,uint24,uint24)")
+)
+# Algebra pools announce dynamic fee changes separately.
+FEE_TOPIC = Web3.to_hex(Web3.keccak(text="Fee(uint16)"))
+TICK_TOPICS = [MINT_TOPIC, BURN_TOPIC, BURN_PLUGIN_FEE_TOPIC, SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC, FEE_TOPIC]
+
+
+def _to_int(value):
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _topic_int24(topic):
+    return decode(["int24"], bytes.fromhex(topic[2:]) if isinstance(topic, str) else bytes(topic))[0]
+
+
+def _word_range(pool_type, tick_spacing, tick, word_radius):
+    """Bitmap word positions to load: every word of the tick range, or word_radius around tick."""
+    compression = tick_spacing if pool_type == "uni" else 1
+    first, last = (MIN_TICK // compression) >> 8, (MAX_TICK // compression) >> 8
+    if word_radius is not None:
+        current = (tick // compression) >> 8
+        first, last = max(first, current - word_radius), min(last, current + word_radius)
+    return range(first, last + 1), compression
+
+
+class TickCache:
+    """
+    Tick-level liquidity for concentrated-liquidity pools, kept current from logs.
+
+    load_pools cold-loads a pool's price, in-range liquidity, fee, tick spacing and the net
+    liquidity of every initialized tick in three Multicall3 passes (state, bitmap words,
+    initialized ticks), all pinned to one block. apply_log then keeps each pool current from
+    Mint/Burn/Swap logs (and Algebra's Fee logs), and snapshots are saved to disk so a restart only replays the logs
+    emitted since the snapshot's block instead of repeating the cold load.
+
+    pool_state(address) returns a swapSimulator.PoolState ready for simulate_swap.
+    """
+
+    def __init__(self, w3, directory=DEFAULT_TICK_CACHE_DIR, word_radius=None,
+                 max_catchup_blocks=DEFAULT_MAX_CATCHUP_BLOCKS):
+        self.w3 = w3
+        self.directory = directory
+        self.word_radius = word_radius
+        self.max_catchup_blocks = max_catchup_blocks
+        self._pools = {}  # address -> PoolState
+        self._positions = {}  # address -> (blockNumber, logIndex) of the last applied update
+        self._gross = {}  # address -> {tick: liquidityGross}, which decides if a tick stays initialized
+
+    def __contains__(self, pool_address):
+        return Web3.to_checksum_address(pool_address) in self._pools
+
+    def pool_state(self, pool_address):
+        """The cached PoolState of a loaded pool (updated in place by apply_log), or None."""
+        return self._pools.get(Web3.to_checksum_address(pool_address))
+
+    def block_number(self, pool_address):
+        """The block the pool's cached state is current as of, or None."""
+        position = self._positions.get(Web3.to_checksum_address(pool_address))
+        return position[0] if position else None
+
+    def load_pools(self, pool_addresses, pool_types=None):
+        """
+        Makes every pool available, from memory, from its disk snapshot plus the logs since, or
+        with a cold load. Returns a dict of address -> PoolState (pools that could not be loaded,
+        e.g. non-pools, are left out).
+        """
+        addresses = [Web3.to_checksum_address(a) for a in dict.fromkeys(pool_addresses)]
+        latest = self.w3.eth.block_number
+        cold = []
+        for address in addresses:
+            if address in self._pools:
+                continue
+            if not self._restore(address, latest):
+                cold.append(address)
+        if cold:
+            self._cold_load(cold, pool_types or {}, latest)
+        return {a: self._pools[a] for a in addresses if a in self._pools}
+
+    def _cold_load(self, addresses, pool_types, block_number):
+        pool_types = {Web3.to_checksum_address(a): t for a, t in pool_types.items()}
+        states = read_pool_states(self.w3, addresses, pool_types, block_identifier=block_number)
+        pools = [a for a in addresses if states[a]["type"] and states[a]["liquidity"] is not None]
+
+        calls = [(a, TICK_SPACING) for a in pools] + [(a, FEE) for a in pools if states[a]["type"] == "uni"]
+        results = aggregate3(self.w3, calls, block_identifier=block_number)
+        spacings = {}
+        for address, (success, data) in zip(pools, results):
+            if success and len(data) >= 32:
+                spacings[address] = decode(["int24"], data[:32])[0]
+        fees = {a: states[a]["fee"] for a in pools}
+        for address, (success, data) in zip([a for a in pools if states[a]["type"] == "uni"], results[len(pools):]):
+            fees[address] = decode(["uint24"], data[:32])[0] if success and len(data) >= 32 else None
+        pools = [a for a in pools if spacings.get(a) and fees.get(a) is not None]
+
+        # Pass 2: bitmap words.
+        word_calls, word_layout = [], []
+        for address in pools:
+            state = states[address]
+            getter = TICK_BITMAP if state["type"] == "uni" else TICK_TABLE
+            words, compression = _word_range(state["type"], spacings[address], state["tick"], self.word_radius)
+            for word in words:
+                word_calls.append((address, getter + encode(["int16"], [word])))
+                word_layout.append((address, word, compression))
+        results = aggregate3(self.w3, word_calls, block_identifier=block_number) if word_calls else []
+
+        # Pass 3: every initialized tick's liquidityNet.
+        tick_calls, tick_layout = [], []
+        for (address, word, compression), (success, data) in zip(word_layout, results):
+            bitmap = int.from_bytes(data[:32], "big") if success and len(data) >= 32 else 0
+            while bitmap:
+                bit = (bitmap & -bitmap).bit_length() - 1
+                bitmap &= bitmap - 1
+                tick = ((word << 8) + bit) * compression
+                tick_calls.append((address, TICKS + encode(["int24"], [tick])))
+                tick_layout.append((address, tick))
+        results = aggregate3(self.w3, tick_calls, block_identifier=block_number) if tick_calls else []
+        ticks = {address: {} for address in pools}
+        gross = {address: {} for address in pools}
+        for (address, tick), (success, data) in zip(tick_layout, results):
+            if success and len(data) >= 64:
+                liquidity_gross, liquidity_net = decode(["uint256", "int128"], data[:64])
+                if liquidity_gross:
+                    ticks[address][tick] = liquidity_net
+                    gross[address][tick] = liquidity_gross
+
+        for address in pools:
+            state = states[address]
+            self._pools[address] = PoolState(
+                state["sqrtPriceX96"], state["tick"], state["liquidity"], fees[address],
+                spacings[address], ticks[address], state["type"],
+            )
+            self._positions[address] = (block_number, 2 ** 63)
+            self._gross[address] = gross[address]
+            self.save(address)
+
+    def apply_log(self, log):
+        """
+        Applies one raw Mint, Burn, Swap or Algebra Fee log (from eth_getLogs or an eth_subscribe "logs"
+        notification) to its pool. Logs of unknown pools, removed logs and logs at or before
+        the pool's current position are ignored. Returns True if the pool changed.
+        """
+        address = Web3.to_checksum_address(log["address"])
+        pool = self._pools.get(address)
+        if pool is None or log.get("removed") or not log.get("topics"):
+            return False
+        position = (_to_int(log["blockNumber"]), _to_int(log["logIndex"]))
+        if position <= self._positions[address]:
+            return False
+        topics = [t if isinstance(t, str) else Web3.to_hex(t) for t in log["topics"]]
+        data = log["data"]
+        data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+        topic = topics[0].lower()
+
+        if topic in (SWAP_TOPIC, SWAP_PLUGIN_FEE_TOPIC):
+            _, _, pool.sqrt_price_x96, pool.liquidity, pool.tick = decode(
+                ["int256", "int256", "uint160", "uint128", "int24"], data[:160]
+            )
+        elif topic in (MINT_TOPIC, BURN_TOPIC, BURN_PLUGIN_FEE_TOPIC):
+            lower, upper = _topic_int24(topics[2]), _topic_int24(topics[3])
+            # Mint carries the sender before the amount; Burn starts with it.
+            amount = decode(["uint128"], data[32:64] if topic == MINT_TOPIC else data[:32])[0]
+            if topic != MINT_TOPIC:
+                amount = -amount
+            if amount:
+                gross = self._gross[address]
+                for tick, net_change in ((lower, amount), (upper, -amount)):
+                    gross[tick] = gross.get(tick, 0) + amount
+                    pool.set_tick(tick, pool.ticks.get(tick, 0) + net_change, initialized=gross[tick] > 0)
+                    if gross[tick] <= 0:
+                        del gross[tick]
+                if lower <= pool.tick < upper:
+                    pool.liquidity += amount
+        elif topic == FEE_TOPIC:
+            pool.fee = decode(["uint16"], data[:32])[0]
+        else:
+            return False
+        self._positions[address] = position
+        return True
+
+    def catch_up(self, pool_addresses, to_block="latest"):
+        """Replays the Mint/Burn/Swap/Fee logs emitted since each pool's cached block."""
+        addresses = [Web3.to_checksum_address(a) for a in pool_addresses if a in self]
+        if not addresses:
+            return
+        to_block = self.w3.eth.block_number if to_block == "latest" else to_block
+        from_block = min(self.block_number(a) for a in addresses) + 1
+        for start in range(from_block, to_block + 1, LOG_BLOCK_RANGE):
+            logs = self.w3.eth.get_logs({
+                "address": addresses,
+                "topics": [TICK_TOPICS],
+                "fromBlock": start,
+                "toBlock": min(start + LOG_BLOCK_RANGE - 1, to_block),
+            })
+            for log in sorted(logs, key=lambda l: (_to_int(l["blockNumber"]), _to_int(l["logIndex"]))):
+                self.apply_log(log)
+        for address in addresses:
+            if self._positions[address] < (to_block, 2 ** 63):
+                self._positions[address] = (to_block, 2 ** 63)
+
+    def _path(self, address):
+        return os.path.join(self.directory, f"{address}.json")
+
+    def save(self, pool_address):
+        """Writes a pool's snapshot to disk (atomically, via a temporary file)."""
+        address = Web3.to_checksum_address(pool_address)
+        pool = self._pools[address]
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = {
+            "type": pool.pool_type,
+            "block": self._positions[address][0],
+            "logIndex": self._positions[address][1],
+            "sqrtPriceX96": str(pool.sqrt_price_x96),
+            "tick": pool.tick,
+            "liquidity": str(pool.liquidity),
+            "fee": pool.fee,
+            "tickSpacing": pool.tick_spacing,
+            "ticks": {str(tick): [str(self._gross[address][tick]), str(net)] for tick, net in pool.ticks.items()},
+        }
+        path = self._path(address)
+        with open(path + ".tmp", 'w') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        os.replace(path + ".tmp", path)
+
+    def save_all(self):
+        for address in self._pools:
+            self.save(address)
+
+    def _restore(self, address, latest):
+        """Loads a disk snapshot and replays the logs since. Returns False if a cold load is needed."""
+        try:
+            with open(self._path(address), 'r') as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return False
+        if latest - snapshot["block"] > self.max_catchup_blocks:
+            return False
+        self._pools[address] = PoolState(
+            int(snapshot["sqrtPriceX96"]), snapshot["tick"], int(snapshot["liquidity"]), snapshot["fee"],
+            snapshot["tickSpacing"], {int(t): int(net) for t, (_, net) in snapshot["ticks"].items()}, snapshot["type"],
+        )
+        self._gross[address] = {int(t): int(gross) for t, (gross, _) in snapshot["ticks"].items()}
+        self._positions[address] = (snapshot["block"], snapshot["logIndex"])
+        self.catch_up([address], latest)
+        self.save(address)
+        return True
+
+
+def main():
+    """
+    python tickCache.py <pool address> [...]
+    Loads (or refreshes) the tick snapshots of the given pools and prints a summary.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: python tickCache.py <pool address> [...]")
+        return
+    w3 = Web3(Web3.HTTPProvider(os.environ.get("RPC_URL")))
+    if not w3.is_connected():
+        print("Connection to RPC failed.")
+        return
+    cache = TickCache(w3, os.environ.get("TICK_CACHE_DIR", DEFAULT_TICK_CACHE_DIR))
+    loaded = cache.load_pools(sys.argv[1:])
+    for address in sys.argv[1:]:
+        pool = loaded.get(Web3.to_checksum_address(address))
+        if pool is None:
+            print(f"{address}: not a Uniswap V3 or Algebra pool")
+            continue
+        print(f"{address} ({pool.pool_type}) @ block {cache.block_number(address)}: tick {pool.tick}, "
+              f"liquidity {pool.liquidity}, fee {pool.fee}, {len(pool.ticks)} initialized ticks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+from multicall import GLOBAL_STATE, LIQUIDITY, SLOT0, _decode_price_and_tick, aggregate3, multicall3_address, selector
+from swapSimulator import PoolState, simulate_swap
+
+ALLOWANCE = selector("allowance(address,address)")
+BALANCE_OF = selector("balanceOf(address)")
+# Multicall3's own helpers: the native balance of an account and the block the batch ran in.
+GET_ETH_BALANCE = selector("getEthBalance(address)")
+GET_BLOCK_NUMBER = selector("getBlockNumber()")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+
+@lru_cache(maxsize=None)
+def load_abi(path):
+    """Parses an ABI JSON file once per process."""
+    with open(path, 'r') as abi_file:
+        return json.load(abi_file)
+
+
+@lru_cache(maxsize=None)
+def cached_contract(w3, address, abi_path):
+    """A contract object for address and the ABI file at abi_path, built once per process."""
+    return w3.eth.contract(address=Web3.to_checksum_address(address), abi=load_abi(abi_path))
+
+
+@lru_cache(maxsize=None)
+def chain_id(w3):
+    """eth_chainId, read once per process; passed in a transaction, build_transaction need not ask."""
+    return w3.eth.chain_id
+
+
+@dataclass(frozen=True, slots=True)
+class TradeContext:
+    """
+    Everything a swap needs to know before it is built, read at one block: the pool and its
+    tokens, the executor's allowance, the account's input-token and native balances, the
+    pool's price, in-range liquidity and swap fee (None if unknown) and the fee fields for the
+    transaction. timings holds the milliseconds each stage took.
+    """
+    pool: str
+    pool_type: str
+    zero_for_one: bool
+    token_in: str
+    token_out: str
+    spender: str
+    allowance: int
+    balance_in: int
+    native_balance: int
+    sqrt_price_x96: int
+    tick: int
+    liquidity: int
+    pool_fee: int
+    block_number: int
+    fees: dict
+    chain_id: int
+    timings: dict
+
+
+def prefetch_trade(w3, registry, pool_address, zero_for_one, spender, account, fees=None, ledger=None):
+    """
+    Builds the TradeContext for a swap on a Uniswap V3 or Algebra pool in one round trip.
+
+    Pool type and tokens come from the PoolRegistry (no RPC once the pool is known). The
+    allowance, both balances, slot0()/globalState(), liquidity() and the block number are then read in one
+    Multicall3 batch, while the fee fields (fees: a callable returning them, e.g.
+    gasOracle.GasOracle.fees; by default a legacy gasPrice from w3.eth.gas_price) and, on first
+    use, the chain id are fetched concurrently on other threads. With an
+    accountLedger.AccountLedger that already tracks the allowance or the input-token balance,
+    those calls are left out of the batch; values read are handed to the ledger to track.
+    Returns None if the address is not a Uniswap V3 or Algebra pool.
+    """
+    started = time.perf_counter()
+    timings = {}
+    pool_address = Web3.to_checksum_address(pool_address)
+    pool_info = registry.resolve(w3, pool_address)
+    if pool_info is None or pool_info["type"] not in ("uni", "alg"):
+        return None
+    timings["resolve"] = (time.perf_counter() - started) * 1000
+
+    token_in, token_out = (pool_info["token0"], pool_info["token1"]) if zero_for_one else (pool_info["token1"], pool_info["token0"])
+    spender, account = Web3.to_checksum_address(spender), Web3.to_checksum_address(account)
+
+    def timed(name, fn):
+        def run():
+            begun = time.perf_counter()
+            result = fn()
+            timings[name] = (time.perf_counter() - begun) * 1000
+            return result
+        return _executor.submit(run)
+
+    gas_future = timed("gas", fees or (lambda: {"gasPrice": w3.eth.gas_price}))
+    chain_future = timed("chain", lambda: chain_id(w3))
+    multicall_address = multicall3_address()
+    known_allowance = ledger.allowance(token_in, spender) if ledger is not None else None
+    known_balance = ledger.balance(token_in) if ledger is not None else None
+    generation = ledger.generation if ledger is not None else None
+    calls = [
+        (multicall_address, GET_ETH_BALANCE + encode(["address"], [account])),
+        (pool_address, SLOT0 if pool_info["type"] == "uni" else GLOBAL_STATE),
+        (multicall_address, GET_BLOCK_NUMBER),
+        (pool_address, LIQUIDITY),
+    ]
+    if known_allowance is None:
+        calls.append((token_in, ALLOWANCE + encode(["address", "address"], [account, spender])))
+    if known_balance is None:
+        calls.append((token_in, BALANCE_OF + encode(["address"], [account])))
+    begun = time.perf_counter()
+    results = aggregate3(w3, calls, multicall_address=multicall_address)
+    timings["multicall"] = (time.perf_counter() - begun) * 1000
+    (ok_eth, native), (ok_price, price), (_, block), (ok_liq, liquidity) = results[:4]
+    if not ok_price or _decode_price_and_tick(price) is None:
+        raise Exception(f"Could not read the price of pool {pool_address}")
+    sqrt_price, tick = _decode_price_and_tick(price)
+    if pool_info["type"] == "uni":
+        pool_fee = pool_info["fee"]
+    else:
+        pool_fee = decode(["uint16"], price[64:96])[0] if len(price) >= 96 else None
+    read = iter(results[4:])
+    if known_allowance is None:
+        ok, allowance = next(read)
+        known_allowance = decode(["uint256"], allowance[:32])[0] if ok and len(allowance) >= 32 else 0
+    if known_balance is None:
+        ok, balance = next(read)
+        known_balance = decode(["uint256"], balance[:32])[0] if ok and len(balance) >= 32 else 0
+    if ledger is not None and len(calls) > 4:
+        ledger.seed(balances={token_in: known_balance}, allowances={(token_in, spender): known_allowance},
+                    generation=generation)
+    fee_fields, chain = gas_future.result(), chain_future.result()
+    timings["total"] = (time.perf_counter() - started) * 1000
+    return TradeContext(
+        pool=pool_address,
+        pool_type=pool_info["type"],
+        zero_for_one=zero_for_one,
+        token_in=token_in,
+        token_out=token_out,
+        spender=spender,
+        allowance=known_allowance,
+        balance_in=known_balance,
+        native_balance=decode(["uint256"], native[:32])[0] if ok_eth and len(native) >= 32 else 0,
+        sqrt_price_x96=sqrt_price,
+        tick=tick,
+        liquidity=decode(["uint128"], liquidity[:32])[0] if ok_liq and len(liquidity) >= 32 else 0,
+        pool_fee=pool_fee,
+        block_number=decode(["uint256"], block[:32])[0],
+        fees=fee_fields,
+        chain_id=chain,
+        timings=timings,
+    )
+
+
+def simulated_ticks_crossed(ctx, amount_specified, sqrt_price_limit_x96=None):
+    """
+    Ticks the swap of a TradeContext is expected to move the pool's price by (the x of
+    gasModel.GasModel), from swapSimulator.simulate_swap at the context's price and liquidity.
+    No tick map is read, so the in-range liquidity is assumed all the way. None if the pool's
+    fee is unknown or the swap cannot be simulated (e.g. a limit on the wrong side of the price).
+    """
+    if ctx.pool_fee is None or not ctx.liquidity:
+        return None
+    pool = PoolState(ctx.sqrt_price_x96, ctx.tick, ctx.liquidity, ctx.pool_fee, 1, pool_type=ctx.pool_type)
+    try:
+        result = simulate_swap(pool, ctx.zero_for_one, amount_specified, sqrt_price_limit_x96 or None)
+    except ValueError:
+        return None
+    return abs(result["tick"] - ctx.tick)
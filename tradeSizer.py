@@ -0,0 +1,260 @@
+import random
+import time
+
+import numpy as np
+
+from swapSimulator import FEE_DENOMINATOR, Q96, PoolState, simulate_swap
+
+DEFAULT_MAX_SEGMENTS = 32
+GOLDEN = (np.sqrt(5) - 1) / 2
+
+
+class CurveBatch:
+    """
+    Piecewise constant-product swap curves for many (pool, direction) pairs, padded into 2-D
+    arrays so all of them can be evaluated at once.
+
+    Between two initialized ticks a concentrated-liquidity pool trades exactly like a constant
+    product pool with virtual reserves L/sqrtP and L*sqrtP, so each curve is a list of segments
+    (start sqrt price, liquidity) with the cumulative input needed to reach each segment and the
+    output received by then. Amounts are raw token units as floats; the last segment is open.
+    """
+
+    def __init__(self, start_sqrt, liquidity, cum_in, cum_out, zero_for_one, gamma):
+        self.start_sqrt = start_sqrt
+        self.liquidity = liquidity
+        self.cum_in = cum_in
+        self.cum_out = cum_out
+        self.zero_for_one = zero_for_one
+        self.gamma = gamma
+
+    def __len__(self):
+        return len(self.gamma)
+
+    @classmethod
+    def from_pools(cls, pools, max_segments=DEFAULT_MAX_SEGMENTS):
+        """pools is a list of (swapSimulator.PoolState, zero_for_one)."""
+        n = len(pools)
+        start_sqrt = np.ones((n, max_segments))
+        liquidity = np.zeros((n, max_segments))
+        cum_in = np.full((n, max_segments), np.inf)
+        cum_out = np.zeros((n, max_segments))
+        zero_for_one = np.zeros(n, dtype=bool)
+        gamma = np.zeros(n)
+
+        for row, (pool, direction) in enumerate(pools):
+            g = 1 - pool.fee / FEE_DENOMINATOR
+            s = pool.sqrt_price_x96 / Q96
+            L = float(pool.liquidity)
+            if direction:
+                boundaries = [t for t in sorted(pool.ticks, reverse=True) if t <= pool.tick]
+            else:
+                boundaries = [t for t in sorted(pool.ticks) if t > pool.tick]
+            spent = received = 0.0
+            segment = 0
+            for tick in boundaries[:max_segments - 1]:
+                start_sqrt[row, segment], liquidity[row, segment], cum_in[row, segment] = s, L, spent
+                cum_out[row, segment] = received
+                s_next = 1.0001 ** (tick / 2)
+                if direction:
+                    spent += L * (1 / s_next - 1 / s) / g
+                    received += L * (s - s_next)
+                    L -= pool.ticks[tick]
+                else:
+                    spent += L * (s_next - s) / g
+                    received += L * (1 / s - 1 / s_next)
+                    L += pool.ticks[tick]
+                s = s_next
+                segment += 1
+            start_sqrt[row, segment], liquidity[row, segment], cum_in[row, segment] = s, L, spent
+            cum_out[row, segment] = received
+            zero_for_one[row] = direction
+            gamma[row] = g
+        return cls(start_sqrt, liquidity, cum_in, cum_out, zero_for_one, gamma)
+
+    def first_segment_reserves(self):
+        """Virtual (reserve_in, reserve_out) of each curve's current constant-product segment."""
+        s, L = self.start_sqrt[:, 0], self.liquidity[:, 0]
+        reserve_in = np.where(self.zero_for_one, L / s, L * s)
+        reserve_out = np.where(self.zero_for_one, L * s, L / s)
+        return reserve_in, reserve_out
+
+    def output(self, amounts, rows=None):
+        """Vectorized output amount for one input amount per curve (or per selected row)."""
+        rows = np.arange(len(self)) if rows is None else rows
+        amounts = np.asarray(amounts, dtype=np.float64)
+        cum_in = self.cum_in[rows]
+        segment = (cum_in <= amounts[:, None]).sum(axis=1) - 1
+        index = (np.arange(len(rows)), segment)
+        s = self.start_sqrt[rows][index]
+        L = self.liquidity[rows][index]
+        net = (amounts - cum_in[index]) * self.gamma[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = np.where(
+                self.zero_for_one[rows],
+                L * s * s * net / (L + net * s),
+                L * net / (s * (s * L + net)),
+            )
+        return self.cum_out[rows][index] + np.nan_to_num(out)
+
+
+def _profit(buy, sell, amounts, rows):
+    return sell.output(buy.output(amounts, rows), rows) - amounts
+
+
+def optimal_trade_sizes(buy, sell, iterations=100):
+    """
+    Profit-maximizing input for many two-pool arbitrages at once: row i buys the token with the
+    quote token in buy[i] and sells it back for the quote token in sell[i].
+
+    If the optimum of the closed-form two-constant-product solution stays inside both pools'
+    current tick ranges it is exact for the piecewise model and used directly. Other rows are
+    bracketed (doubling until profit falls) and solved by a vectorized golden-section search
+    across tick ranges; profit is concave in the input, so this converges to the optimum.
+
+    Returns a dict of float arrays: "amountIn" (quote token; 0 where no trade is profitable),
+    "amountOut" (token bought), "proceeds" (quote token back) and "profit".
+    """
+    n = len(buy)
+    rows = np.arange(n)
+
+    # Closed form for two chained constant-product pools:
+    # out(d) = a*d / (b + c*d), maximal profit at d* = (sqrt(a*b) - b) / c.
+    a_in, a_out = buy.first_segment_reserves()
+    b_in, b_out = sell.first_segment_reserves()
+    a = buy.gamma * sell.gamma * a_out * b_out
+    b = a_in * b_in
+    c = buy.gamma * (b_in + sell.gamma * a_out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        closed = np.nan_to_num(np.maximum((np.sqrt(a * b) - b) / c, 0))
+    inside = (closed <= buy.cum_in[:, 1]) & (buy.output(closed) <= sell.cum_in[:, 1])
+    amount_in = np.where(inside, closed, 0.0)
+
+    search = rows[~inside]
+    if len(search):
+        # Bracket: double the upper bound while profit keeps rising.
+        hi = np.maximum(np.minimum(buy.cum_in[search, 1], closed[search]), 1.0)
+        growing = np.ones(len(search), dtype=bool)
+        for _ in range(200):
+            if not growing.any():
+                break
+            grow = search[growing]
+            rising = _profit(buy, sell, 2 * hi[growing], grow) > _profit(buy, sell, hi[growing], grow)
+            hi[growing] = np.where(rising, 2 * hi[growing], hi[growing])
+            growing[growing] = rising
+        lo = np.zeros(len(search))
+        hi = 2 * hi
+        x1 = hi - GOLDEN * (hi - lo)
+        x2 = lo + GOLDEN * (hi - lo)
+        f1, f2 = _profit(buy, sell, x1, search), _profit(buy, sell, x2, search)
+        for _ in range(iterations):
+            left = f1 > f2
+            hi = np.where(left, x2, hi)
+            lo = np.where(left, lo, x1)
+            x2_new = np.where(left, x1, lo + GOLDEN * (hi - lo))
+            x1_new = np.where(left, hi - GOLDEN * (hi - lo), x2)
+            f2_new = np.where(left, f1, np.nan)
+            f1_new = np.where(left, np.nan, f2)
+            x1, x2 = x1_new, x2_new
+            update1, update2 = np.isnan(f1_new), np.isnan(f2_new)
+            f1_new[update1] = _profit(buy, sell, x1[update1], search[update1])
+            f2_new[update2] = _profit(buy, sell, x2[update2], search[update2])
+            f1, f2 = f1_new, f2_new
+        amount_in[search] = (lo + hi) / 2
+
+    amount_out = buy.output(amount_in)
+    proceeds = sell.output(amount_out)
+    profit = proceeds - amount_in
+    unprofitable = ~(profit > 0)
+    amount_in[unprofitable] = 0
+    amount_out[unprofitable] = 0
+    proceeds[unprofitable] = 0
+    profit[unprofitable] = 0
+    return {"amountIn": amount_in, "amountOut": amount_out, "proceeds": proceeds, "profit": profit}
+
+
+def exact_profit(buy_pool, buy_zero_for_one, sell_pool, sell_zero_for_one, amount_in):
+    """Integer-exact profit (quote token) of one round trip, using the swap simulator."""
+    if amount_in <= 0:
+        return 0
+    bought = simulate_swap(buy_pool, buy_zero_for_one, amount_in)
+    amount_out = -(bought["amount1"] if buy_zero_for_one else bought["amount0"])
+    if amount_out <= 0:
+        return -amount_in
+    sold = simulate_swap(sell_pool, sell_zero_for_one, amount_out)
+    return -(sold["amount1"] if sell_zero_for_one else sold["amount0"]) - amount_in
+
+
+def refine_amount(buy_pool, buy_zero_for_one, sell_pool, sell_zero_for_one, estimate, tolerance=1e-4):
+    """
+    Turns a float estimate from optimal_trade_sizes into the integer amountSpecified for
+    execute_swap_uni/execute_swap_alg: a short integer ternary search with the exact simulator
+    within +-tolerance of the estimate. Returns (amount_in, exact_profit); (0, 0) if unprofitable.
+    """
+    if estimate <= 0:
+        return 0, 0
+    args = (buy_pool, buy_zero_for_one, sell_pool, sell_zero_for_one)
+    lo = max(1, int(estimate * (1 - tolerance)))
+    hi = max(lo, int(estimate * (1 + tolerance)) + 1)
+    while hi - lo > 2:
+        m1 = lo + (hi - lo) // 3
+        m2 = hi - (hi - lo) // 3
+        if exact_profit(*args, m1) < exact_profit(*args, m2):
+            lo = m1
+        else:
+            hi = m2
+    best = max(range(lo, hi + 1), key=lambda amount: exact_profit(*args, amount))
+    profit = exact_profit(*args, best)
+    return (best, profit) if profit > 0 else (0, 0)
+
+
+##############################
+# Benchmark
+##############################
+
+def _synthetic_pool(rng, price, fee):
+    """A pool around `price` (token1 per token0) with random positions."""
+    tick_spacing = 60
+    center = int(np.log(price) / np.log(1.0001))
+    ticks, liquidity = {}, 0
+    for _ in range(40):
+        lower = (center // tick_spacing + rng.randint(-100, 99)) * tick_spacing
+        upper = lower + rng.randint(1, 60) * tick_spacing
+        amount = rng.randint(10 ** 18, 10 ** 21)
+        ticks[lower] = ticks.get(lower, 0) + amount
+        ticks[upper] = ticks.get(upper, 0) - amount
+        if lower <= center < upper:
+            liquidity += amount
+    ticks = {t: net for t, net in ticks.items() if net}
+    return PoolState(int(np.sqrt(price) * Q96), center, liquidity, fee, tick_spacing, ticks, "uni")
+
+
+def main():
+    rng = random.Random(0)
+    n_pairs = 1000
+    buys, sells = [], []
+    for _ in range(n_pairs):
+        price = rng.uniform(0.5, 2)
+        spread = rng.uniform(0.001, 0.05)
+        # token0 = quote token, token1 = arbitraged token: buy cheap in one pool, sell in the other.
+        buys.append((_synthetic_pool(rng, price * (1 + spread), rng.choice((500, 3000))), True))
+        sells.append((_synthetic_pool(rng, price, rng.choice((500, 3000))), False))
+
+    started = time.perf_counter()
+    buy, sell = CurveBatch.from_pools(buys), CurveBatch.from_pools(sells)
+    built = time.perf_counter()
+    result = optimal_trade_sizes(buy, sell)
+    solved = time.perf_counter()
+    print(f"{n_pairs} pairs: curves built in {(built - started) * 1000:.1f} ms, "
+          f"solved in {(solved - built) * 1000:.1f} ms, {int((result['profit'] > 0).sum())} profitable")
+
+    checked, worst = 0, 0.0
+    for i in np.flatnonzero(result["profit"] > 0)[:20]:
+        amount, profit = refine_amount(buys[i][0], True, sells[i][0], False, result["amountIn"][i])
+        worst = max(worst, abs(profit - result["profit"][i]) / profit)
+        checked += 1
+    print(f"exact simulator check on {checked} pairs: worst relative profit difference {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
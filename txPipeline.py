@@ -0,0 +1,264 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import anyio
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from websockets.asyncio.client import connect
+
+TRANSFER_TOPIC = Web3.keccak(text="Transfer(address,address,uint256)")
+
+# A transaction not seen in a block this many blocks after broadcast is looked up directly,
+# and one the node no longer knows after DEFAULT_DROP_AFTER_BLOCKS is reported as dropped.
+RECHECK_AFTER_BLOCKS = 3
+DEFAULT_DROP_AFTER_BLOCKS = 30
+# Past this many missed blocks (e.g. after a reconnect) pending transactions are looked up one
+# by one instead of scanning every block in between.
+MAX_CATCH_UP_BLOCKS = 50
+
+
+class TxDropped(Exception):
+    """The node dropped the transaction before it was mined; its nonce has been released."""
+
+
+class PendingTx(Future):
+    """
+    Handle for one broadcast transaction, resolved with its receipt once mined.
+
+    It is a concurrent.futures.Future: result(timeout) blocks until the receipt is in,
+    add_done_callback and then() chain work onto it, and it can be awaited from asyncio code.
+    Dropping the handle is fine too (fire-and-forget); the pipeline still tracks it.
+    """
+
+    def __init__(self, tx_hash, label=None):
+        super().__init__()
+        self.tx_hash = Web3.to_hex(tx_hash)
+        self.label = label or "Tx"
+        self.sent_block = None
+
+    def then(self, fn):
+        """
+        Runs fn(receipt) once this transaction is mined and returns a handle for its outcome.
+        If fn returns another PendingTx (e.g. the next transaction of a sequence), the returned
+        handle resolves with that transaction's receipt instead.
+        """
+        chained = Future()
+
+        def forward(future):
+            if future.exception() is not None:
+                chained.set_exception(future.exception())
+                return
+            try:
+                outcome = fn(future.result())
+            except Exception as e:
+                chained.set_exception(e)
+                return
+            if isinstance(outcome, Future):
+                outcome.add_done_callback(
+                    lambda f: chained.set_exception(f.exception()) if f.exception() is not None
+                    else chained.set_result(f.result())
+                )
+            else:
+                chained.set_result(outcome)
+
+        self.add_done_callback(forward)
+        return chained
+
+    def __await__(self):
+        return asyncio.wrap_future(self).__await__()
+
+
+def transferred_to(receipt, token_address, recipient):
+    """Sum of ERC20 Transfer amounts of token_address to recipient in one receipt's logs."""
+    token_address = Web3.to_checksum_address(token_address)
+    recipient = Web3.to_checksum_address(recipient)
+    total = 0
+    for log in receipt["logs"]:
+        topics = log["topics"]
+        if (Web3.to_checksum_address(log["address"]) == token_address and len(topics) == 3
+                and bytes(topics[0]) == TRANSFER_TOPIC
+                and Web3.to_checksum_address(bytes(topics[2])[-20:]) == recipient):
+            data = log["data"]
+            total += int.from_bytes(bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data), "big")
+    return total
+
+
+class TxPipeline:
+    """
+    Asynchronous transaction submission: submit() signs and broadcasts through a NonceManager
+    and returns a PendingTx at once, so many transactions can be in flight from one process.
+
+    One background thread follows new blocks, from a websocket newHeads subscription when
+    ws_url is given (reconnecting like poolStream.PoolStream) or else by polling the block
+    number over HTTP. For each new block it fetches the transaction hashes once and only asks
+    for the receipts of its own transactions found there, so confirming dozens of transactions
+    costs one block request per block instead of a polling loop per transaction. Transactions
+    that never show up are looked up directly, and reported as TxDropped (with their nonce
+    released for reuse) if the node forgot them. on_head(number), if given, is called for every
+    head seen, also when polling sees the same block again
+    (e.g. callCache.BlockCallCache.new_head).
+    """
+
+    def __init__(self, w3, nonce_manager, private_key, ws_url=None, poll_interval=0.5,
+                 drop_after_blocks=DEFAULT_DROP_AFTER_BLOCKS, on_head=None, reconnect_delay=1.0,
+                 max_reconnect_delay=30.0):
+        self.w3 = w3
+        self.nonce_manager = nonce_manager
+        self.private_key = private_key
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.drop_after_blocks = drop_after_blocks
+        self.on_head = on_head
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.head = None
+        self.confirmed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending = {}  # tx hash (hex) -> PendingTx
+        self._last_block = None  # last block scanned for our transactions
+        self._thread = None
+        self._closed = False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def start(self):
+        """Starts the block-following thread (submit() does this on first use, and restarts it if it died)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="tx-pipeline", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._closed = True
+
+    def submit(self, tx, label=None):
+        """Broadcasts tx (nonce filled in by the NonceManager) and returns its PendingTx."""
+        tx_hash = self.nonce_manager.send(tx, self.private_key)
+        return self.track(tx_hash, label)
+
+    def track(self, tx_hash, label=None):
+        """Tracks a transaction that was broadcast elsewhere; returns its PendingTx."""
+        pending = PendingTx(tx_hash, label)
+        pending.sent_block = self.head
+        with self._lock:
+            self._pending[pending.tx_hash] = pending
+        self.start()
+        return pending
+
+    ##############################
+    # Block loop
+    ##############################
+
+    def _run(self):
+        if self.ws_url:
+            anyio.run(self._follow_heads)
+        else:
+            self._poll_heads()
+
+    def _poll_heads(self):
+        while not self._closed:
+            try:
+                self._on_head(self.w3.eth.block_number)
+            except Exception as e:
+                print(f"Tx pipeline: block poll failed ({e!r})", file=sys.stderr)
+            time.sleep(self.poll_interval)
+
+    async def _follow_heads(self):
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                async with connect(self.ws_url) as ws:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}))
+                    delay = self.reconnect_delay
+                    async for message in ws:
+                        message = json.loads(message)
+                        if "error" in message:
+                            raise ValueError(f"eth_subscribe newHeads failed: {message['error']}")
+                        if message.get("method") == "eth_subscription":
+                            number = message["params"]["result"]["number"]
+                            try:
+                                await anyio.to_thread.run_sync(self._on_head, int(number, 16))
+                            except Exception as e:
+                                # e.g. BlockNotFound from a node behind the one that sent the head;
+                                # the next head scans this block again.
+                                print(f"Tx pipeline: processing block {int(number, 16)} failed ({e!r})", file=sys.stderr)
+                        if self._closed:
+                            return
+            except Exception as e:
+                print(f"Tx pipeline: head stream failed ({e!r}), reconnecting in {delay:.1f}s", file=sys.stderr)
+            if self._closed:
+                return
+            await anyio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _on_head(self, number):
+        if self.on_head is not None:
+            self.on_head(number)
+        if self._last_block is not None and number <= self._last_block:
+            return
+        self.head = number
+        with self._lock:
+            waiting = dict(self._pending)
+        for pending in waiting.values():
+            if pending.sent_block is None:
+                pending.sent_block = number - 1
+        if not waiting:
+            self._last_block = number
+            return
+
+        first = number if self._last_block is None else self._last_block + 1
+        if number - first < MAX_CATCH_UP_BLOCKS:
+            for block_number in range(first, number + 1):
+                for tx_hash in self.w3.eth.get_block(block_number)["transactions"]:
+                    tx_hash = Web3.to_hex(tx_hash)
+                    if tx_hash in waiting:
+                        self._confirm(waiting.pop(tx_hash))
+        else:
+            first = None  # too far behind: every pending transaction is looked up directly
+        self._last_block = number
+
+        dropped = []
+        for pending in waiting.values():
+            age = number - pending.sent_block
+            if first is not None and age < RECHECK_AFTER_BLOCKS:
+                continue
+            try:
+                self._confirm(pending, self.w3.eth.get_transaction_receipt(pending.tx_hash))
+            except TransactionNotFound:
+                if age >= self.drop_after_blocks:
+                    dropped.append(pending)
+        if dropped:
+            self._drop(dropped)
+
+    def _confirm(self, pending, receipt=None):
+        if receipt is None:
+            receipt = self.w3.eth.get_transaction_receipt(pending.tx_hash)
+        with self._lock:
+            self._pending.pop(pending.tx_hash, None)
+        self.confirmed += 1
+        outcome = "succeeded" if receipt["status"] == 1 else "REVERTED"
+        print(f"{pending.label} {pending.tx_hash} {outcome} in block {receipt['blockNumber']} "
+              f"(gas used {receipt['gasUsed']})")
+        pending.set_result(receipt)
+
+    def _drop(self, dropped):
+        self.nonce_manager.reconcile()
+        for pending in dropped:
+            try:
+                self.w3.eth.get_transaction(pending.tx_hash)
+                continue  # still in the node's pool, only slow
+            except TransactionNotFound:
+                pass
+            with self._lock:
+                self._pending.pop(pending.tx_hash, None)
+            self.dropped += 1
+            print(f"{pending.label} {pending.tx_hash} was dropped by the node")
+            pending.set_exception(TxDropped(pending.tx_hash))
@@ -0,0 +1,249 @@
+import random
+import sys
+import time
+
+import numpy as np
+from eth_abi import decode, encode
+from web3 import Web3
+
+from multicall import TOKEN0, TOKEN1, aggregate3, selector
+
+GET_RESERVES = selector("getReserves()")
+STABLE = selector("stable()")
+# Solidly-style pairs: (dec0, dec1, r0, r1, st, t0, t1), decimals given as 10**decimals.
+METADATA = selector("metadata()")
+GET_AMOUNT_OUT = selector("getAmountOut(uint256,address)")
+
+# Fees in hundredths of a basis point, like swapSimulator.FEE_DENOMINATOR.
+FEE_DENOMINATOR = 1_000_000
+# Neither Uniswap V2 forks nor Solidly pairs expose their fee uniformly (Solidly forks keep it in
+# the factory), so these defaults apply unless read_v2_pairs is given the pool's actual fee.
+DEFAULT_VOLATILE_FEE = 3000
+DEFAULT_STABLE_FEE = 500
+
+# Solidly stable-curve math works on amounts scaled to 18 decimals.
+ONE = 10 ** 18
+STABLE_NEWTON_STEPS = 255
+FLOAT_NEWTON_STEPS = 30
+
+
+def read_v2_pairs(w3, pair_addresses, fees=None, block_identifier="latest", **kwargs):
+    """
+    Reads many constant-product (Uniswap V2-style) and Solidly pairs in one Multicall3 batch:
+    token0(), token1(), getReserves(), stable() and metadata() for every pair.
+
+    Returns a dict mapping checksum pair address -> {
+        "type": "v2", "stable": True | False | None (None: plain V2 pair without stable()),
+        "token0", "token1", "reserve0", "reserve1", "decimals0", "decimals1" (10**decimals, only
+        known for Solidly pairs, else None), "fee" (pips, from fees or the defaults)
+    }. Addresses whose getReserves() reverted are left out.
+    """
+    fees = {Web3.to_checksum_address(a): f for a, f in (fees or {}).items()}
+    pairs = [Web3.to_checksum_address(a) for a in dict.fromkeys(pair_addresses)]
+    getters = [TOKEN0, TOKEN1, GET_RESERVES, STABLE, METADATA]
+    calls = [(pair, call_data) for pair in pairs for call_data in getters]
+    results = aggregate3(w3, calls, block_identifier=block_identifier, **kwargs)
+
+    states = {}
+    for i, pair in enumerate(pairs):
+        (ok0, data0), (ok1, data1), (ok_res, data_res), (ok_st, data_st), (ok_meta, data_meta) = \
+            results[i * len(getters):(i + 1) * len(getters)]
+        if not (ok_res and ok0 and ok1) or len(data_res) < 64 or len(data0) < 32 or len(data1) < 32:
+            continue
+        reserve0, reserve1 = decode(["uint256", "uint256"], data_res[:64])
+        stable = bool(decode(["bool"], data_st[:32])[0]) if ok_st and len(data_st) >= 32 else None
+        decimals0 = decimals1 = None
+        if ok_meta and len(data_meta) >= 64:
+            decimals0, decimals1 = decode(["uint256", "uint256"], data_meta[:64])
+        fee = fees.get(pair, DEFAULT_STABLE_FEE if stable else DEFAULT_VOLATILE_FEE)
+        states[pair] = {
+            "type": "v2",
+            "stable": stable,
+            "token0": Web3.to_checksum_address(decode(["address"], data0[:32])[0]),
+            "token1": Web3.to_checksum_address(decode(["address"], data1[:32])[0]),
+            "reserve0": reserve0,
+            "reserve1": reserve1,
+            "decimals0": decimals0,
+            "decimals1": decimals1,
+            "fee": fee,
+        }
+    return states
+
+
+def read_amount_out(w3, pair_address, token_in, amount_in, block_identifier="latest"):
+    """Solidly pairs only: the pair's own getAmountOut(amountIn, tokenIn), fee included."""
+    data = GET_AMOUNT_OUT + encode(["uint256", "address"], [amount_in, Web3.to_checksum_address(token_in)])
+    raw = w3.eth.call({"to": Web3.to_checksum_address(pair_address), "data": data}, block_identifier)
+    return decode(["uint256"], bytes(raw)[:32])[0]
+
+
+##############################
+# Exact integer quotes
+##############################
+
+def _stable_k(x, y):
+    """Solidly invariant x^3*y + y^3*x on 18-decimal amounts, rounded like the pair contract."""
+    a = x * y // ONE
+    b = x * x // ONE + y * y // ONE
+    return a * b // ONE
+
+
+def _stable_f(x0, y):
+    return x0 * (y * y // ONE * y // ONE) // ONE + (x0 * x0 // ONE * x0 // ONE) * y // ONE
+
+
+def _stable_d(x0, y):
+    return 3 * x0 * (y * y // ONE) // ONE + (x0 * x0 // ONE * x0 // ONE)
+
+
+def _stable_get_y(x0, xy, y):
+    """Newton's method for the new reserve y with f(x0, y) = xy, step for step as the pair does."""
+    for _ in range(STABLE_NEWTON_STEPS):
+        y_prev = y
+        k = _stable_f(x0, y)
+        if k < xy:
+            y = y + (xy - k) * ONE // _stable_d(x0, y)
+        else:
+            y = y - (k - xy) * ONE // _stable_d(x0, y)
+        if abs(y - y_prev) <= 1:
+            return y
+    return y
+
+
+def get_amount_out(pair, zero_for_one, amount_in):
+    """
+    Integer-exact output of one swap on a pair dict from read_v2_pairs, matching the contracts'
+    rounding: Uniswap V2's getAmountOut for plain pairs (stable None) and Solidly's getAmountOut
+    for Solidly pairs, which takes the fee off the input first and then applies x*y=k (volatile)
+    or the stable curve's _get_y (stable). The fee is taken from pair["fee"]; the result is
+    only exact if that is the pair's actual fee.
+    """
+    if amount_in <= 0:
+        return 0
+    reserve0, reserve1 = pair["reserve0"], pair["reserve1"]
+    reserve_in, reserve_out = (reserve0, reserve1) if zero_for_one else (reserve1, reserve0)
+    if pair["stable"] is None:
+        amount_in_with_fee = amount_in * (FEE_DENOMINATOR - pair["fee"])
+        return amount_in_with_fee * reserve_out // (reserve_in * FEE_DENOMINATOR + amount_in_with_fee)
+
+    amount_in -= amount_in * pair["fee"] // FEE_DENOMINATOR
+    if not pair["stable"]:
+        return amount_in * reserve_out // (reserve_in + amount_in)
+
+    decimals0, decimals1 = pair["decimals0"], pair["decimals1"]
+    xy = _stable_k(reserve0 * ONE // decimals0, reserve1 * ONE // decimals1)
+    scaled0, scaled1 = reserve0 * ONE // decimals0, reserve1 * ONE // decimals1
+    if zero_for_one:
+        reserve_a, reserve_b, decimals_in, decimals_out = scaled0, scaled1, decimals0, decimals1
+    else:
+        reserve_a, reserve_b, decimals_in, decimals_out = scaled1, scaled0, decimals1, decimals0
+    amount_in = amount_in * ONE // decimals_in
+    y = reserve_b - _stable_get_y(amount_in + reserve_a, xy, reserve_b)
+    return y * decimals_out // ONE
+
+
+##############################
+# Vectorized float quotes
+##############################
+
+def quote_volatile(reserve_in, reserve_out, amounts, fee):
+    """
+    Constant-product (x*y=k) output for arrays of input amounts; every argument broadcasts, so
+    one pair with many sizes and many pairs with one size each both take a single call.
+    """
+    net = np.asarray(amounts, dtype=np.float64) * (1 - np.asarray(fee, dtype=np.float64) / FEE_DENOMINATOR)
+    reserve_in = np.asarray(reserve_in, dtype=np.float64)
+    reserve_out = np.asarray(reserve_out, dtype=np.float64)
+    return net * reserve_out / (reserve_in + net)
+
+
+def quote_stable(reserve_in, reserve_out, decimals_in, decimals_out, amounts, fee, steps=FLOAT_NEWTON_STEPS):
+    """
+    Solidly stable-curve (x^3*y + y^3*x = k) output for arrays of input amounts, broadcasting
+    like quote_volatile. decimals_* are 10**decimals as returned by read_v2_pairs.
+
+    Works in whole-token units and solves x'*y^3 + x'^3*y = k for the new reserve y with a fixed
+    number of vectorized Newton steps. The curve is increasing and convex in y and the current
+    reserve lies above the root, so the iteration approaches it monotonically from above.
+    """
+    decimals_in = np.asarray(decimals_in, dtype=np.float64)
+    decimals_out = np.asarray(decimals_out, dtype=np.float64)
+    x = np.asarray(reserve_in, dtype=np.float64) / decimals_in
+    y = np.asarray(reserve_out, dtype=np.float64) / decimals_out
+    net = np.asarray(amounts, dtype=np.float64) * (1 - np.asarray(fee, dtype=np.float64) / FEE_DENOMINATOR)
+    k = x ** 3 * y + y ** 3 * x
+    x_new = x + net / decimals_in
+    y_new = np.broadcast_to(y, np.broadcast(x_new, y).shape).copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(steps):
+            f = x_new * y_new ** 3 + x_new ** 3 * y_new - k
+            y_new = y_new - f / (3 * x_new * y_new ** 2 + x_new ** 3)
+    return np.nan_to_num((y - y_new) * decimals_out)
+
+
+def quote_amounts_out(pair, zero_for_one, amounts):
+    """Vectorized float output for many input sizes on one pair dict from read_v2_pairs."""
+    reserve_in, reserve_out = (pair["reserve0"], pair["reserve1"]) if zero_for_one else (pair["reserve1"], pair["reserve0"])
+    if not pair["stable"]:
+        return quote_volatile(reserve_in, reserve_out, amounts, pair["fee"])
+    decimals_in, decimals_out = (pair["decimals0"], pair["decimals1"]) if zero_for_one else (pair["decimals1"], pair["decimals0"])
+    return quote_stable(reserve_in, reserve_out, decimals_in, decimals_out, amounts, pair["fee"])
+
+
+##############################
+# Benchmark
+##############################
+
+def main():
+    """
+    Quote benchmark: python v2Pools.py [pair address ...]
+    Without addresses, quotes synthetic pairs; with addresses (and RPC_URL), live pairs.
+    """
+    rng = random.Random(0)
+    if len(sys.argv) > 1:
+        import os
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        w3 = Web3(Web3.HTTPProvider(os.environ.get("RPC_URL")))
+        pairs = list(read_v2_pairs(w3, sys.argv[1:]).values())
+        for address, pair in zip(sys.argv[1:], pairs):
+            print(f"{address}: stable={pair['stable']} reserves={pair['reserve0']}/{pair['reserve1']} fee={pair['fee']}")
+    else:
+        pairs = []
+        for i in range(200):
+            stable = i % 2 == 1
+            decimals0, decimals1 = 10 ** rng.choice((6, 18)), 10 ** rng.choice((6, 18))
+            reserve = rng.uniform(1e4, 1e8)
+            pairs.append({
+                "stable": stable,
+                "reserve0": int(reserve * decimals0),
+                "reserve1": int(reserve * rng.uniform(0.9, 1.1) * decimals1),
+                "decimals0": decimals0,
+                "decimals1": decimals1,
+                "fee": DEFAULT_STABLE_FEE if stable else DEFAULT_VOLATILE_FEE,
+            })
+    if not pairs:
+        print("No V2 or Solidly pairs found.")
+        return
+
+    sizes = np.geomspace(1e-6, 0.2, 1000)
+    started = time.perf_counter()
+    for pair in pairs:
+        quote_amounts_out(pair, True, sizes * pair["reserve0"])
+    elapsed = time.perf_counter() - started
+    print(f"{len(pairs)} pairs x {len(sizes)} sizes quoted in {elapsed * 1000:.1f} ms")
+
+    worst = 0.0
+    for pair in pairs:
+        for size in sizes[::100]:
+            amount = int(size * pair["reserve0"])
+            exact = get_amount_out(pair, True, amount)
+            approx = float(quote_amounts_out(pair, True, [amount])[0])
+            if exact > 10 ** 9:
+                worst = max(worst, abs(approx - exact) / exact)
+    print(f"float vs exact integer quotes: worst relative difference {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
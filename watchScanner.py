@@ -0,0 +1,211 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+import anyio
+import numpy as np
+
+from dexScreener import DexScreenerClient, DEFAULT_MAX_CONCURRENCY
+from poolDecoder import decode_pools
+from poolSnapshot import PoolSnapshot
+from spreadIndex import SpreadIndex
+
+
+def load_watchlist(path):
+    """
+    Reads a watchlist file: one token address per line, blank lines and '#' comments ignored.
+    Duplicates are dropped while keeping the file order.
+    """
+    tokens = []
+    with open(path, 'r') as watchlist_file:
+        for line in watchlist_file:
+            token_address = line.split("#", 1)[0].strip()
+            if token_address:
+                tokens.append(token_address)
+    return list(dict.fromkeys(tokens))
+
+
+def build_opportunity_record(chain_id, token_address, arbitrage, cycle, pool_count):
+    """Builds the JSON-serialisable opportunity record emitted for one token."""
+    def pool_summary(entry):
+        return {
+            "dexId": entry["dexId"],
+            "pairName": entry["pairName"],
+            "pairAddress": entry["pairAddress"],
+            "priceUsd": entry["priceUsd"],
+            "liquidityUsd": entry["liquidityUsd"]
+        }
+
+    return {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "cycle": cycle,
+        "chainId": chain_id,
+        "token": token_address,
+        "tokenName": arbitrage["tokenName"],
+        "diffPercent": round(arbitrage["diffPercent"], 6),
+        "eligiblePools": len(arbitrage["sortedPrices"]),
+        "totalPools": pool_count,
+        "high": pool_summary(arbitrage["highest"]),
+        "low": pool_summary(arbitrage["lowest"])
+    }
+
+
+async def run_scanner(watchlist_path, find_arbitrage, chain_id="sonic", interval=30, threshold=1.0,
+                      min_liquidity=10000, max_concurrency=DEFAULT_MAX_CONCURRENCY, batched=True,
+                      max_cycles=None, output=sys.stdout, snapshot_filter=None, top=0):
+    """
+    Repeatedly scans every token on the watchlist and writes one JSON line to `output` for each
+    token whose highest/lowest price spread is at least `threshold` percent.
+
+    find_arbitrage(pools, token_address, min_liquidity) is the checker's find_arbitrage_from_pools.
+    Each token's pools are evaluated as soon as they arrive and are not kept after that, so memory
+    stays bounded by the pools in flight rather than by the size of the watchlist. The watchlist
+    file is re-read every cycle so tokens can be added or removed without a restart.
+    Per-cycle stats go to stderr to keep the output stream pure JSON lines.
+
+    With snapshot_filter set (keyword arguments for PoolSnapshot.eligible_mask), responses are
+    decoded into typed PoolRecords, the whole cycle is collected into one columnar PoolSnapshot
+    and every token's spread is computed in a single vectorized pass; find_arbitrage is not used
+    in that mode.
+
+    With top > 0, every token's eligible pools are also kept in a SpreadIndex across cycles and
+    the `top` largest current spreads are printed to stderr after each cycle.
+    """
+    cycle = 0
+    # Entries reaching the index were already filtered by find_arbitrage.
+    spread_index = SpreadIndex(min_liquidity=0, allowed_dexes=None) if top > 0 else None
+    # The vectorized path decodes responses straight into compact typed PoolRecords.
+    decoder = decode_pools if snapshot_filter is not None else None
+    async with DexScreenerClient(max_concurrency=max_concurrency, decoder=decoder) as client:
+        while max_cycles is None or cycle < max_cycles:
+            cycle += 1
+            started = time.monotonic()
+            requests_before = client.request_count
+            stats = {"tokens": 0, "evaluated": 0, "opportunities": 0}
+
+            try:
+                tokens = load_watchlist(watchlist_path)
+            except OSError as e:
+                print(f"Could not read watchlist {watchlist_path}: {e}", file=sys.stderr)
+                tokens = []
+            stats["tokens"] = len(tokens)
+
+            def emit(token_address, arbitrage, pool_count):
+                if spread_index is not None:
+                    entries = arbitrage["sortedPrices"] if arbitrage is not None else []
+                    spread_index.sync_entries(token_address, entries, arbitrage and arbitrage["tokenName"])
+                if arbitrage is None or arbitrage["diffPercent"] is None:
+                    return
+                if arbitrage["diffPercent"] >= threshold:
+                    stats["opportunities"] += 1
+                    record = build_opportunity_record(chain_id, token_address, arbitrage, cycle, pool_count)
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+
+            def on_result(token_address, pools):
+                if not pools:
+                    return
+                stats["evaluated"] += 1
+                emit(token_address, find_arbitrage(pools, token_address, min_liquidity), len(pools))
+
+            if tokens and snapshot_filter is not None:
+                if batched:
+                    pools_by_token = await client.fetch_many_token_pools_batched(chain_id, tokens)
+                else:
+                    pools_by_token = await client.fetch_many_token_pools(chain_id, tokens)
+                snapshot = PoolSnapshot.from_records(pools_by_token)
+                pool_counts = {token_address: len(pools) for token_address, pools in pools_by_token.items()}
+                del pools_by_token  # Only the columnar snapshot is kept for evaluation.
+                mask = snapshot.eligible_mask(min_liquidity=min_liquidity, **snapshot_filter)
+                spreads = snapshot.compute_spreads(mask)
+                stats["evaluated"] = sum(1 for count in pool_counts.values() if count)
+                if spread_index is not None:
+                    rows = range(len(snapshot.tokens))  # the index needs every token, not just opportunities
+                else:
+                    rows = np.flatnonzero(spreads["diff_percent"] >= threshold)
+                for i in rows:
+                    token_address = snapshot.tokens[i]
+                    emit(token_address, snapshot.arbitrage_for(spreads, mask, i), pool_counts[token_address])
+            elif tokens:
+                if batched:
+                    await client.fetch_many_token_pools_batched(chain_id, tokens, on_result=on_result, collect=False)
+                else:
+                    await client.fetch_many_token_pools(chain_id, tokens, on_result=on_result, collect=False)
+
+            elapsed = time.monotonic() - started
+            print(
+                f"Cycle {cycle}: {stats['tokens']} tokens, {stats['evaluated']} with pools, "
+                f"{stats['opportunities']} opportunities >= {threshold}%, "
+                f"{client.request_count - requests_before} requests, wall time {elapsed:.2f}s",
+                file=sys.stderr
+            )
+            if spread_index is not None:
+                for rank, best in enumerate(spread_index.top_spreads(top), start=1):
+                    print(
+                        f"  #{rank} {best['tokenName'] or best['token']}: {best['diffPercent']:.2f}% "
+                        f"({best['highest']['dexId']} {best['highest']['priceUsd']:.6f} / "
+                        f"{best['lowest']['dexId']} {best['lowest']['priceUsd']:.6f})",
+                        file=sys.stderr
+                    )
+
+            if max_cycles is not None and cycle >= max_cycles:
+                break
+            # Fixed-rate schedule: if a cycle overran the interval, start the next one immediately.
+            await anyio.sleep(max(0.0, interval - elapsed))
+
+
+def main(argv=None, default_mode="usd"):
+    parser = argparse.ArgumentParser(description="Continuously scan a token watchlist for DexScreener price spreads.")
+    parser.add_argument("watchlist", help="File with one token address per line")
+    parser.add_argument("--chain", default="sonic", help="DexScreener chain id (default: sonic)")
+    parser.add_argument("--mode", choices=["usd", "ws"], default=default_mode,
+                        help="usd: allowed-DEX base-token pools (arbitrageChecker); ws: /wS pairs (arbitrageChecker_ws)")
+    parser.add_argument("--interval", type=float, default=30, help="Seconds between cycle starts")
+    parser.add_argument("--threshold", type=float, default=1.0, help="Minimum spread in percent to emit a record")
+    parser.add_argument("--min-liquidity", type=float, default=10000, help="Minimum pool liquidity in USD")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Max concurrent DexScreener requests")
+    parser.add_argument("--no-batch", action="store_true", help="Use one /token-pairs request per token")
+    parser.add_argument("--cycles", type=int, default=None, help="Stop after this many cycles (default: run forever)")
+    parser.add_argument("--output", default="-", help="JSON lines output file ('-' for stdout)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="Evaluate each cycle as one columnar NumPy snapshot instead of token by token")
+    parser.add_argument("--top", type=int, default=0, help="Print the N largest current spreads after each cycle")
+    args = parser.parse_args(argv)
+
+    snapshot_filter = None
+    if args.mode == "ws":
+        from arbitrageChecker_ws import find_arbitrage_from_pools, WS_ADDRESS
+        if args.vectorized:
+            snapshot_filter = {"pair_token": WS_ADDRESS, "allowed_dexes": None}
+    else:
+        from arbitrageChecker import find_arbitrage_from_pools
+        if args.vectorized:
+            snapshot_filter = {}
+
+    output = sys.stdout if args.output == "-" else open(args.output, 'a')
+    try:
+        anyio.run(lambda: run_scanner(
+            args.watchlist,
+            find_arbitrage_from_pools,
+            chain_id=args.chain,
+            interval=args.interval,
+            threshold=args.threshold,
+            min_liquidity=args.min_liquidity,
+            max_concurrency=args.concurrency,
+            batched=not args.no_batch,
+            max_cycles=args.cycles,
+            output=output,
+            snapshot_filter=snapshot_filter,
+            top=args.top
+        ))
+    except KeyboardInterrupt:
+        print("Scanner stopped.", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()